@@ -1 +1,7 @@
+from .bestiary import BestiaryIndex
+from .dice import DiceExpression, dice
 from .dungeon_generator import Dungeon
+from .encounter_index import EncounterIndex
+from .encounter_service import EncounterService
+from .farm import dungeon_farm, treasure_farm
+from .treasure_simulator import TreasureSimulator
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class BestiaryIndex:
+    """
+    Inverted index over the monster catalog (see 
+    data.load_catalog): one packed bitset (numpy.packbits, one bit
+    per monster) per value of type, size, align, source and 
+    legendary.
+
+    Values are matched case-insensitively. type and source are
+    also indexed by their base value, the part before the
+    parenthesis, so 'fiend' matches 'fiend (demon)' and
+    'Monster Manual' matches 'Monster Manual (SRD)'.
+
+    A theme is a dict of attribute to a value, or a list of values
+    any of which may match. Attributes are combined with AND, so
+
+        {'type': 'undead', 'source': 'Monster Manual', 'legendary': False}
+
+    selects the non-legendary undead from the Monster Manual.
+    """
+    attributes = ('type', 'size', 'align', 'source', 'legendary')
+    base_attributes = ('type', 'source')
+
+    def __init__(self, catalog):
+        self.n_monsters = len(catalog)
+        self.bitsets = {attribute: dict() for attribute in self.attributes}
+
+        for attribute in self.attributes:
+            if attribute == 'legendary':
+                values = np.asarray(catalog[attribute], dtype=bool)
+            else:
+                values = np.char.lower(np.asarray(catalog[attribute], dtype=str))
+
+            bitsets = self.bitsets[attribute]
+            for value in np.unique(values):
+                self._add(bitsets, value.item(), values == value)
+            if attribute in self.base_attributes:
+                bases = np.char.strip(np.char.partition(values, '(')[:, 0])
+                for base in np.unique(bases):
+                    self._add(bitsets, base.item(), bases == base)
+
+    def bits(self, theme):
+        """
+        Packed bitset of the monsters matching theme, see
+        BestiaryIndex.
+        """
+        bits = np.full((self.n_monsters + 7) // 8, 0xff, dtype=np.uint8)
+        for attribute, values in theme.items():
+            if attribute not in self.bitsets:
+                raise KeyError(f'cannot filter monsters by {attribute}, only by {", ".join(self.attributes)}')
+            if isinstance(values, (str, bool, np.bool_)):
+                values = [values]
+
+            any_value = np.zeros_like(bits)
+            for value in values:
+                key = bool(value) if attribute == 'legendary' else value.lower()
+                if key in self.bitsets[attribute]:
+                    any_value |= self.bitsets[attribute][key]
+            bits &= any_value
+        return bits
+
+    def mask(self, theme):
+        """
+        Boolean mask over catalog rows of the monsters matching
+        theme, ready to AND with Dungeon.cr_mask.
+        """
+        return np.unpackbits(self.bits(theme), count=self.n_monsters).astype(bool)
+
+    @staticmethod
+    def _add(bitsets, value, mask):
+        bits = np.packbits(mask)
+        if value in bitsets:
+            bitsets[value] |= bits
+        else:
+            bitsets[value] = bits
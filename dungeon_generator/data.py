@@ -0,0 +1,396 @@
+import csv
+import hashlib
+import io
+import os
+import tempfile
+from contextlib import nullcontext
+from functools import lru_cache
+from importlib import resources
+
+import numpy as np
+
+from .bestiary import BestiaryIndex
+
+# pandas is only imported by the DataFrame loaders (load_player_exp
+# and load_monsters). Encounters are built from load_catalog and
+# load_level_thresholds, which get by without it
+
+
+player_exp_filename = 'dnd_player_exp.csv'
+monster_filename = 'dnd_monsters.csv'
+
+fraction_crs = {'1/2': '0.5', '1/4': '0.25', '1/8': '0.125'}
+
+cr_to_xp = {
+    0: 10,
+    0.125: 25,
+    0.25: 50,
+    0.5: 100,
+    1: 200,
+    2: 450,
+    3: 700,
+    4: 1100,
+    5: 1800,
+    6: 2300,
+    7: 2900,
+    8: 3900,
+    9: 5000,
+    10: 5900,
+    11: 7200,
+    12: 8400,
+    13: 10000,
+    14: 11500,
+    15: 13000,
+    16: 15000,
+    17: 18000,
+    18: 20000,
+    19: 22000,
+    20: 25000,
+    21: 33000,
+    22: 41000,
+    23: 50000,
+    24: 62000,
+    25: 75000,
+    26: 90000,
+    27: 105000,
+    28: 120000,
+    29: 135000,
+    30: 155000
+}
+
+# bump whenever the catalog layout changes, so stale files get rebuilt
+catalog_version = 1
+catalog_columns = ('name', 'type', 'size', 'align', 'source')
+level_threshold_columns = ('Easy', 'Medium', 'Hard', 'Deadly')
+
+
+def load_player_exp(source=None):
+    """
+    XP thresholds per player level, indexed by level with one
+    column per difficulty.
+
+    Parameters
+    ----------
+    source:  str, optional
+        Path or URL to read instead of the CSV bundled with the
+        package. Remote sources are only fetched when asked for.
+
+    Returns
+    -------
+    pandas.DataFrame shared by every caller in the process. It
+    is parsed once per source; use .copy() before modifying it.
+    """
+    return _read_player_exp(source)
+
+
+def load_monsters(source=None):
+    """
+    The monster table, indexed by monster name, with the 'cr'
+    column parsed to floats.
+
+    Parameters
+    ----------
+    source:  str, optional
+        Path or URL to read instead of the CSV bundled with the
+        package. Remote sources are only fetched when asked for.
+
+    Returns
+    -------
+    pandas.DataFrame shared by every caller in the process. It
+    is parsed once per source; use .copy() before modifying it.
+    """
+    return _read_monsters(source)
+
+
+def load_level_thresholds(source=None):
+    """
+    XP thresholds per player level, parsed without pandas.
+
+    Parameters
+    ----------
+    source:  str, optional
+        Path or URL to read instead of the CSV bundled with the
+        package.
+
+    Returns
+    -------
+    levels:  numpy.ndarray of int
+        Player levels, in increasing order.
+
+    thresholds:  numpy.ndarray of int
+        One row of easy, medium, hard and deadly thresholds per
+        level.
+
+    Both are read-only and shared by every caller in the process.
+    """
+    return _read_level_thresholds(source)
+
+
+def load_monster_ids(source=None):
+    """
+    Monster names of load_catalog(source) as a read-only object
+    array of str, and a dict of monster name to catalog row, 
+    built once per catalog and shared.
+    """
+    return _monster_ids(source, _catalog_stamp(source))
+
+
+def load_bestiary_index(source=None):
+    """
+    BestiaryIndex over load_catalog(source), built once per 
+    catalog and shared.
+    """
+    return _bestiary_index(source, _catalog_stamp(source))
+
+
+def parse_cr(names, crs):
+    """
+    Vectorized challenge rating parser.
+
+    Monsters named '...-lvl-<k>' take their CR from the level
+    suffix, fractional CRs ('1/2', '1/4', '1/8') become floats
+    and missing CRs become nan.
+
+    Parameters
+    ----------
+    names:  pandas.Index or Series of str
+        Monster names.
+
+    crs:  pandas.Series of str
+        Raw CR column.
+
+    Returns
+    -------
+    numpy.ndarray of float
+    """
+    import pandas as pd
+
+    names = pd.Series(np.asarray(names, dtype=object), index=crs.index, dtype=object)
+    level = names.str.extract(r'lvl.(.*)$', expand=False)
+    cr = crs.astype(object).replace(fraction_crs).astype(float)
+    return np.where(level.notna(), level.astype(float), cr)
+
+
+def load_catalog(source=None, cache_dir=None):
+    """
+    Compiled monster catalog, a read-only numpy structured array
+    with one record per monster and the fields name, cr, xp, 
+    type, size, align, source and legendary.
+    
+    The catalog is compiled from the monster CSV the first time
+    it is asked for and saved as a .npy file in cache_dir. Later
+    calls, in this or any other process, memory-map that file 
+    instead of parsing the CSV. The file name is keyed on the 
+    CSV's absolute path, modification time and size, so editing
+    the CSV triggers a rebuild, and older builds of the same CSV
+    are removed. Monsters without a CR get nan and an xp of 0.
+
+    Parameters
+    ----------
+    source:  str, optional
+        Path to a monster CSV. Defaults to the one bundled with
+        the package. URLs are fetched and compiled in memory, once
+        per process.
+
+    cache_dir:  str, optional
+        Where compiled catalogs are kept. Defaults to 
+        $XDG_CACHE_HOME/pydungeon, or ~/.cache/pydungeon. If it 
+        cannot be written to, the catalog is compiled in memory.
+
+    Returns
+    -------
+    numpy.ndarray (memory-mapped when the cache is usable)
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+            'pydungeon'
+        )
+    if source is None:
+        with resources.as_file(resources.files(__package__).joinpath(monster_filename)) as path:
+            return _stat_and_load_catalog(os.fspath(path), cache_dir)
+    if _is_url(source):
+        return _remote_catalog(source)
+    return _stat_and_load_catalog(os.fspath(source), cache_dir)
+
+
+def catalog_xp(cr):
+    """
+    XP for an array of CRs, 0 wherever the CR is nan.
+    """
+    cr = np.asarray(cr, dtype=float)
+    known = np.array(sorted(cr_to_xp))
+    xp = np.array([cr_to_xp[key] for key in known])
+    ind = np.searchsorted(known, np.nan_to_num(cr, nan=-1))
+    ind = np.minimum(ind, len(known) - 1)
+    return np.where(known[ind] == cr, xp[ind], 0)
+
+
+def _catalog_stamp(source):
+    """
+    (mtime_ns, size) of the monster CSV behind source, the key
+    load_catalog rebuilds on, for caches built from the catalog.
+    URLs are only fetched once per process and have no stamp.
+    """
+    if source is None:
+        with resources.as_file(resources.files(__package__).joinpath(monster_filename)) as path:
+            stat = os.stat(path)
+    elif _is_url(source):
+        return None
+    else:
+        stat = os.stat(source)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stat_and_load_catalog(path, cache_dir):
+    stat = os.stat(path)
+    return _load_catalog(path, cache_dir, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=None)
+def _load_catalog(path, cache_dir, mtime_ns, size):
+    # builds of the same CSV share a prefix, other CSVs with the
+    # same name (or other installs) get their own
+    stem = os.path.splitext(os.path.basename(path))[0]
+    path_hash = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    prefix = f'{stem}-{path_hash}-v'
+    filename = f'{prefix}{catalog_version}-{mtime_ns}-{size}.npy'
+    cache_path = os.path.join(cache_dir, filename)
+    
+    try:
+        return np.load(cache_path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+    
+    with open(path, newline='', encoding='utf-8') as f:
+        catalog = _compile_catalog(f)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file and rename, so concurrent
+        # workers never see a half written catalog
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, catalog)
+        os.replace(tmp_path, cache_path)
+        for old in os.listdir(cache_dir):
+            if old.startswith(prefix) and old.endswith('.npy') and old != filename:
+                os.remove(os.path.join(cache_dir, old))
+    except OSError:
+        catalog.flags.writeable = False
+        return catalog
+    return np.load(cache_path, mmap_mode='r')
+
+
+@lru_cache(maxsize=None)
+def _remote_catalog(url):
+    with _open_text(url, monster_filename) as f:
+        catalog = _compile_catalog(f)
+    catalog.flags.writeable = False
+    return catalog
+
+
+def _compile_catalog(f):
+    """
+    Parse the monster CSV in the text file f with the csv module
+    into a structured array, see load_catalog.
+    """
+    rows = list(csv.DictReader(f))
+    
+    columns = {column: [row[column] for row in rows] for column in catalog_columns}
+    cr = np.array([_cr_value(row['name'], row['cr']) for row in rows], dtype=float)
+    
+    dtype = [(column, f'U{max(map(len, columns[column]), default=1)}') for column in catalog_columns]
+    dtype[1:1] = [('cr', 'f8'), ('xp', 'i8')]
+    dtype.append(('legendary', '?'))
+    
+    catalog = np.empty(len(rows), dtype=dtype)
+    for column in catalog_columns:
+        catalog[column] = columns[column]
+    catalog['cr'] = cr
+    catalog['xp'] = catalog_xp(cr)
+    catalog['legendary'] = [row['legendary'] == 'Legendary' for row in rows]
+    return catalog
+
+
+def _cr_value(name, cr):
+    """
+    Scalar version of parse_cr for raw csv rows.
+    """
+    if 'lvl' in name:
+        return float(name[name.find('lvl') + 4:])
+    if not cr:
+        return np.nan
+    return float(fraction_crs.get(cr, cr))
+
+
+@lru_cache(maxsize=None)
+def _bestiary_index(source, stamp):
+    return BestiaryIndex(load_catalog(source))
+
+
+@lru_cache(maxsize=None)
+def _monster_ids(source, stamp):
+    names = load_catalog(source)['name'].astype(object)
+    names.flags.writeable = False
+    return names, {name: i for i, name in enumerate(names)}
+
+
+@lru_cache(maxsize=None)
+def _read_level_thresholds(source):
+    with _open_text(source, player_exp_filename) as f:
+        header, *rows = list(csv.reader(f))
+    columns = [header.index(column) for column in level_threshold_columns]
+    levels = np.array([int(row[0]) for row in rows])
+    thresholds = np.array([[int(row[i]) for i in columns] for row in rows])
+    order = np.argsort(levels)
+    levels, thresholds = levels[order], thresholds[order]
+    levels.flags.writeable = False
+    thresholds.flags.writeable = False
+    return levels, thresholds
+
+
+@lru_cache(maxsize=None)
+def _read_player_exp(source):
+    import pandas as pd
+
+    with _open(source, player_exp_filename) as f:
+        return pd.read_csv(f, index_col=0)
+
+
+@lru_cache(maxsize=None)
+def _read_monsters(source):
+    import pandas as pd
+
+    with _open(source, monster_filename) as f:
+        monster_df = pd.read_csv(f, index_col=0)
+    monster_df['cr'] = parse_cr(monster_df.index, monster_df['cr'])
+    return monster_df
+
+
+def _open(source, filename):
+    """
+    Open source for reading, falling back to the file bundled
+    with the package when source is None.
+    """
+    if source is None:
+        return resources.files(__package__).joinpath(filename).open('rb')
+    return nullcontext(source)  # pandas fetches paths and URLs itself
+
+
+def _open_text(source, filename):
+    """
+    Open source as text for the csv module, fetching URLs and 
+    falling back to the file bundled with the package when source
+    is None.
+    """
+    if source is None:
+        return resources.files(__package__).joinpath(filename).open('r', newline='', encoding='utf-8')
+    if _is_url(source):
+        from urllib.request import urlopen
+
+        return io.TextIOWrapper(urlopen(source), newline='', encoding='utf-8')
+    return open(source, newline='', encoding='utf-8')
+
+
+def _is_url(source):
+    return isinstance(source, str) and '://' in source
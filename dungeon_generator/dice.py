@@ -0,0 +1,417 @@
+import math
+import re
+from functools import lru_cache
+
+import numpy as np
+
+
+# numbers, the d operator (only when a count of sides follows, so
+# names like dx stay names), variable names and operators
+_dice_token = re.compile(r'\s*(?:(\d+)|(d)(?=[\d(%])|([A-Za-z_]\w*)|(\S))')
+
+# pmfs longer than this are convolved with the fft
+fft_convolve_size = 512
+
+
+class DiceEngine(np.random.Generator):
+    """
+    numpy Generator that also rolls dice cheaply.
+
+    Single rolls are served from a buffer of pre-drawn rolls per
+    die size, refilled from the generator itself with one
+    vectorized draw whenever it runs dry. Buffers start small and
+    double with every refill, so a die that is rolled once costs
+    little and a die that is rolled often is drawn in bulk. All
+    draws come from the one bit generator, so a DiceEngine built
+    from a seed rolls the same dice every time, and it can be used
+    anywhere a Generator is expected.
+
+    Parameters
+    ----------
+    bit_generator:  numpy.random.BitGenerator
+    """
+    min_buffer_size = 64
+    max_buffer_size = 4096
+
+    def __init__(self, bit_generator):
+        super().__init__(bit_generator)
+        self._buffers = dict()  # dx -> list of pre-drawn rolls, used from the end
+        self._buffer_sizes = dict()  # dx -> size of the next refill
+
+    def __reduce__(self):
+        return _restore_dice_engine, (self.bit_generator, self._buffers, self._buffer_sizes)
+
+    def roll(self, n, dx=6):
+        """
+        Total of n dX, as an int.
+        """
+        buffer = self._buffers.get(dx)
+        if buffer is None or len(buffer) < n:
+            buffer = self._refill(dx, n)
+        if n == 1:
+            return buffer.pop()
+        # slice from the front, buffer[-n:] would be all of it for n = 0
+        total = sum(buffer[len(buffer) - n:])
+        del buffer[len(buffer) - n:]
+        return total
+
+    def roll_many(self, n, dx=6, k=1):
+        """
+        Totals of k independent rolls of n dX, as an array. Small
+        batches come from the buffer, large ones straight from the
+        generator.
+        """
+        if n * k > self.min_buffer_size:
+            return self.integers(1, dx + 1, size=(k, n)).sum(axis=1)
+        buffer = self._buffers.get(dx)
+        if buffer is None or len(buffer) < n * k:
+            buffer = self._refill(dx, n * k)
+        rolls = np.array(buffer[len(buffer) - n * k:], dtype=np.int64)
+        del buffer[len(buffer) - n * k:]
+        return rolls if n == 1 else rolls.reshape(k, n).sum(axis=1)
+
+    def _refill(self, dx, n):
+        size = max(self._buffer_sizes.get(dx, self.min_buffer_size), n)
+        self._buffer_sizes[dx] = min(2 * size, self.max_buffer_size)
+        buffer = self.integers(1, dx + 1, size=size).tolist() + self._buffers.get(dx, [])
+        self._buffers[dx] = buffer
+        return buffer
+
+
+def dice_engine(seed=None):
+    """
+    DiceEngine from anything numpy.random.default_rng accepts. A
+    DiceEngine is returned as is, a Generator is wrapped and
+    shares its bit generator.
+    """
+    rng = np.random.default_rng(seed)
+    if isinstance(rng, DiceEngine):
+        return rng
+    return DiceEngine(rng.bit_generator)
+
+
+def roll_many(rng, n, dx=6, k=1):
+    """
+    Totals of k independent rolls of n dX drawn from rng, as an
+    array.
+    """
+    rng = np.random.default_rng(rng)
+    if isinstance(rng, DiceEngine):
+        return rng.roll_many(n, dx, k)
+    return rng.integers(1, dx + 1, size=(k, n)).sum(axis=1)
+
+
+def _restore_dice_engine(bit_generator, buffers, buffer_sizes):
+    engine = DiceEngine(bit_generator)
+    engine._buffers = buffers
+    engine._buffer_sizes = buffer_sizes
+    return engine
+
+
+class DiceExpression:
+    """
+    Compiled dice expression, a sum of independent dice terms
+    c * NdX plus a constant, like '100*6d(cr+4)' or '2d6 + 3'.
+    Build them with dice.
+
+    Besides sampling, the distribution of the total is known
+    exactly: the pmf comes from convolving the pmfs of the dice,
+    and the mean and variance are computed in closed form, so
+    balancing a formula needs no simulation.
+
+    Parameters
+    ----------
+    terms:  iterable of (int, int, int)
+        (multiplier, number of dice, sides) of each dice term.
+
+    constant:  int
+    """
+    def __init__(self, terms, constant=0):
+        self.terms = tuple((c, n, dx) for c, n, dx in terms if c != 0 and n > 0)
+        self.constant = constant
+        self._pmf = None
+
+    def __repr__(self):
+        return f"DiceExpression('{self}')"
+
+    def __str__(self):
+        parts = [f'{n}d{dx}' if abs(c) == 1 else f'{abs(c)}*{n}d{dx}' for c, n, dx in self.terms]
+        signs = ['-' if c < 0 else '+' for c, _, _ in self.terms]
+        if self.constant or not parts:
+            parts.append(str(abs(self.constant)))
+            signs.append('-' if self.constant < 0 else '+')
+        text = ' '.join(f'{sign} {part}' for sign, part in zip(signs, parts))
+        return text[2:] if text.startswith('+') else '-' + text[2:]
+
+    @property
+    def min(self):
+        return self.constant + sum(min(c * n, c * n * dx) for c, n, dx in self.terms)
+
+    @property
+    def max(self):
+        return self.constant + sum(max(c * n, c * n * dx) for c, n, dx in self.terms)
+
+    @property
+    def mean(self):
+        return self.constant + sum(c * n * (dx + 1) / 2 for c, n, dx in self.terms)
+
+    @property
+    def var(self):
+        return sum(c * c * n * (dx * dx - 1) / 12 for c, n, dx in self.terms)
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    def sample(self, size=None, rng=None):
+        """
+        Roll the expression.
+
+        Parameters
+        ----------
+        size:  int, optional
+            Number of independent totals to roll.
+
+        rng:  numpy.random.Generator, optional
+            A DiceEngine serves single rolls from its buffers.
+
+        Returns
+        -------
+        int if size is None, else an array of size totals
+        """
+        if size is None and isinstance(rng, DiceEngine):
+            if len(self.terms) == 1:
+                c, n, dx = self.terms[0]
+                return self.constant + c * rng.roll(n, dx)
+            return self.constant + sum(c * rng.roll(n, dx) for c, n, dx in self.terms)
+        rng = np.random.default_rng(rng)
+        if size is None:
+            return self.constant + sum(c * int(rng.integers(1, dx + 1, size=n).sum()) for c, n, dx in self.terms)
+
+        total = np.full(size, self.constant, dtype=np.int64)
+        for c, n, dx in self.terms:
+            total += c * roll_many(rng, n, dx=dx, k=size)
+        return total
+
+    def pmf(self):
+        """
+        Exact distribution of the total.
+
+        Returns
+        -------
+        values:  numpy.ndarray of int
+            Every possible total, in increasing order.
+
+        probabilities:  numpy.ndarray of float
+            Probability of each total.
+        """
+        if self._pmf is None:
+            # every total is min + a multiple of the gcd of the multipliers
+            step = math.gcd(*(abs(c) for c, _, _ in self.terms)) or 1
+            probabilities = np.ones(1)
+            for c, n, dx in self.terms:
+                term = _dice_pmf(n, dx)
+                if c < 0:
+                    term = term[::-1]
+                stride = abs(c) // step
+                if stride > 1:
+                    spread = np.zeros((len(term) - 1) * stride + 1)
+                    spread[::stride] = term
+                    term = spread
+                probabilities = _convolve(probabilities, term)
+
+            values = self.min + step * np.arange(len(probabilities))
+            possible = probabilities > 0
+            values, probabilities = values[possible], probabilities[possible]
+            values.flags.writeable = False
+            probabilities.flags.writeable = False
+            self._pmf = values, probabilities
+        return self._pmf
+
+    def percentile(self, q):
+        """
+        Smallest total that is at least as large as a fraction
+        q / 100 of the rolls, for q (scalar or array) in [0, 100].
+        """
+        values, probabilities = self.pmf()
+        cdf = np.cumsum(probabilities)
+        # allow for the rounding in cdf, so percentile(50) of 1d2 is 1
+        ind = np.searchsorted(cdf, np.asarray(q) / 100 - 1e-12)
+        return values[np.minimum(ind, len(values) - 1)]
+
+
+def dice(text, **variables):
+    """
+    Compile a dice expression.
+
+    Expressions combine integers, variables, NdX rolls (dX for a
+    single die, d% for d100), +, -, * and parentheses. The number of dice and
+    sides may be expressions themselves, '6d(cr+4)', but dice
+    can only be multiplied by numbers, not by other dice.
+    Fractional numbers of dice, sides and multipliers are rounded
+    down when the expression is compiled, as the treasure tables
+    expect for an average party level.
+
+    Compiled expressions are cached per text and variables.
+
+    Parameters
+    ----------
+    text:  str
+
+    **variables:  int or float
+        Values of the variables used in text.
+
+    Returns
+    -------
+    DiceExpression
+
+    Examples
+    --------
+    >>> dice('100*6d(cr+4)', cr=3).mean
+    2400.0
+    """
+    return _compile_dice(text, tuple(sorted(variables.items())))
+
+
+@lru_cache(maxsize=1024)
+def _compile_dice(text, variables):
+    tokens = []
+    for number, d, name, operator in _dice_token.findall(text):
+        tokens.append(int(number) if number else d or name or operator)
+    tokens.append(None)
+
+    parser = _DiceParser(tokens, dict(variables), text)
+    value = parser.expression()
+    if parser.peek() is not None:
+        raise parser.error(f'unexpected {parser.peek()!r}')
+    if isinstance(value, DiceExpression):
+        return value
+    return DiceExpression((), math.floor(value))
+
+
+class _DiceParser:
+    """
+    Recursive descent parser behind dice. Values are numbers
+    until a roll turns them into DiceExpressions.
+    """
+    def __init__(self, tokens, variables, text):
+        self.tokens = tokens
+        self.variables = variables
+        self.text = text
+        self.position = 0
+
+    def error(self, message):
+        return ValueError(f'invalid dice expression {self.text!r}: {message}')
+
+    def peek(self):
+        return self.tokens[self.position]
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expression(self):
+        value = self.term()
+        while self.peek() in ('+', '-'):
+            sign = 1 if self.take() == '+' else -1
+            value = self.add(value, self.multiply(sign, self.term()))
+        return value
+
+    def term(self):
+        value = self.unary()
+        while self.peek() == '*':
+            self.take()
+            value = self.multiply(value, self.unary())
+        return value
+
+    def unary(self):
+        if self.peek() == '-':
+            self.take()
+            return self.multiply(-1, self.unary())
+        return self.roll()
+
+    def roll(self):
+        count = 1 if self.peek() == 'd' else self.atom()
+        while self.peek() == 'd':
+            self.take()
+            if self.peek() == '%':
+                # percentile die
+                self.take()
+                sides = 100
+            else:
+                sides = self.atom()
+            if isinstance(count, DiceExpression) or isinstance(sides, DiceExpression):
+                raise self.error('the number of dice and sides must be numbers')
+            count, sides = math.floor(count), math.floor(sides)
+            if count < 0 or (count > 0 and sides < 1):
+                raise self.error(f'cannot roll {count}d{sides}')
+            count = DiceExpression(((1, count, sides),))
+        return count
+
+    def atom(self):
+        token = self.take()
+        if isinstance(token, int):
+            return token
+        if token == '(':
+            value = self.expression()
+            if self.take() != ')':
+                raise self.error('missing )')
+            return value
+        if isinstance(token, str) and token.isidentifier():
+            if token not in self.variables:
+                raise self.error(f'no value for {token}')
+            return self.variables[token]
+        raise self.error(f'unexpected {token!r}' if token is not None else 'unexpected end')
+
+    def add(self, a, b):
+        if not isinstance(a, DiceExpression) and not isinstance(b, DiceExpression):
+            return a + b
+        a, b = self.lift(a), self.lift(b)
+        return DiceExpression(a.terms + b.terms, a.constant + b.constant)
+
+    def multiply(self, a, b):
+        if isinstance(a, DiceExpression) and isinstance(b, DiceExpression):
+            raise self.error('dice can only be multiplied by numbers')
+        if isinstance(a, DiceExpression):
+            a, b = b, a
+        if not isinstance(b, DiceExpression):
+            return a * b
+        a = math.floor(a)
+        return DiceExpression(((a * c, n, dx) for c, n, dx in b.terms), a * b.constant)
+
+    @staticmethod
+    def lift(value):
+        if isinstance(value, DiceExpression):
+            return value
+        return DiceExpression((), math.floor(value))
+
+
+@lru_cache(maxsize=None)
+def _dice_pmf(n, dx):
+    """
+    pmf of the total of n dX over n, ..., n * dX, by repeated
+    squaring of the single die pmf.
+    """
+    pmf = np.ones(1)
+    die = np.full(dx, 1 / dx)
+    while n:
+        if n & 1:
+            pmf = _convolve(pmf, die)
+        n >>= 1
+        if n:
+            die = _convolve(die, die)
+    pmf.flags.writeable = False
+    return pmf
+
+
+def _convolve(a, b):
+    if min(len(a), len(b)) < fft_convolve_size:
+        return np.convolve(a, b)
+    from scipy.signal import fftconvolve
+
+    out = fftconvolve(a, b)
+    # fft round off leaves tiny, possibly negative, values where
+    # the probability is 0
+    out[out < 1e-15 * out.max()] = 0
+    return out
@@ -1,11 +1,29 @@
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-from scipy.sparse.csgraph import connected_components, shortest_path
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra, shortest_path
+from scipy.special import comb
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from functools import lru_cache
 from pprint import pprint
 from time import time
 
+from .data import (
+    load_bestiary_index, 
+    load_catalog, 
+    load_level_thresholds, 
+    load_monster_ids, 
+    load_monsters, 
+    load_player_exp
+)
+from .dice import DiceEngine, dice, dice_engine, roll_many
+from .encounter_index import has_encounter
+from .treasure_tables import (
+    art_tables, gem_tables, hoard_rolls, hoard_tables, magic_item_names, magic_item_thresholds
+)
+
 
 class Dungeon:
     # constant variables
@@ -24,6 +42,7 @@ class Dungeon:
     easy_value = 1
     trivial_value = 0
     party_value = -1
+    difficulty_values = np.array((trivial_value, easy_value, medium_value, hard_value, deadly_value, too_hard_value))
     
     treasure_hoard_value = -2
     treasure_chest_value_easy = -5
@@ -55,6 +74,7 @@ class Dungeon:
     treasure_threshold_small = 4
     treasure_threshold_medium = 10
     treasure_threshold_large = 16
+    treasure_thresholds = (treasure_threshold_small, treasure_threshold_medium, treasure_threshold_large)
     copper_piece_keyword = 'CP'
     silver_piece_keyword = 'SP'
     electrum_piece_keyword = 'EP'
@@ -65,6 +85,65 @@ class Dungeon:
     magic_items_keyword = 'magic items'
     coins_keyword = 'coins'
     
+    # dice formulas for the coins of a treasure hoard, up to the 
+    # small, medium and large treasure thresholds and above, see 
+    # hoard_coin_dice. using cr + 4 (for ex.) scales treasure more 
+    # continuously. 3 values are the expected values of min_cr, 
+    # avg_cr, max_cr
+    hoard_coin_formulas = (
+        {
+            copper_piece_keyword: '100*6d(cr+4)',  # 1800, 2250, 2700
+            silver_piece_keyword: '100*3d(cr+4)',  # 900, 1125, 1350
+            gold_piece_keyword: '10*2d(cr+4)'  # 60, 75, 90
+        },
+        {
+            copper_piece_keyword: '100*2d(cr-1)',  # 500, 750, 1000
+            silver_piece_keyword: '1000*2d(cr-1)',  # 5000, 7500, 10000
+            gold_piece_keyword: '100*6d(cr-1)',  # 1500, 2250, 3000
+            platinum_piece_keyword: '10*3d(cr-1)'  # 75, 112.5, 150
+        },
+        {
+            gold_piece_keyword: '1000*4d(cr-7)',  # 10000, 15000, 20000
+            platinum_piece_keyword: '100*5d(cr-7)'  # 1250, 1875, 2500
+        },
+        {
+            gold_piece_keyword: '1000*12d6',  # 42000
+            platinum_piece_keyword: '1000*8d6'  # 28000
+        }
+    )
+    # magic item table of the item in a chest, per chest difficulty
+    # and treasure band, see generate_magic_item
+    chest_magic_item_tables = (
+        {easy_value: 'A', medium_value: 'B', hard_value: 'C'},
+        {easy_value: 'B', medium_value: 'C', hard_value: 'D'},
+        {easy_value: 'C', medium_value: 'D', hard_value: 'E'},
+        {easy_value: 'D', medium_value: 'E', hard_value: 'F'}
+    )
+    # the same for the coins in a chest, per chest difficulty, see
+    # chest_coin_dice
+    chest_coin_formulas = (
+        {
+            easy_value: {copper_piece_keyword: '5d6'},
+            medium_value: {silver_piece_keyword: '4d6'},
+            hard_value: {gold_piece_keyword: '3d6'}
+        },
+        {
+            easy_value: {copper_piece_keyword: '100*4d6', electrum_piece_keyword: '10*1d6'},
+            medium_value: {silver_piece_keyword: '10*6d6', gold_piece_keyword: '10*2d6'},
+            hard_value: {electrum_piece_keyword: '10*3d6', gold_piece_keyword: '10*2d6'}
+        },
+        {
+            easy_value: {silver_piece_keyword: '100*4d6', gold_piece_keyword: '100*1d6'},
+            medium_value: {electrum_piece_keyword: '100*1d6', gold_piece_keyword: '100*1d6'},
+            hard_value: {gold_piece_keyword: '100*2d6', platinum_piece_keyword: '10*1d6'}
+        },
+        {
+            easy_value: {electrum_piece_keyword: '1000*2d6', gold_piece_keyword: '100*8d6'},
+            medium_value: {gold_piece_keyword: '1000*1d6', platinum_piece_keyword: '100*1d6'},
+            hard_value: {gold_piece_keyword: '1000*1d6', platinum_piece_keyword: '100*2d6'}
+        }
+    )
+    
     square_density = 3
     max_connected_components = 1
     background_color = np.array((204, 204, 204))/255
@@ -79,11 +158,25 @@ class Dungeon:
     trap_marker_scale = 30
     
     visibility_distance = 2
+    distance_field_cache_size = 32
     adjacency_distance = 1
     encounter_trigger_distance = visibility_distance
     distance_between_encounters = 2 * encounter_trigger_distance
     distance_between_traps = 2 * visibility_distance
     min_monsters = 1
+    # restarts of generate_encounter from an empty encounter before
+    # it gives up, see _check_encounter_difficulties
+    max_encounter_attempts = 1000
+    
+    # adjusted xp multiplier for up to 1, 2, 6, 10, 14 and more
+    # monsters, see _monster_quantity_multiplier
+    monster_quantity_brackets = np.array((1, 2, 6, 10, 14))
+    monster_quantity_multipliers = np.array((1, 1.5, 2, 2.5, 3, 4))
+    # the same brackets as integer ranges of quantities, with the 
+    # multipliers doubled, see _min_quantity
+    monster_quantity_first = np.concatenate(((0,), monster_quantity_brackets + 1))
+    monster_quantity_last = np.append(monster_quantity_brackets, np.iinfo(int).max)
+    monster_quantity_doubled = (2 * monster_quantity_multipliers).astype(int)
         
     right_keyword = 'd'
     left_keyword = 'a'
@@ -108,6 +201,7 @@ class Dungeon:
     trap_threshold_small = treasure_threshold_small
     trap_threshold_medium = treasure_threshold_medium
     trap_threshold_large = treasure_threshold_large
+    trap_thresholds = (trap_threshold_small, trap_threshold_medium, trap_threshold_large)
 
     severity_setback_keyword = 'Setback'
     severity_setback_dc = 10
@@ -136,6 +230,32 @@ class Dungeon:
         severity_dangerous_keyword: severity_dangerous_attack_bonus,
         severity_deadly_keyword: severity_deadly_attack_bonus
     }
+
+    # dice formulas for trap damage, up to the small, medium and 
+    # large trap thresholds and above, see trap_damage_dice.
+    # threshold is the upper threshold of the band
+    trap_damage_formulas = (
+        {
+            severity_setback_keyword: '1d(10-threshold+cr)',
+            severity_dangerous_keyword: '2d(10-threshold+cr)',
+            severity_deadly_keyword: '4d(10-threshold+cr)'
+        },
+        {
+            severity_setback_keyword: '2d(10-threshold+cr)',
+            severity_dangerous_keyword: '4d(10-threshold+cr)',
+            severity_deadly_keyword: '10d(10-threshold+cr)'
+        },
+        {
+            severity_setback_keyword: '4d(10-threshold+cr)',
+            severity_dangerous_keyword: '10d(10-threshold+cr)',
+            severity_deadly_keyword: '18d(10-threshold+cr)'
+        },
+        {
+            severity_setback_keyword: '10d10',
+            severity_dangerous_keyword: '18d10',
+            severity_deadly_keyword: '24d10'
+        }
+    )
     
     num_traps = 3
     invisible_trap_value = -10
@@ -146,9 +266,22 @@ class Dungeon:
     vertical_keyword = 'vertical'
     horizontal_keyword = 'horizontal'
     
+    # map generation modes, see generate_map
+    rejection_keyword = 'rejection'
+    repair_keyword = 'repair'
+    
     closed_door_value = 0.75
     open_door_value = 0.25
     
+    # walls and doors are stored as uint8 codes in A_codes and B_codes,
+    # ordered like the values they stand for (so anything below 
+    # closed_door_code can be walked through)
+    open_code = 0
+    open_door_code = 1
+    closed_door_code = 2
+    wall_code = 3
+    wall_code_values = np.array((0, open_door_value, closed_door_value, 1))
+    
     # TODO: implement marker type dict
     color_dict = {
         visible_trap_value: 'darkorchid',
@@ -177,13 +310,20 @@ class Dungeon:
         right_keyword: '>'
     }
 
-    def __init__(self, party, highest_passive_perception, m=10, n=10, p_wall=0.3, include_doors=True, doors_open=False, plot_size=10, visible_traps=False):
+    def __init__(self, party, highest_passive_perception, m=10, n=10, p_wall=0.3, include_doors=True, doors_open=False, plot_size=10, visible_traps=False, generation_mode='rejection', p_door=1, walls=None, seed=None, remote_data=False, encounter_index=None, theme=None):
+        # every random draw goes through this generator, so a 
+        # dungeon can be reproduced from its seed; it is a 
+        # DiceEngine, so _roll serves dice from its buffers
+        self.rng = dice_engine(seed)
         self.party = party
         self.avg_party_level = self._avg_party_level(party)
         self.highest_passive_perception = highest_passive_perception
         
+        if walls is not None:
+            m, n = walls[0].shape[0], walls[1].shape[1]
         self.m = m
         self.n = n
+        self.walls = walls
         self.p_wall = p_wall
         self.plot_size = plot_size
         self.latest_direction = 's'
@@ -191,20 +331,128 @@ class Dungeon:
         self.temp_print = list()
         self.include_doors = include_doors
         self.doors_open = doors_open
+        self.p_door = p_door
+        self.generation_mode = generation_mode
         
         if visible_traps:
             self.invisible_trap_value = self.visible_trap_value
+        
+        # bumped every time C is reassigned, see distance_field
+        self.graph_version = 0
+        self._distance_fields = OrderedDict()  # LRU of source -> (graph_version, field)
                 
         self.generate_map()
+        walls = (self.A_codes.copy(), self.B_codes.copy())
         self.place_encounters_and_traps()
-        self.C = self._adjacency(self.A, self.B) # after encounter placement, update adjacency
+        # after encounter placement, update adjacency if the walls 
+        # changed; reassigning C bumps graph_version and would drop
+        # the distance fields placement just cached
+        if not (np.array_equal(walls[0], self.A_codes) and np.array_equal(walls[1], self.B_codes)):
+            self.C = self._adjacency(self.A_codes, self.B_codes)
         
-        self.player_exp_df = pd.read_csv(self.player_exp_df_url, index_col=0)
-        self.monster_df = pd.read_csv(self.monster_df_url, index_col=0)
-        self.monster_df['cr'] = self.monster_df.apply(self._extract_cr, axis=1)
+        # the tables are parsed once per process and shared by 
+        # every dungeon (see load_catalog); set remote_data to fetch
+        # them from player_exp_df_url and monster_df_url instead of
+        # the CSVs bundled with the package
+        # theme restricts the monsters encounters are built from, 
+        # e.g. {'type': 'undead', 'legendary': False}, see 
+        # BestiaryIndex
+        monster_source = self.monster_df_url if remote_data else None
+        self.theme = theme
+        self._setup_encounters(
+            self.player_exp_df_url if remote_data else None,
+            monster_source,
+            encounter_index=encounter_index,
+            theme_mask=None if theme is None else load_bestiary_index(monster_source).mask(theme)
+        )
         
         self.generate_all_encounters()
 
+    # properties
+    @property
+    def A(self):
+        """
+        Vertical walls as float values (0, open_door_value, 
+        closed_door_value or 1), derived from A_codes. The 
+        array is read only: write to A_codes, or assign a whole
+        array (d.A = A), which is converted back to codes.
+        """
+        A = self.wall_code_values[self.A_codes]
+        A.flags.writeable = False
+        return A
+    
+    @A.setter
+    def A(self, A):
+        self.A_codes = self._wall_codes(A)
+    
+    @property
+    def B(self):
+        """
+        Horizontal walls as float values (0, open_door_value, 
+        closed_door_value or 1), derived from B_codes. The 
+        array is read only, see A.
+        """
+        B = self.wall_code_values[self.B_codes]
+        B.flags.writeable = False
+        return B
+    
+    @B.setter
+    def B(self, B):
+        self.B_codes = self._wall_codes(B)
+    
+    @property
+    def C(self):
+        """
+        Sparse adjacency matrix of the dungeon. Assigning a new 
+        matrix bumps graph_version so that cached distance 
+        fields are recomputed.
+        """
+        return self._C
+    
+    @C.setter
+    def C(self, C):
+        self._C = C
+        self.graph_version += 1
+    
+    @property
+    def D(self):
+        """
+        Dense (square_density*m x square_density*n) float grid 
+        of entity values, derived from the m x n int8 grid 
+        entities. The array is read only: write to entities, or
+        assign a whole dense grid (d.D = D), whose entity squares
+        are copied back into entities.
+        """
+        D = np.zeros((self.square_density*self.m, self.square_density*self.n))
+        D[1::self.square_density, 1::self.square_density] = self.entities
+        D.flags.writeable = False
+        return D
+    
+    @D.setter
+    def D(self, D):
+        self.entities = np.asarray(D)[1::self.square_density, 1::self.square_density].astype(np.int8)
+    
+    @property
+    def monster_df(self):
+        """
+        The monster table as a pandas.DataFrame indexed by name,
+        see load_monsters. Encounters are built from the compiled
+        catalog instead, pandas is only imported on first access.
+        """
+        if self._monster_df is None:
+            self._monster_df = load_monsters(self._monster_source).copy(deep=False)
+        return self._monster_df
+    
+    @property
+    def player_exp_df(self):
+        """
+        The xp thresholds per player level as a pandas.DataFrame,
+        see load_player_exp and monster_df.
+        """
+        if self._player_exp_df is None:
+            self._player_exp_df = load_player_exp(self._player_exp_source).copy(deep=False)
+        return self._player_exp_df
+
     # methods
     def check_for_encounter(self):
         # TODO: check why this is here and in 
@@ -212,17 +460,17 @@ class Dungeon:
         if self.deadly_keyword not in self.encounter_locs:
             return
         
-        short_paths = shortest_path(self.C)
+        # encounters don't move, so their fields stay cached 
+        # between steps and only the party's index changes
+        party_ind = self._get_ind(*self._dense_to_granular(*self.party_location))
         closest_encounter = self.deadly_keyword
-        closest_dist = short_paths[
-            self._get_ind(*self._dense_to_granular(*self.party_location)), 
-            self._get_ind(*self._dense_to_granular(*self.encounter_locs[closest_encounter]))
-        ]
+        closest_dist = self.distance_field(
+            self._dense_to_granular(*self.encounter_locs[closest_encounter])
+        )[party_ind]
         for diff in self.encounter_locs:
-            new_dist = short_paths[
-                self._get_ind(*self._dense_to_granular(*self.party_location)), 
-                self._get_ind(*self._dense_to_granular(*self.encounter_locs[diff]))
-            ]
+            new_dist = self.distance_field(
+                self._dense_to_granular(*self.encounter_locs[diff])
+            )[party_ind]
             if new_dist < closest_dist:
                 closest_encounter = diff
                 closest_dist = new_dist
@@ -232,10 +480,9 @@ class Dungeon:
             encounter_i, encounter_j = self._dense_to_granular(*self.encounter_locs[closest_encounter])
             
             # number of paths to get from party to encounter in 2 steps
-            num_paths = (self.C@self.C)[
-                self._get_ind(party_i, party_j), 
-                self._get_ind(encounter_i, encounter_j)
-            ]
+            num_paths = self.C[self._get_ind(party_i, party_j)].multiply(
+                self.C[self._get_ind(encounter_i, encounter_j)]
+            ).sum()
             num_paths_threshold = 1  # if there is more than one path, then there is no wall
             
             if (party_i == encounter_i) or (party_j == encounter_j):
@@ -254,32 +501,29 @@ class Dungeon:
         if self.deadly_keyword not in self.encounter_locs:
             return
         
-        short_paths = shortest_path(self.C)
+        party_ind = self._get_ind(*self._dense_to_granular(*self.party_location))
 
         for trap_loc in self.trap_locs:
-            if self.D[trap_loc[0], trap_loc[1]]  == 0:
+            if self._entity(*trap_loc) == 0:
                 continue
-            dist = short_paths[
-                self._get_ind(*self._dense_to_granular(*self.party_location)), 
-                self._get_ind(*self._dense_to_granular(*trap_loc))
-            ]
+            dist = self.distance_field(self._dense_to_granular(*trap_loc))[party_ind]
             if dist > self.visibility_distance:
                 continue
-            elif self.D[trap_loc[0], trap_loc[1]] == self.visible_trap_value:
+            elif self._entity(*trap_loc) == self.visible_trap_value:
                 pass
             elif dist == self.visibility_distance:
-                if (self._roll(1, dx=20) + self.trap_concealment_bonus_large) <= self.highest_passive_perception:
+                if (self._roll(1, dx=20, rng=self.rng) + self.trap_concealment_bonus_large) <= self.highest_passive_perception:
                     # failed concealment check
-                    self.D[trap_loc[0], trap_loc[1]] = self.visible_trap_value
+                    self._set_entity(*trap_loc, self.visible_trap_value)
                     
                 else:
                     # passed concealment check
                     continue
             
             elif (dist < self.visibility_distance) and (dist > 0):
-                if (self._roll(1, dx=20) + self.trap_concealment_bonus_small) <= self.highest_passive_perception:
+                if (self._roll(1, dx=20, rng=self.rng) + self.trap_concealment_bonus_small) <= self.highest_passive_perception:
                     # failed concealment check
-                    self.D[trap_loc[0], trap_loc[1]] = self.visible_trap_value
+                    self._set_entity(*trap_loc, self.visible_trap_value)
                     
                 else:
                     # passed concealment check
@@ -291,6 +535,35 @@ class Dungeon:
             else:
                 raise ValueError(f"Invalid distance: {dist}")
     
+    def distance_field(self, source):
+        """
+        Number of steps from the granular square source to 
+        every square in the dungeon, found with one single 
+        source search over C. Unreachable squares are np.inf.
+
+        The result is indexed like C (use self._get_ind) and is 
+        cached per (source, graph_version), so it is returned 
+        read only. The cache keeps the distance_field_cache_size
+        most recently used fields, and fields still in it when 
+        a door is opened are repaired rather than recomputed
+        (see _repair_distance_fields).
+        """
+        ind = self._get_ind(*source)
+        if ind in self._distance_fields:
+            version, dist = self._distance_fields[ind]
+            if version == self.graph_version:
+                self._distance_fields.move_to_end(ind)
+                return dist
+        
+        dist = shortest_path(self.C, indices=ind, unweighted=True)
+        dist.flags.writeable = False
+        self._distance_fields[ind] = (self.graph_version, dist)
+        self._distance_fields.move_to_end(ind)
+        while len(self._distance_fields) > self.distance_field_cache_size:
+            self._distance_fields.popitem(last=False)
+        
+        return dist
+    
     def generate_map(self):
         """
         Given dimensions m and n, generate a dungeon map.
@@ -303,115 +576,93 @@ class Dungeon:
         p_wall:  float, optional
             Float between 0 and 1, specifies the density of
             walls within the dungeon.
+
+        generation_mode:  str, optional
+            'rejection' redraws the walls until the dungeon is
+            connected. 'repair' draws the walls once and then
+            removes the fewest walls needed to connect it, so 
+            it always finishes in one pass.
+
+        p_door:  float, optional
+            Float between 0 and 1, the probability that a slot 
+            that looks like a doorway gets a door.
+
+        walls:  tuple of numpy arrays, optional
+            Pre-generated (A_codes, B_codes) wall codes, e.g. one
+            map from Dungeon.generate_maps, used instead of 
+            drawing new walls. Doors are still added.
         
 
         Returns
         -------
-        A:  numpy array
-            Array representing the vertical walls within the 
-            dungeon. If A[i, j] is 1, there is a wall at i, j.
-            A is m x n-1.
-
-        B:  numpy array
-            Array representing the horizontal walls within the 
-            dungeon. If B[i, j] is 1, there is a wall at i, j.
-            B is m-1 x n.
-
-        C:  numpy array
+        A_codes:  numpy array
+            uint8 array representing the vertical walls within 
+            the dungeon. If A_codes[i, j] is wall_code, there is 
+            a wall at i, j. A_codes is m x n-1. A gives the same
+            walls as float values.
+
+        B_codes:  numpy array
+            uint8 array representing the horizontal walls within
+            the dungeon. If B_codes[i, j] is wall_code, there is 
+            a wall at i, j. B_codes is m-1 x n. B gives the same
+            walls as float values.
+
+        C:  scipy.sparse.csr_matrix
             Undirected adjacency matrix for the dungeon. C[i, j]
             is 1 if the jth square is adjacent to the ith square.
             Used to determine connected components.
-            C is m*n x m*n.
+            C is m*n x m*n, stored sparsely.
 
         """
         m = self.m
         n = self.n
         p_wall = self.p_wall
 
-        # get random wall matrices using p_wall
-        A = np.random.choice(2, size=(m, n-1), p=[1-p_wall, p_wall]).astype(float)
-        B = np.random.choice(2, size=(m-1, n), p=[1-p_wall, p_wall]).astype(float)
-        C = self._adjacency(A, B).astype(float)
+        if self.walls is not None:
+            # pre-generated walls are only repaired, never redrawn
+            A, B = (np.array(walls, dtype=np.uint8) for walls in self.walls)
+            A, B = self._connect_walls(A, B, rng=self.rng)
+        else:
+            # get random wall matrices using p_wall
+            A = self.wall_code * self.rng.choice(2, size=(m, n-1), p=[1-p_wall, p_wall]).astype(np.uint8)
+            B = self.wall_code * self.rng.choice(2, size=(m-1, n), p=[1-p_wall, p_wall]).astype(np.uint8)
+            if self.generation_mode == self.repair_keyword:
+                A, B = self._connect_walls(A, B, rng=self.rng)
+            elif self.generation_mode != self.rejection_keyword:
+                raise ValueError(f"Invalid generation mode: {self.generation_mode}")
+        C = self._adjacency(A, B)
 
         # loop until connected components condition is satisfied
         # TODO: add either a maxiter or a timeout
         while connected_components(C)[0] > self.max_connected_components:
-            A = np.random.choice(2, size=(m, n-1), p=[1-p_wall, p_wall]).astype(float)
-            B = np.random.choice(2, size=(m-1, n), p=[1-p_wall, p_wall]).astype(float)
-            C = self._adjacency(A, B).astype(float)
+            A = self.wall_code * self.rng.choice(2, size=(m, n-1), p=[1-p_wall, p_wall]).astype(np.uint8)
+            B = self.wall_code * self.rng.choice(2, size=(m-1, n), p=[1-p_wall, p_wall]).astype(np.uint8)
+            C = self._adjacency(A, B)
         
         if self.include_doors:
-            # once A, B, and C are fixed, go back through and add doors
-            for i, j in self._indices(A):
-                if A[i, j] == 1:  # if there's already a wall
-                    pass
-                else:
-                    # check for walls connecting to the top end
-                    top = False
-                    if i == 0:
-                        top = True
-                    else:
-                        if A[i-1, j] == 1:
-                            top = True
-                        elif (B[i-1, j] == 1) or (B[i-1, j+1] == 1):
-                            top = True
-
-                    # check for walls connecting to the bottom end
-                    bottom = False
-                    if i == m-1:
-                        bottom = True
-                    else:
-                        if A[i+1, j] == 1:
-                            bottom = True
-                        elif (B[i, j] == 1) or (B[i, j+1] == 1):
-                            bottom = True
-
-                    if top and bottom:
-                        A[i, j] = self.closed_door_value
-                        temp_adj = self._adjacency(A, B)
-                        if np.sum(temp_adj[self._get_ind(i, j)]) <= 1:
-                            A[i, j] = 0
-                        elif np.sum(temp_adj[self._get_ind(i, j+1)]) <= 1:
-                            A[i, j] = 0
+            # once A, B, and C are fixed, go back through and add doors.
+            # degree counts each square's open neighbours and is kept 
+            # up to date as doors close, so no door can seal off a square
+            A_doors, B_doors = self._door_candidates(A, B)
+            degree = self._degree(A, B)
+            for i, j in np.argwhere(A_doors):
+                if (degree[i, j] > 1) and (degree[i, j+1] > 1):
+                    A[i, j] = self.closed_door_code
+                    degree[i, j] -= 1
+                    degree[i, j+1] -= 1
                             
-            for i, j in self._indices(B):
-                if B[i, j] == 1:  # if there's already a wall
-                    pass
-                else:
-                    # check for walls connecting to the left end
-                    left = False
-                    if j == 0:
-                        left = True
-                    else:
-                        if B[i, j-1] == 1:
-                            left = True
-                        elif (A[i, j-1] == 1) or (A[i+1, j-1] == 1):
-                            left = True
-
-                    # check for walls connecting to the right end
-                    right = False
-                    if j == n-1:
-                        right = True
-                    else:
-                        if B[i, j+1] == 1:
-                            right = True
-                        elif (A[i, j] == 1) or (A[i+1, j] == 1):
-                            right = True
-
-                    if left and right:
-                        B[i, j] = self.closed_door_value
-                        temp_adj = self._adjacency(A, B)
-                        if np.sum(temp_adj[self._get_ind(i, j)]) <= 1:
-                            B[i, j] = 0
-                        elif np.sum(temp_adj[self._get_ind(i+1, j)]) <= 1:
-                            B[i, j] = 0
+            for i, j in np.argwhere(B_doors):
+                if (degree[i, j] > 1) and (degree[i+1, j] > 1):
+                    B[i, j] = self.closed_door_code
+                    degree[i, j] -= 1
+                    degree[i+1, j] -= 1
         
         if self.doors_open:
-            A[A == self.closed_door_value] = self.open_door_value
-            B[B == self.closed_door_value] = self.open_door_value
+            A[A == self.closed_door_code] = self.open_door_code
+            B[B == self.closed_door_code] = self.open_door_code
         
-        self.A = A  # vertical walls
-        self.B = B  # horizontal walls
+        self.A_codes = A  # vertical walls
+        self.B_codes = B  # horizontal walls
         self.C = C  # adjacency matrix
     
     def generate_all_encounters(self):
@@ -423,114 +674,111 @@ class Dungeon:
         }
     
     def generate_encounter(self, difficulty_keyword):
-        party = self.party
-
         difficulty_value = self.difficulty_dict[difficulty_keyword]
+        
+        if self.encounter_index is not None:
+            return self.encounter_index.sample(difficulty_value, rng=self.rng)
 
-        monsters = dict()
-
-        available_monsters = list(self.monster_df.index[
-            self.monster_df.apply(self._cr_threshold, axis=1)
-        ])
+        for _ in range(self.max_encounter_attempts):
+            encounter = self._build_encounter(difficulty_value)
+            if encounter is not None:
+                return encounter
+        
+        raise ValueError(
+            f'no {difficulty_keyword} encounter for party {self.party} '
+            f'after {self.max_encounter_attempts} attempts'
+        )
+    
+    def generate_encounter_xp(self, xp, max_monsters=15):
+        """
+        Encounter whose adjusted xp hits a target, as a knapsack
+        over the monsters the party can face (cr_mask).
+
+        Monsters are grouped by xp and a dynamic program over the
+        groups counts the encounters of every size, up to 
+        max_monsters, and every unadjusted xp. Adjusted xp then 
+        follows from the size's multiplier. The encounter is drawn
+        uniformly among all encounters (multisets of monsters) at
+        the smallest distance from the target, by walking back 
+        through the tables. Time and memory are bounded by 
+        groups * max_monsters**2 * (high + largest xp) / 5.
 
-        while self._encounter_difficulty(monsters) < difficulty_value:
-            available_monsters = self._get_available_monsters(monsters, available_monsters, difficulty_value)
-            if len(available_monsters) == 0:
-                return self.generate_encounter(difficulty_value)
-            
-            p = self.monster_df[self.monster_df.index.isin(available_monsters)]['cr']
-                
-            monster = np.random.choice(
-                available_monsters, 
-                p=p/p.sum()
-            )
-            monsters[monster] = self.min_monsters
+        Parameters
+        ----------
+        xp:  int or (int, int)
+            Adjusted xp to hit, or an inclusive (low, high) range.
 
-            max_monster_quantity = self._max_monsters(monsters, monster, difficulty_value)
-            monsters[monster] = np.random.randint(self.min_monsters, max_monster_quantity + 1)
+        max_monsters:  int
+            Largest number of monsters in the encounter.
 
-        return monsters
+        Returns
+        -------
+        dict of monster name to quantity
+        """
+        low, high = (xp, xp) if np.isscalar(xp) else xp
+        members = np.flatnonzero(self.cr_mask)
+        if len(members) == 0 or max_monsters < self.min_monsters:
+            raise ValueError('no monsters to build an encounter from')
+        
+        members = members[np.argsort(self.monster_xp[members], kind='stable')]
+        class_xp, class_start, class_size = np.unique(
+            self.monster_xp[members], return_index=True, return_counts=True
+        )
+        unit = np.gcd.reduce(class_xp)
+        class_units = class_xp // unit
+        
+        # an encounter past the target only gets closer by dropping
+        # a monster, so nothing above high plus one monster matters
+        width = int(high // unit + class_units[-1]) + 1
+        
+        # ways[t, x]: encounters of t monsters and x units of xp, 
+        # tables[c] before monsters of class c were added
+        ways = np.zeros((max_monsters + 1, width))
+        ways[0, 0] = 1
+        tables = []
+        for size, units in zip(class_size, class_units):
+            tables.append(ways)
+            ways = ways.copy()
+            for k in range(1, min(max_monsters, (width - 1) // units) + 1):
+                ways[k:, k * units:] += comb(size + k - 1, k) * tables[-1][:-k, :width - k * units]
+        
+        monsters = np.arange(max_monsters + 1)[:, None]
+        doubled_xp = 2 * self._monster_quantity_multiplier(monsters) * np.arange(width) * unit
+        distance = np.maximum(np.maximum(2 * low - doubled_xp, doubled_xp - 2 * high), 0)
+        distance[(ways == 0) | (monsters < self.min_monsters)] = np.inf
+        
+        best = np.flatnonzero(distance == distance.min())
+        cell = self.rng.choice(best, p=ways.flat[best] / ways.flat[best].sum())
+        t, x = np.unravel_index(cell, ways.shape)
+        
+        encounter = dict()
+        for c in range(len(class_xp) - 1, -1, -1):
+            k = np.arange(min(t, x // class_units[c]) + 1)
+            p = comb(class_size[c] + k - 1, k) * tables[c][t - k, x - k * class_units[c]]
+            k = self.rng.choice(k, p=p / p.sum())
+            t, x = t - k, x - k * class_units[c]
+            
+            # k monsters from the class with repetition, uniformly
+            # over multisets (stars and bars)
+            bars = np.sort(self.rng.choice(class_size[c] + k - 1, size=class_size[c] - 1, replace=False))
+            counts = np.diff(np.concatenate(((-1,), bars, (class_size[c] + k - 1,)))) - 1
+            for i in np.flatnonzero(counts):
+                encounter[self.monster_names[members[class_start[c] + i]]] = int(counts[i])
+        
+        return encounter
     
     def generate_magic_item(self, difficulty):
-        cr = self._avg_party_level(self.party)
-        if cr <= self.treasure_threshold_small:
-            if difficulty == self.easy_value:
-                return self._magic_item_table_A()
-            elif difficulty == self.medium_value:
-                return self._magic_item_table_B()
-            elif difficulty == self.hard_value:
-                return self._magic_item_table_C()
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
-        elif cr <= self.treasure_threshold_medium:
-            if difficulty == self.easy_value:
-                return self._magic_item_table_B()
-            elif difficulty == self.medium_value:
-                return self._magic_item_table_C()
-            elif difficulty == self.hard_value:
-                return self._magic_item_table_D()
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
-        elif cr <= self.treasure_threshold_large:
-            if difficulty == self.easy_value:
-                return self._magic_item_table_C()
-            elif difficulty == self.medium_value:
-                return self._magic_item_table_D()
-            elif difficulty == self.hard_value:
-                return self._magic_item_table_E()
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
-        else:
-            if difficulty == self.easy_value:
-                return self._magic_item_table_D()
-            elif difficulty == self.medium_value:
-                return self._magic_item_table_E()
-            elif difficulty == self.hard_value:
-                return self._magic_item_table_F()
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
+        tables = self.chest_magic_item_tables[self._band(self.avg_party_level, self.treasure_thresholds)]
+        if difficulty not in tables:
+            raise ValueError(f"Invalid difficulty: {difficulty}")
+        return self._magic_items(tables[difficulty], 1, rng=self.rng)[0]
     
     def generate_chest_coins(self, difficulty):
-        cr = self._avg_party_level(self.party)
-        if cr <= self.treasure_threshold_small:
-            if difficulty == self.easy_value:
-                return f"{self._roll(5, dx=6)} {self.copper_piece_keyword}"
-            elif difficulty == self.medium_value:
-                return f"{self._roll(4, dx=6)} {self.silver_piece_keyword}"
-            elif difficulty == self.hard_value:
-                return f"{self._roll(3, dx=6)} {self.gold_piece_keyword}"
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
-        elif cr <= self.treasure_threshold_medium:
-            if difficulty == self.easy_value:
-                return f"{100 * self._roll(4, dx=6)} {self.copper_piece_keyword} and {10 * self._roll(1, dx=6)} {self.electrum_piece_keyword}"
-            elif difficulty == self.medium_value:
-                return f"{10 * self._roll(6, dx=6)} {self.silver_piece_keyword} and {10 * self._roll(2, dx=6)} {self.gold_piece_keyword}"
-            elif difficulty == self.hard_value:
-                return f"{10 * self._roll(3, dx=6)} {self.electrum_piece_keyword} and {10 * self._roll(2, dx=6)} {self.gold_piece_keyword}"
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
-        elif cr <= self.treasure_threshold_large:
-            if difficulty == self.easy_value:
-                return f"{100 * self._roll(4, dx=6)} {self.silver_piece_keyword} and {100 * self._roll(1, dx=6)} {self.gold_piece_keyword}"
-            elif difficulty == self.medium_value:
-                return f"{100 * self._roll(1, dx=6)} {self.electrum_piece_keyword} and {100 * self._roll(1, dx=6)} {self.gold_piece_keyword}"
-            elif difficulty == self.hard_value:
-                return f"{100 * self._roll(2, dx=6)} {self.gold_piece_keyword} and {10 * self._roll(1, dx=6)} {self.platinum_piece_keyword}"
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
-        else:
-            if difficulty == self.easy_value:
-                return f"{1000 * self._roll(2, dx=6)} {self.electrum_piece_keyword} and {100 * self._roll(8, dx=6)} {self.gold_piece_keyword}"
-            elif difficulty == self.medium_value:
-                return f"{1000 * self._roll(1, dx=6)} {self.gold_piece_keyword} and {100 * self._roll(1, dx=6)} {self.platinum_piece_keyword}"
-            elif difficulty == self.hard_value:
-                return f"{1000 * self._roll(1, dx=6)} {self.gold_piece_keyword} and {100 * self._roll(2, dx=6)} {self.platinum_piece_keyword}"
-            else:
-                raise ValueError(f"Invalid difficulty: {difficulty}")
+        coin_dice = self._chest_coin_dice(self.avg_party_level, difficulty)
+        return ' and '.join(f"{expression.sample(rng=self.rng)} {coin}" for coin, expression in coin_dice)
     
     def generate_trap(self):
-        severity_roll = self._roll(1, dx=6)
+        severity_roll = self._roll(1, dx=6, rng=self.rng)
         if severity_roll in {1, 2}:
             severity = self.severity_setback_keyword
         elif severity_roll in {3, 4, 5}:
@@ -538,10 +786,10 @@ class Dungeon:
         else:
             severity = self.severity_deadly_keyword
 
-        effect_roll = self._roll(1, dx=100)
+        effect_roll = self._roll(1, dx=100, rng=self.rng)
         if effect_roll <= 4:
             effect = '*Magic missiles* shoot from a statue or object'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Statue, arcane motion sensor (Arcana; Arcane Focus)",
@@ -549,7 +797,7 @@ class Dungeon:
             ])
         elif effect_roll <= 7:
             effect = 'Collapsing staircase creates a ramp that deposits characters into a pit at its lower end'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Collapsing step (Dexterity; Tinker's tools, Carpenter's tools, Mason's tools)",
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
@@ -557,14 +805,14 @@ class Dungeon:
             ])
         elif effect_roll <= 10:
             effect = 'Ceiling block falls, or entire ceiling collapses'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
             ])
         elif effect_roll <= 12:
             effect = 'Ceiling lowers slowly in locked room'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -572,14 +820,14 @@ class Dungeon:
             ])
         elif effect_roll <= 14:
             effect = 'Chute opens in floor'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Trap door (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane proximity sensor (Arcana; Arcane Focus)",
             ])
         elif effect_roll <= 16:
             effect = 'Clanging noise attracts nearby monsters'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Statue, arcane motion sensor (Arcana; Arcane Focus)",
@@ -588,7 +836,7 @@ class Dungeon:
             ])
         elif effect_roll <= 19:
             effect = 'Touching an object triggers a *disintegrate* spell'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Sword, arcane touch sensor (Arcana; Arcane Focus)",
                 "Statue, arcane touch sensor (Arcana; Arcane Focus)",
                 "Table, arcane touch sensor (Arcana; Arcane Focus)",
@@ -602,7 +850,7 @@ class Dungeon:
             ])
         elif effect_roll <= 23:
             effect = 'Door or other object is coated with contact poison'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Sword, coated with chemicals (Arcana; Arcane Focus)",
                 "Statue, coated with chemicals (Intelligence; Alchemist's supplies, Brewer's supplies, Cook's utensils)",
                 "Table, coated with chemicals (Intelligence; Alchemist's supplies, Brewer's supplies, Cook's utensils)",
@@ -616,7 +864,7 @@ class Dungeon:
             ])
         elif effect_roll <= 27:
             effect = 'Fire shoots out from wall, floor, or object'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -624,7 +872,7 @@ class Dungeon:
             ])
         elif effect_roll <= 30:
             effect = 'Touching an object triggers a *flesh to stone spell*'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Sword, arcane touch sensor (Arcana; Arcane Focus)",
                 "Statue, arcane touch sensor (Arcana; Arcane Focus)",
                 "Table, arcane touch sensor (Arcana; Arcane Focus)",
@@ -638,14 +886,14 @@ class Dungeon:
             ])
         elif effect_roll <= 33:
             effect = 'Floor collapses or is an illusion'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Collapsing floorboard (Dexterity; Tinker's tools, Carpenter's tools, Mason's tools)",
                 "Trap door (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Rug, arcane touch sensor (Arcana; Arcane Focus)",
             ])
         elif effect_roll <= 36:
             effect = 'Vent releases gas: blinding, acidic, obscuring, paralyzing, poisonous, or sleep-inducing'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -653,14 +901,14 @@ class Dungeon:
             ])
         elif effect_roll <= 39:
             effect = 'Floor tiles are electrified'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Rug, arcane touch sensor (Arcana; Arcane Focus)",
                 "Floor tiles, arcane touch sensor (Arcana; Arcane Focus)",
                 "Floor boards, arcane touch sensor (Arcana; Arcane Focus)",
             ])
         elif effect_roll <= 43:
             effect = '*Glyph of warding*'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
                 "Glyph, arcane proximity sensor (Arcana; Arcane Focus)",
                 "Glyph, arcane touch sensor (Arcana; Arcane Focus)",
@@ -672,7 +920,7 @@ class Dungeon:
             ])
         elif effect_roll <= 46:
             effect = 'Huge wheeled statue rolls down corridor'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Statue, arcane motion sensor (Arcana; Arcane Focus)",
                 "Statue, arcane proximity sensor (Arcana; Arcane Focus)",
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
@@ -680,7 +928,7 @@ class Dungeon:
             ])
         elif effect_roll <= 49:
             effect = '*Lightning bolt* shoots from wall or object'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -688,7 +936,7 @@ class Dungeon:
             ])
         elif effect_roll <= 52:
             effect = 'Locked room floods with water or acid'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -696,7 +944,7 @@ class Dungeon:
             ])
         elif effect_roll <= 56:
             effect = 'Darts shoot out of an opened chest'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane proximity sensor (Arcana; Arcane Focus)",
@@ -704,14 +952,14 @@ class Dungeon:
             ])
         elif effect_roll <= 59:
             effect = 'A weapon, suit of armor, or rug animates and attacks when touched (see “Animated Objects” in the Monster Manual)'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Sword, arcane touch sensor (Arcana; Arcane Focus)",
                 "Suit of armor, arcane touch sensor (Arcana; Arcane Focus)",
                 "Rug, arcane touch sensor (Arcana; Arcane Focus)",
             ])
         elif effect_roll <= 62:
             effect = 'Pendulum, either bladed or weighted as a maul, swings across the room or hall'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -719,7 +967,7 @@ class Dungeon:
             ])
         elif effect_roll <= 67:
             effect = 'Hidden pit opens beneath characters (25 percent chance that a black pudding or gelatinous cube fills the bottom of the pit)'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -730,7 +978,7 @@ class Dungeon:
             ])
         elif effect_roll <= 70:
             effect = 'Hidden pit floods with acid or fire'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -741,7 +989,7 @@ class Dungeon:
             ])
         elif effect_roll <= 73:
             effect = 'Locking pit floods with water'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -752,7 +1000,7 @@ class Dungeon:
             ])
         elif effect_roll <= 77:
             effect = 'Scything blade emerges from wall or object'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -761,7 +1009,7 @@ class Dungeon:
             ])
         elif effect_roll <= 81:
             effect = 'Spears (possibly poisoned) spring out'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -770,14 +1018,14 @@ class Dungeon:
             ])
         elif effect_roll <= 84:
             effect = 'Brittle stairs collapse over spikes'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Collapsing step (Dexterity; Tinker's tools, Carpenter's tools, Mason's tools)",
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
             ])
         elif effect_roll <= 88:
             effect = '*Thunderwave* knocks characters into a pit of spikes'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -785,7 +1033,7 @@ class Dungeon:
             ])
         elif effect_roll <= 91:
             effect = 'Steel or stone jaws restrain a character'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -793,7 +1041,7 @@ class Dungeon:
             ])
         elif effect_roll <= 94:
             effect = 'Stone block smashes across hallway'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -801,7 +1049,7 @@ class Dungeon:
             ])
         elif effect_roll <= 97:
             effect = '*Symbol*'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
                 "Glyph, arcane proximity sensor (Arcana; Arcane Focus)",
                 "Glyph, arcane touch sensor (Arcana; Arcane Focus)",
@@ -813,7 +1061,7 @@ class Dungeon:
             ])
         else:
             effect = 'Walls slide together'
-            trigger = np.random.choice([
+            trigger = self.rng.choice([
                 "Pressure plate (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Tripwire (Sleight of Hand; Thieves' tools, Tinker's tools)",
                 "Glyph, arcane motion sensor (Arcana; Arcane Focus)",
@@ -828,25 +1076,33 @@ class Dungeon:
         
         return trap
     
-    def generate_treasure_hoard(self):
+    def generate_treasure_hoard(self, compact=False):
+        """
+        Roll a treasure hoard for the party. With compact, gems, art
+        and magic items are not named but given as dicts of value 
+        (or magic item table) to a uint8 array of indices into 
+        treasure_tables.gem_tables, art_tables or magic_item_names, 
+        for services that store many hoards. expand_treasure names 
+        them. Both forms roll the same dice.
+        """
         cr = self.avg_party_level
 
-        treasure = self._gems_art_magic(cr)
-        treasure[self.coins_keyword] = self._coins(cr)
+        treasure = self._gems_art_magic(cr, rng=self.rng)
+        treasure[self.coins_keyword] = self._coins(cr, rng=self.rng)
 
         if self.gems_keyword in treasure:
-            treasure[self.gems_keyword] = self._gems_from_dict(treasure[self.gems_keyword])
+            treasure[self.gems_keyword] = self._gems_from_dict(treasure[self.gems_keyword], rng=self.rng, compact=compact)
 
         if self.art_keyword in treasure:
-            treasure[self.art_keyword] = self._art_from_dict(treasure[self.art_keyword])
+            treasure[self.art_keyword] = self._art_from_dict(treasure[self.art_keyword], rng=self.rng, compact=compact)
 
         if self.magic_items_keyword in treasure:
-            treasure[self.magic_items_keyword] = self._magic_items_from_dict(treasure[self.magic_items_keyword])
+            treasure[self.magic_items_keyword] = self._magic_items_from_dict(treasure[self.magic_items_keyword], rng=self.rng, compact=compact)
 
         return treasure
     
     def generate_treasure_chest(self, difficulty):
-        roll = self._roll(1, dx=3)
+        roll = self._roll(1, dx=3, rng=self.rng)
         if roll == 1:
             return self.generate_magic_item(difficulty)
         elif roll == 2:
@@ -855,28 +1111,32 @@ class Dungeon:
             return 'Empty chest'
             
     def obscure_plot(self, n_steps=None):
-        if n_steps is None:
-            n_steps = self.visibility_distance
-        self.obscured_squares = []
-        party_location = self._dense_to_granular(*self.party_location)
+        self.visible_mask = self.visible_squares(n_steps=n_steps)
+        self.obscured_squares = [(i, j) for i, j in np.argwhere(~self.visible_mask)]
 
-        for ind in range(self.m*self.n):
-            i, j = self._get_i_j(ind)
-            if self._is_visible(party_location, (i, j), n_steps=n_steps):
-                pass
-            else:
-                self.obscured_squares.append((i, j))
-                self._obscure_square(i, j)
+        for i, j in self.obscured_squares:
+            self._obscure_square(i, j)
+    
+    def packed_walls(self):
+        """
+        Bit-packed form of the squares' closed sides: one bit 
+        per slot in A_codes and B_codes (flattened, row-major),
+        set where there is a wall or a closed door. Unpack with
+        np.unpackbits(packed, count=size).
+        """
+        return (
+            np.packbits(self.A_codes >= self.closed_door_code), 
+            np.packbits(self.B_codes >= self.closed_door_code)
+        )
     
     def place_encounters_and_traps(self, maxiter=int(1e6)):
         m = self.m
         n = self.n
         square_density = self.square_density
         
-        D = np.zeros((square_density*m, square_density*n))
+        self.entities = np.zeros((m, n), dtype=np.int8)
 
-        short_paths = shortest_path(self.C)
-        longest_path = np.unravel_index(short_paths.argmax(), self.C.shape)
+        longest_path = self._longest_path()
         party_location_granular = self._get_i_j(longest_path[0], n)
         treasure_location_granular = self._get_i_j(longest_path[1], n)
         
@@ -885,8 +1145,8 @@ class Dungeon:
         self.party_location = party_location
         self.treasure_location = treasure_location
         
-        D[treasure_location[0], treasure_location[1]] = self.deadly_value
-        D[party_location[0], party_location[1]] = self.party_value
+        self._set_entity(*treasure_location, self.deadly_value)
+        self._set_entity(*party_location, self.party_value)
 
         locations = [treasure_location, party_location]
         self.encounter_locs = {self.deadly_keyword: treasure_location}
@@ -894,7 +1154,7 @@ class Dungeon:
         for i in [self.easy_value, self.medium_value, self.hard_value]:
             valid_location = False
             while not valid_location:
-                new_location_granular = self._get_i_j(np.random.choice(m*n))
+                new_location_granular = self._get_i_j(self.rng.choice(m*n))
                 valid_location = True
                 for existing_location in locations:
                     existing_location_granular = self._dense_to_granular(*existing_location)
@@ -905,7 +1165,7 @@ class Dungeon:
             new_location = self._granular_to_dense(*new_location_granular)
             self.encounter_locs[self.difficulty_dict[i]] = new_location
             locations.append(new_location)
-            D[new_location[0], new_location[1]] = i
+            self._set_entity(*new_location, i)
             
         self.trap_locs = dict()
             
@@ -914,7 +1174,7 @@ class Dungeon:
             for __ in range(maxiter):
                 if valid_location:
                     break
-                new_location_granular = self._get_i_j(np.random.choice(m*n))
+                new_location_granular = self._get_i_j(self.rng.choice(m*n))
                 valid_location = True
                 for existing_location in locations:
                     existing_location_granular = self._dense_to_granular(*existing_location)
@@ -931,9 +1191,7 @@ class Dungeon:
             new_location = self._granular_to_dense(*new_location_granular)
             self.trap_locs[tuple(new_location)] = self.generate_trap()
             locations.append(new_location)
-            D[new_location[0], new_location[1]] = self.invisible_trap_value
-
-        self.D = D
+            self._set_entity(*new_location, self.invisible_trap_value)
     
     def play(self):
         self.plot_dungeon()
@@ -966,6 +1224,8 @@ class Dungeon:
         
         if obscure:
             self.obscure_plot(n_steps=n_steps)
+        else:
+            self.visible_mask = self.visible_squares(n_steps=n_steps)
         
         self.plot_encounters()
         self.plot_map(obscure=obscure)
@@ -975,24 +1235,26 @@ class Dungeon:
         plt.show()
     
     def plot_encounters(self):
-        D = self.D
         m = self.m
         n = self.n
         square_density = self.square_density
         linewidth = self.marker_edgewidth
         
-        for i, j in self._indices(D):
-            if D[i, j] >= self.easy_value and D[i, j] <= self.deadly_value:
+        # only the squares holding something need to be drawn
+        for granular_i, granular_j in np.argwhere(self.entities != 0):
+            i, j = self._granular_to_dense(granular_i, granular_j)
+            value = self._entity(i, j)
+            if value >= self.easy_value and value <= self.deadly_value:
                 self.ax.scatter(
                     (j+.5)/(square_density*n), 
                     1 - (i+.5)/(square_density*m),
                     marker='X', 
                     linewidth=linewidth,
                     edgecolor='k',
-                    s=self.plot_size*self.encounter_marker_scale*D[i, j], 
-                    c=self.color_dict[D[i, j]]
+                    s=self.plot_size*self.encounter_marker_scale*value, 
+                    c=self.color_dict[value]
                 )
-            elif D[i, j] == self.party_value:
+            elif value == self.party_value:
                 self.ax.scatter(
                     (j+.5)/(square_density*n), 
                     1 - (i+.5)/(square_density*m), 
@@ -1000,29 +1262,29 @@ class Dungeon:
                     linewidth=linewidth,
                     edgecolor='k',
                     s=self.plot_size*self.party_marker_scale, 
-                    c=self.color_dict[D[i, j]]
+                    c=self.color_dict[value]
                 )
-            elif D[i, j] == self.treasure_hoard_value:
+            elif value == self.treasure_hoard_value:
                 self.ax.scatter(
                     (j+.5)/(square_density*n), 
                     1 - (i+.5)/(square_density*m), 
-                    marker=self.marker_dict[D[i, j]], 
+                    marker=self.marker_dict[value], 
                     linewidth=linewidth,
                     edgecolor='k',
                     s=self.plot_size*self.treasure_hoard_marker_scale, 
-                    c=self.color_dict[D[i, j]]
+                    c=self.color_dict[value]
                 )
-            elif D[i, j] in self.treasure_chest_values:
+            elif value in self.treasure_chest_values:
                 self.ax.scatter(
                     (j+.5)/(square_density*n), 
                     1 - (i+.5)/(square_density*m), 
-                    marker=self.marker_dict[D[i, j]], 
+                    marker=self.marker_dict[value], 
                     linewidth=linewidth,
                     edgecolor='k',
                     s=self.plot_size*self.treasure_chest_marker_scale, 
-                    c=self.color_dict[D[i, j]]
+                    c=self.color_dict[value]
                 )
-            elif D[i, j] == self.visible_trap_value:
+            elif value == self.visible_trap_value:
                 self._plot_trap((i, j))
     
     def plot_map(self, obscure=True):
@@ -1046,8 +1308,8 @@ class Dungeon:
             are typically generated on a more granular grid
             than the gridlines to create more open spaces.
         """
-        A = self.A
-        B = self.B
+        A = self.A_codes
+        B = self.B_codes
         m = self.m
         n = self.n
         square_density = self.square_density
@@ -1115,13 +1377,13 @@ class Dungeon:
             encounter_loc = self.encounter_locs[closest_encounter]
 
             if closest_encounter == self.deadly_keyword:
-                self.D[encounter_loc[0], encounter_loc[1]] = self.treasure_hoard_value
+                self._set_entity(*encounter_loc, self.treasure_hoard_value)
             elif closest_encounter == self.hard_keyword:
-                self.D[encounter_loc[0], encounter_loc[1]] = self.treasure_chest_value_hard
+                self._set_entity(*encounter_loc, self.treasure_chest_value_hard)
             elif closest_encounter == self.medium_keyword:
-                self.D[encounter_loc[0], encounter_loc[1]] = self.treasure_chest_value_medium
+                self._set_entity(*encounter_loc, self.treasure_chest_value_medium)
             elif closest_encounter == self.easy_keyword:
-                self.D[encounter_loc[0], encounter_loc[1]] = self.treasure_chest_value_easy
+                self._set_entity(*encounter_loc, self.treasure_chest_value_easy)
 
             del self.encounters[closest_encounter]
             del self.encounter_locs[closest_encounter]
@@ -1138,31 +1400,6 @@ class Dungeon:
         severity = trap[self.severity_keyword]
         effect = trap[self.effect_keyword]
 
-        if cr <= self.trap_threshold_small:
-            trap_damage_dict = {
-                self.severity_setback_keyword: self._roll(1, dx=10 - self.trap_threshold_small + cr),
-                self.severity_dangerous_keyword: self._roll(2, dx=10 - self.trap_threshold_small + cr),
-                self.severity_deadly_keyword: self._roll(4, dx=10 - self.trap_threshold_small + cr)
-            }
-        elif cr <= self.trap_threshold_medium:
-            trap_damage_dict = {
-                self.severity_setback_keyword: self._roll(2, dx=10 - self.trap_threshold_medium + cr),
-                self.severity_dangerous_keyword: self._roll(4, dx=10 - self.trap_threshold_medium + cr),
-                self.severity_deadly_keyword: self._roll(10, dx=10 - self.trap_threshold_medium + cr)
-            }
-        elif cr <= self.trap_threshold_large:
-            trap_damage_dict = {
-                self.severity_setback_keyword: self._roll(4, dx=10 - self.trap_threshold_large + cr),
-                self.severity_dangerous_keyword: self._roll(10, dx=10 - self.trap_threshold_large + cr),
-                self.severity_deadly_keyword: self._roll(18, dx=10 - self.trap_threshold_large + cr)
-            }
-        else:
-            trap_damage_dict = {
-                self.severity_setback_keyword: self._roll(10, dx=10),
-                self.severity_dangerous_keyword: self._roll(18, dx=10),
-                self.severity_deadly_keyword: self._roll(24, dx=10)
-            }
-
         print(f"Trap trigger: {trigger}")
         
         if visible or allow_disarm:
@@ -1190,74 +1427,74 @@ class Dungeon:
         if inp == 'n':
             print("\nYou successfully avoided the trap.")
         else:
-            print(f"\nDamage taken: {trap_damage_dict[severity]}")
+            print(f"\nDamage taken: {self.trap_damage_dice(cr)[severity].sample(rng=self.rng)}")
     
     def step(self, inp):
         direction = self.direction_dict[inp]
         
         i, j = self.party_location
         if direction == self.right_keyword:
-            assert self.D[i, j] == self.party_value
+            assert self._entity(i, j) == self.party_value
             if j >= self.n * self.square_density - self.square_density:
                 self.latest_direction = direction
             else:
                 granular_i, granular_j = self._dense_to_granular(i, j).astype(int)
-                if self.A[granular_i, granular_j] == 1:
+                if self.A_codes[granular_i, granular_j] == self.wall_code:
                     pass
-                elif self.A[granular_i, granular_j] == self.closed_door_value:
+                elif self.A_codes[granular_i, granular_j] == self.closed_door_code:
                     self.latest_direction = direction
                     self.plot_dungeon()
                     self._open_door(self.vertical_keyword, (granular_i, granular_j))
                 else:
-                    self.D[i, j] = 0
+                    self._set_entity(i, j, 0)
                     self.party_location[1] += self.square_density
             
         elif direction == self.left_keyword:
-            assert self.D[i, j] == self.party_value
+            assert self._entity(i, j) == self.party_value
             if j <= 0 + self.square_density:
                 self.latest_direction = direction
             else:
                 granular_i, granular_j = self._dense_to_granular(i, j).astype(int)
-                if self.A[granular_i, granular_j - 1] == 1:
+                if self.A_codes[granular_i, granular_j - 1] == self.wall_code:
                     pass
-                elif self.A[granular_i, granular_j - 1] == self.closed_door_value:
+                elif self.A_codes[granular_i, granular_j - 1] == self.closed_door_code:
                     self.latest_direction = direction
                     self.plot_dungeon()
                     self._open_door(self.vertical_keyword, (granular_i, granular_j - 1))
                 else:
-                    self.D[i, j] = 0
+                    self._set_entity(i, j, 0)
                     self.party_location[1] -= self.square_density
             
         elif direction == self.up_keyword:
-            assert self.D[i, j] == self.party_value
+            assert self._entity(i, j) == self.party_value
             if i <= 0 + self.square_density:
                 self.latest_direction = direction
             else:
                 granular_i, granular_j = self._dense_to_granular(i, j).astype(int)
-                if self.B[granular_i - 1, granular_j] == 1:
+                if self.B_codes[granular_i - 1, granular_j] == self.wall_code:
                     pass
-                elif self.B[granular_i - 1, granular_j] == self.closed_door_value:
+                elif self.B_codes[granular_i - 1, granular_j] == self.closed_door_code:
                     self.latest_direction = direction
                     self.plot_dungeon()
                     self._open_door(self.horizontal_keyword, (granular_i - 1, granular_j))
                 else:
-                    self.D[i, j] = 0
+                    self._set_entity(i, j, 0)
                     self.party_location[0] -= self.square_density
             
         elif direction == self.down_keyword:
-            assert self.D[i, j] == self.party_value
+            assert self._entity(i, j) == self.party_value
             if i >= self.m * self.square_density - self.square_density:
                 self.latest_direction = direction
             else:
                 granular_i, granular_j = self._dense_to_granular(i, j).astype(int)
-                if self.B[granular_i, granular_j] == 1:
+                if self.B_codes[granular_i, granular_j] == self.wall_code:
                     pass
-                elif self.B[granular_i, granular_j] == self.closed_door_value:
+                elif self.B_codes[granular_i, granular_j] == self.closed_door_code:
                     self.latest_direction = direction
                     self.plot_dungeon()
                     self._open_door(self.horizontal_keyword, (granular_i, granular_j))
                 else:
-                    self.D[i, j] = 0
+                    self._set_entity(i, j, 0)
                     self.party_location[0] += self.square_density
 
         is_trap = False
@@ -1265,21 +1502,21 @@ class Dungeon:
         
         i, j = self.party_location
         
-        if self.D[i, j] in self.treasure_chest_values:
+        if self._entity(i, j) in self.treasure_chest_values:
             is_treasure_chest = True
-            treasure_chest_value = self.treasure_chest_difficulty_dict[self.D[i, j]]
+            treasure_chest_value = self.treasure_chest_difficulty_dict[self._entity(i, j)]
             self.temp_print.append('Treasure chest: ')
             self.temp_print.append(self.generate_treasure_chest(treasure_chest_value))
             
-        elif self.D[i, j] == self.visible_trap_value:
+        elif self._entity(i, j) == self.visible_trap_value:
             is_trap = True
             trap_visible = True
             
-        elif self.D[i, j] == self.invisible_trap_value:
+        elif self._entity(i, j) == self.invisible_trap_value:
             is_trap = True
             trap_visible = False
         
-        self.D[i, j] = self.party_value
+        self._set_entity(i, j, self.party_value)
         self.latest_direction = direction
         
         self.check_for_traps()
@@ -1294,83 +1531,203 @@ class Dungeon:
                 raise ValueError('Trap should be visible or invisible, not None')
             self.run_trap(self.trap_locs[(i, j)], visible=trap_visible)
 
-    # helper functions  
-    def _adjacency(self, A, B):
+    def visible_squares(self, location=None, n_steps=None):
         """
-        Helper function to determine the adjacency matrix
-        C from wall matrices A and B.
+        Boolean m x n mask of the squares within n_steps of the
+        granular square location (the party by default), found 
+        with a single search over C that stops at n_steps.
         """
-        m, n = A.shape[0], B.shape[1]
-        C = np.zeros((m*n, m*n))  # C is m*n x m*n
-
-        # loop over all squares in the grid
-        for ind in range(m*n):
-            i, j = self._get_i_j(ind)
+        if location is None:
+            location = self._dense_to_granular(*self.party_location)
+        if n_steps is None:
+            n_steps = self.visibility_distance
+        
+        dist = dijkstra(
+            self.C, 
+            indices=self._get_ind(*location), 
+            unweighted=True, 
+            limit=n_steps
+        )
+        return (dist <= n_steps).reshape(self.m, self.n)
 
-            if i != 0:  # look up
-                if B[i-1, j] < self.closed_door_value:  # check for walls
-                    C[ind, self._get_ind(i-1, j)] = 1
+    # helper functions  
+    def _build_encounter(self, difficulty_value):
+        """
+        One attempt of generate_encounter: pick monsters weighted
+        by cr, each with a random quantity, until the encounter 
+        reaches difficulty_value. Returns None when it gets stuck
+        below difficulty_value, with every monster left making it
+        too hard.
+        """
+        # monster quantities by monster id (catalog row), and the
+        # order in which the monsters were picked
+        counts = np.zeros(len(self.monster_xp), dtype=int)
+        picked = dict()
 
-            if i != m-1:  # look down
-                if B[i, j] < self.closed_door_value:  # check for walls
-                    C[ind, self._get_ind(i+1, j)] = 1
+        available_monsters = np.flatnonzero(self.cr_mask)
 
-            if j != 0:  # look left
-                if A[i, j-1] < self.closed_door_value:  # check for walls
-                    C[ind, self._get_ind(i, j-1)] = 1
+        while self._encounter_difficulties(counts @ self.monster_xp, counts.sum()) < difficulty_value:
+            available_monsters = self._get_available_monsters(counts, available_monsters, difficulty_value)
+            if len(available_monsters) == 0:
+                return None
+            
+            p = self.monster_cr[available_monsters]
+                
+            monster = self.rng.choice(
+                available_monsters, 
+                p=p/p.sum()
+            )
+            picked[monster] = None
+            counts[monster] = self.min_monsters
 
-            if j != n-1:  # look right
-                if A[i, j] < self.closed_door_value:  # check for walls
-                    C[ind, self._get_ind(i, j+1)] = 1
+            max_monster_quantity = self._max_monsters(counts, monster, difficulty_value)
+            counts[monster] = self.rng.integers(self.min_monsters, max_monster_quantity + 1)
 
-        return C + np.eye(m*n)
+        return {self.monster_names[monster]: int(counts[monster]) for monster in picked}
     
-    def _cr_threshold(self, row):
-        cr = row['cr']
-        if pd.isna(cr):
-            return False
-        elif cr <= self.avg_party_level:
-            return True
-        else:
-            return False
+    def _check_encounter_difficulties(self, themed=False):
+        """
+        Raise a ValueError when no monster is eligible (cr_mask is
+        empty) or some difficulty from easy to deadly cannot be hit
+        exactly with the eligible monsters, so that 
+        generate_encounter never searches for an encounter that
+        does not exist.
+
+        A difficulty counts as reachable when an encounter of one
+        or two monster types hits it (see 
+        encounter_index.has_encounter). This is stricter than the
+        greedy builder, which can also land on a difficulty with
+        three or more types: a party whose difficulty is only 
+        reachable that way is rejected here. No party of 1 to 8 
+        players of one level from 1 to 20 is, without a theme.
+        """
+        for_party = f"for party {self.party}{' with this theme' if themed else ''}"
+        members = np.flatnonzero(self.cr_mask)
+        if len(members) == 0:
+            raise ValueError(f'no monster is eligible {for_party}')
+
+        class_xp = np.unique(self.monster_xp[members])
+        for k, difficulty_value in enumerate(self.difficulty_values[1:-1], start=1):
+            lower, upper = self.party_thresholds[k - 1], self.party_thresholds[k]
+            if not has_encounter(class_xp, lower, upper, self._min_quantity, self.min_monsters):
+                raise ValueError(
+                    f'no {self.difficulty_dict[difficulty_value].lower()} encounter can be built {for_party}'
+                )
+    
+    def _composition_xp(self, monsters):
+        """
+        Unadjusted xp and number of monsters of the encounter 
+        monsters, a dict of monster name to quantity.
+        """
+        if not monsters:
+            return 0, 0
+        ids = [self.monster_ids[name] for name in monsters]
+        counts = np.fromiter(monsters.values(), dtype=int, count=len(monsters))
+        return int(counts @ self.monster_xp[ids]), int(counts.sum())
+    
+    def _degree(self, A, B):
+        """
+        Helper function to count the open neighbours of every
+        square given wall code matrices A and B. Returns an m x n 
+        array, equal to the row sums of C minus the diagonal.
+        """
+        open_A = A < self.closed_door_code
+        open_B = B < self.closed_door_code
+        
+        degree = np.zeros((A.shape[0], B.shape[1]), dtype=int)
+        degree[:, :-1] += open_A  # right
+        degree[:, 1:] += open_A  # left
+        degree[:-1, :] += open_B  # down
+        degree[1:, :] += open_B  # up
+        return degree
     
     def _dense_to_granular(self, i, j):
         return np.array(((i - 1)/self.square_density, (j - 1)/self.square_density))
     
     def _distance_granular(self, pos1, pos2):
-        ind1 = self._get_ind(*pos1)
-        ind2 = self._get_ind(*pos2)
-        short_paths = shortest_path(self.C)
-        return short_paths[ind1, ind2]
+        # C is undirected, so the field from pos2 can be reused 
+        # when pos2 is the fixed point and pos1 varies
+        return self.distance_field(pos2)[self._get_ind(*pos1)]
+    
+    def _door_candidates(self, A, B):
+        """
+        Helper function to find the open slots in A and B that
+        have walls (or the edge of the dungeon) at both ends, 
+        i.e. the slots that look like a doorway. Returns two 
+        boolean arrays shaped like A and B. When p_door is 
+        below 1, each candidate is kept with probability p_door.
+        """
+        wall_A = A == self.wall_code
+        wall_B = B == self.wall_code
+
+        # vertical slots need a wall at the top and the bottom end
+        top = np.ones(A.shape, dtype=bool)
+        top[1:] = wall_A[:-1] | wall_B[:, :-1] | wall_B[:, 1:]
+        bottom = np.ones(A.shape, dtype=bool)
+        bottom[:-1] = wall_A[1:] | wall_B[:, :-1] | wall_B[:, 1:]
+        A_doors = ~wall_A & top & bottom
+
+        # horizontal slots need a wall at the left and the right end
+        left = np.ones(B.shape, dtype=bool)
+        left[:, 1:] = wall_B[:, :-1] | wall_A[:-1, :] | wall_A[1:, :]
+        right = np.ones(B.shape, dtype=bool)
+        right[:, :-1] = wall_B[:, 1:] | wall_A[:-1, :] | wall_A[1:, :]
+        B_doors = ~wall_B & left & right
+
+        if self.p_door < 1:
+            keep = self.rng.random(A.size + B.size) < self.p_door
+            A_doors &= keep[:A.size].reshape(A.shape)
+            B_doors &= keep[A.size:].reshape(B.shape)
+
+        return A_doors, B_doors
     
     def _encounter_difficulty(self, monsters):
-        mxp = self._monsters_xp(monsters)
-        hard_exp = self._party_xp(self.hard_keyword)
-        deadly_exp = self._party_xp(self.deadly_keyword)
-        
-        if mxp < self._party_xp(self.easy_keyword):
-            return self.trivial_value
-        elif mxp < self._party_xp(self.medium_keyword):
-            return self.easy_value
-        elif mxp < hard_exp:
-            return self.medium_value
-        elif mxp < deadly_exp:
-            return self.hard_value
-        elif mxp < deadly_exp + (deadly_exp - hard_exp):
-            return self.deadly_value
-        else:
-            return self.too_hard_value
-        
-    def _get_available_monsters(self, monsters, prev_available, difficulty_value):
-        available_monsters = []
-        for monster in prev_available:
-            if monster in monsters:
-                pass
-            cp = monsters.copy()
-            cp[monster] = self.min_monsters
-            if self._encounter_difficulty(cp) <= difficulty_value:
-                available_monsters.append(monster)
-        return available_monsters
+        xp, total_monsters = self._composition_xp(monsters)
+        return int(self._encounter_difficulties(xp, total_monsters))
+    
+    def _encounter_difficulties(self, xp, total_monsters):
+        """
+        Difficulty values of one or many encounters at once.
+
+        Parameters
+        ----------
+        xp:  int or array of int
+            Unadjusted xp of each encounter.
+
+        total_monsters:  int or array of int
+            Number of monsters in each encounter.
+
+        Returns
+        -------
+        array of difficulty values (trivial_value up to 
+        too_hard_value), shaped like the broadcast inputs
+        """
+        adjusted_xp = self._monster_quantity_multiplier(total_monsters) * xp
+        return self.difficulty_values[
+            np.searchsorted(self.party_thresholds, adjusted_xp, side='right')
+        ]
+    
+    def _entity(self, i, j):
+        """
+        Helper function to get the value of the entity (party,
+        encounter, trap or treasure) at the dense square i, j.
+        """
+        return int(self.entities[
+            (i - 1) // self.square_density, 
+            (j - 1) // self.square_density
+        ])
+    
+    def _get_available_monsters(self, counts, prev_available, difficulty_value):
+        """
+        Monster ids from prev_available that are not in the 
+        encounter counts (quantities by monster id) yet and can
+        join it at min_monsters without making it harder than 
+        difficulty_value.
+        """
+        candidates = prev_available[counts[prev_available] == 0]
+        xp = counts @ self.monster_xp + self.min_monsters * self.monster_xp[candidates]
+        total_monsters = counts.sum() + self.min_monsters
+        return candidates[self._encounter_difficulties(xp, total_monsters) <= difficulty_value]
     
     def _get_i_j(self, ind, n=None):
         """
@@ -1397,20 +1754,20 @@ class Dungeon:
     def _horizontal_plot(self, walls, obscure=True):
         """
         Helper function to plot all horizontal walls 
-        given an array.
+        given an array of wall codes.
         """
         m, n = walls.shape
         for i, j in self._indices(walls):
-            if walls[i, j] == 1:
+            if walls[i, j] == self.wall_code:
                 if obscure:
-                    if (i, j) not in self.obscured_squares:
+                    if self.visible_mask[i, j]:
                         self.ax.hlines(
                             1-(i+1)/(m+1), 
                             j/(n), 
                             (j+1)/(n),
                             linewidth=self.wall_linewidth
                         )
-                    elif (i+1, j) not in self.obscured_squares:
+                    elif self.visible_mask[i+1, j]:
                         self.ax.hlines(
                             1-(i+1)/(m+1), 
                             j/(n), 
@@ -1424,9 +1781,9 @@ class Dungeon:
                         (j+1)/(n),
                         linewidth=self.wall_linewidth
                     )
-            elif walls[i, j] == self.closed_door_value:
+            elif walls[i, j] == self.closed_door_code:
                 if obscure:
-                    if (i, j) not in self.obscured_squares:
+                    if self.visible_mask[i, j]:
                         self.ax.hlines(
                             1-(i+1)/(m+1), 
                             j/(n), 
@@ -1434,7 +1791,7 @@ class Dungeon:
                             color=self.color_dict[self.closed_door_value],
                             linewidth=self.door_linewidth
                         )
-                    elif (i+1, j) not in self.obscured_squares:
+                    elif self.visible_mask[i+1, j]:
                         self.ax.hlines(
                             1-(i+1)/(m+1), 
                             j/(n), 
@@ -1450,7 +1807,7 @@ class Dungeon:
                         color=self.color_dict[self.closed_door_value],
                         linewidth=self.door_linewidth
                     )
-            elif walls[i, j] == self.open_door_value:
+            elif walls[i, j] == self.open_door_code:
                 xmin = [
                     (j*self.square_density)/(n*self.square_density), 
                     ((j + 2/3)*self.square_density)/(n*self.square_density)
@@ -1461,7 +1818,7 @@ class Dungeon:
                 ]
                 y = [1-(i+1)/(m+1), 1-(i+1)/(m+1)]
                 if obscure:
-                    if (i, j) not in self.obscured_squares:
+                    if self.visible_mask[i, j]:
                         self.ax.hlines(
                             y, 
                             xmin, 
@@ -1469,7 +1826,7 @@ class Dungeon:
                             color=self.color_dict[self.open_door_value],
                             linewidth=self.door_linewidth
                         )
-                    elif (i+1, j) not in self.obscured_squares:
+                    elif self.visible_mask[i+1, j]:
                         self.ax.hlines(
                             y, 
                             xmin, 
@@ -1487,68 +1844,115 @@ class Dungeon:
                     )
             
     def _is_visible(self, current_location, new_location, n_steps=None):
-        if n_steps is None:
-            n_steps = self.visibility_distance
-        adj = np.eye(self.m * self.n)
-        for i in range(n_steps):
-            adj = adj @ self.C
-        
-        return adj[self._get_ind(*current_location), self._get_ind(*new_location)] > 0
+        i, j = np.array(new_location, dtype=int)
+        return self.visible_squares(current_location, n_steps=n_steps)[i, j]
     
-    def _max_monsters(self, monsters, monster, difficulty_value):
-        while self._encounter_difficulty(monsters) < difficulty_value:
-            monsters[monster] += 1
-
-        if self._encounter_difficulty(monsters) > difficulty_value:
-            monsters[monster] -= 1
-
-        return monsters[monster]
+    def _longest_path(self):
+        """
+        Helper function to find the indices in C of the two 
+        squares furthest apart, the first such pair in row-major
+        order like an argmax over the all pairs distances.
+
+        Only a few single source searches (distance_field) are 
+        run in practice: every search from a square w bounds the
+        eccentricity e(v) of every square v by
+
+            max(d(w, v), e(w) - d(w, v)) <= e(v) <= e(w) + d(w, v)
+
+        and searches alternate between the square that could be
+        furthest from any other and the square most likely to be
+        central, until the diameter is pinned down (bounding 
+        diameters, Takes and Kosters 2011). Squares are then 
+        searched in order, skipping those whose upper bound is 
+        below the diameter, until the first one that reaches it.
+        """
+        mn = self.m * self.n
+        dist = self.distance_field(self._get_i_j(0))
+        if np.isinf(dist).any():
+            # disconnected, no bounds to work with; the first 
+            # unreachable square from the first square is furthest
+            return 0, int(dist.argmax())
+
+        lower = np.zeros(mn)
+        upper = np.full(mn, np.inf)
+        searched = np.zeros(mn, dtype=bool)
+        source, central = 0, True
+        while True:
+            dist = self.distance_field(self._get_i_j(source))
+            ecc = dist.max()
+            searched[source] = True
+            lower = np.maximum(lower, np.maximum(dist, ecc - dist))
+            upper = np.minimum(upper, ecc + dist)
+            
+            # every candidate for the first square of the pair
+            # could still reach the diameter's lower bound
+            diameter = lower.max()
+            first = int(np.argmax(upper >= diameter))
+            if lower[first] >= upper.max():
+                dist = self.distance_field(self._get_i_j(first))
+                return first, int(dist.argmax())
+            
+            # pin down the diameter first, then walk the candidates
+            if upper.max() > diameter:
+                open_squares = np.flatnonzero(~searched)
+                bound = lower[open_squares] if central else -upper[open_squares]
+                source = int(open_squares[np.argmin(bound)])
+                central = not central
+            else:
+                source = first
     
-    def _monsters_xp(self, monsters):
-        cr_to_xp = {
-            0: 10,
-            0.125: 25,
-            0.25: 50,
-            0.5: 100,
-            1: 200,
-            2: 450,
-            3: 700,
-            4: 1100,
-            5: 1800,
-            6: 2300,
-            7: 2900,
-            8: 3900,
-            9: 5000,
-            10: 5900,
-            11: 7200,
-            12: 8400,
-            13: 10000,
-            14: 11500,
-            15: 13000,
-            16: 15000,
-            17: 18000,
-            18: 20000,
-            19: 22000,
-            20: 25000,
-            21: 33000,
-            22: 41000,
-            23: 50000,
-            24: 62000,
-            25: 75000,
-            26: 90000,
-            27: 105000,
-            28: 120000,
-            29: 135000,
-            30: 155000
-        }
+    def _max_monsters(self, counts, monster, difficulty_value):
+        """
+        Quantity of monster to cap the encounter counts (quantities
+        by monster id) at: the smallest quantity from its current 
+        one that reaches difficulty_value, less one if that 
+        overshoots it.
+
+        Adjusted xp is linear in the quantity within each bracket 
+        of monster_quantity_brackets, so the smallest quantity 
+        reaching a threshold is solved per bracket in closed form.
+        Multipliers are doubled to keep the arithmetic in integers.
+        """
+        quantity = counts[monster]
+        monster_xp = self.monster_xp[monster]
+        other_xp = counts @ self.monster_xp - quantity * monster_xp
+        other_monsters = counts.sum() - quantity
+
+        k = np.searchsorted(self.difficulty_values, difficulty_value)
+        if k > 0:
+            quantity = int(self._min_quantity(
+                other_xp, other_monsters, monster_xp, quantity, self.party_thresholds[k - 1]
+            ))
         
-        xp = 0
-        total_monsters = 0
-        for monster in monsters:
-            monster_xp = cr_to_xp[self.monster_df.loc[monster]['cr']]
-            xp += monsters[monster] * monster_xp
-            total_monsters += monsters[monster]
+        if k < len(self.party_thresholds):
+            doubled_multiplier = 2 * self._monster_quantity_multiplier(other_monsters + quantity)
+            if doubled_multiplier * (other_xp + quantity * monster_xp) >= 2 * self.party_thresholds[k]:
+                quantity -= 1
 
+        return quantity
+    
+    def _min_quantity(self, other_xp, other_monsters, monster_xp, min_quantity, threshold):
+        """
+        Smallest quantity, at least min_quantity, of a monster worth
+        monster_xp that brings the adjusted xp of an encounter with
+        other_xp and other_monsters to threshold, see _max_monsters.
+        The first four arguments can be arrays that broadcast 
+        against each other.
+        """
+        other_xp, other_monsters, monster_xp, min_quantity = (
+            np.asarray(a)[..., None] for a in (other_xp, other_monsters, monster_xp, min_quantity)
+        )
+        doubled = self.monster_quantity_doubled
+        first = self.monster_quantity_first - other_monsters
+        last = self.monster_quantity_last - other_monsters
+        
+        # ceil((2 * threshold - d * other_xp) / (d * monster_xp)) per bracket
+        quantity = -((doubled * other_xp - 2 * threshold) // (doubled * monster_xp))
+        quantity = np.maximum(quantity, np.maximum(first, min_quantity))
+        return np.where(quantity <= last, quantity, np.iinfo(int).max).min(axis=-1)
+    
+    def _monsters_xp(self, monsters):
+        xp, total_monsters = self._composition_xp(monsters)
         return self._monster_quantity_multiplier(total_monsters) * xp
     
     def _obscure_square(self, i, j):
@@ -1568,24 +1972,76 @@ class Dungeon:
         if inp in ('y', self.latest_direction):
             i, j = position
             if keyword == self.vertical_keyword:
-                self.A[i, j] = self.open_door_value
+                self.A_codes[i, j] = self.open_door_code
+                other_side = (i, j+1)
             elif keyword == self.horizontal_keyword:
-                self.B[i, j] = self.open_door_value
+                self.B_codes[i, j] = self.open_door_code
+                other_side = (i+1, j)
             else:
                 raise ValueError(f"Invalid keyword: {keyword}")
 
-            self.C = self._adjacency(self.A, self.B)
+            previous_version = self.graph_version
+            self.C = self._adjacency(self.A_codes, self.B_codes)
+            self._repair_distance_fields(
+                self._get_ind(i, j), 
+                self._get_ind(*other_side), 
+                previous_version
+            )
+    
+    def _repair_distance_fields(self, ind1, ind2, version):
+        """
+        Helper function to carry the cached distance fields 
+        computed at graph_version version over to the current
+        graph, after the edge between squares ind1 and ind2 
+        (indices in C) has been opened.
+
+        Opening an edge can only shorten paths through it, so a
+        field where the two squares are at most one step apart
+        is unchanged. Otherwise distances are lowered outwards 
+        from the further of the two squares.
+        """
+        indptr, indices = self.C.indptr, self.C.indices
+        for source, (field_version, dist) in list(self._distance_fields.items()):
+            if field_version != version:
+                continue
+            
+            near, far = sorted((ind1, ind2), key=lambda ind: dist[ind])
+            if dist[far] > dist[near] + 1:
+                dist = dist.copy()
+                dist[far] = dist[near] + 1
+                frontier = deque([far])
+                while frontier:
+                    ind = frontier.popleft()
+                    neighbours = indices[indptr[ind]:indptr[ind+1]]
+                    closer = neighbours[dist[neighbours] > dist[ind] + 1]
+                    dist[closer] = dist[ind] + 1
+                    frontier.extend(closer)
+                dist.flags.writeable = False
+            
+            self._distance_fields[source] = (self.graph_version, dist)
+    
+    def _party_thresholds(self):
+        """
+        Party xp thresholds as an array of the easy, medium, hard
+        and deadly thresholds, followed by the upper bound of a
+        deadly encounter (deadly + (deadly - hard)).
+        """
+        levels, thresholds = load_level_thresholds(self._player_exp_source)
+        party_levels = list(self.party)
+        ind = np.searchsorted(levels, party_levels).clip(max=len(levels) - 1)
+        if np.any(levels[ind] != party_levels):
+            raise KeyError(f'unknown player level in party {self.party}')
+        counts = np.array([self.party[level] for level in party_levels])
+        easy, medium, hard, deadly = counts @ thresholds[ind]
+        return np.array((easy, medium, hard, deadly, deadly + (deadly - hard)))
     
     def _party_xp(self, difficulty):
-        xp = 0
-        for level in self.party:
-            xp += self.party[level] * self.player_exp_df.loc[level][difficulty]
-
-        return xp
+        ind = (self.easy_keyword, self.medium_keyword, self.hard_keyword, self.deadly_keyword).index(difficulty)
+        return self.party_thresholds[ind]
     
     def _plot_trap(self, trap_loc):
         i, j = trap_loc
-        assert self.D[i, j] == self.visible_trap_value
+        assert self._entity(i, j) == self.visible_trap_value
         
         self.ax.scatter(
             (j+.5)/(self.square_density*self.n), 
@@ -1594,30 +2050,79 @@ class Dungeon:
             linewidth=self.marker_edgewidth,
             edgecolor='k',
             s=self.plot_size*self.trap_marker_scale, 
-            c=self.color_dict[self.D[i, j]]
+            c=self.color_dict[self._entity(i, j)]
         )
         
-        if self._is_visible(self._dense_to_granular(i, j), self._dense_to_granular(*self.party_location)):
+        if self.visible_mask[tuple(self._dense_to_granular(i, j).astype(int))]:
             trigger = self.trap_locs[tuple(trap_loc)][self.trigger_keyword]
             self.temp_print.append(f"Trigger: {trigger}")
     
+    def _set_entity(self, i, j, value):
+        """
+        Helper function to set the value of the entity at the 
+        dense square i, j.
+        """
+        self.entities[
+            (i - 1) // self.square_density, 
+            (j - 1) // self.square_density
+        ] = value
+    
+    def _setup_encounters(self, player_exp_source=None, monster_source=None, encounter_index=None, party_thresholds=None, theme_mask=None):
+        """
+        Helper function to set up everything encounter generation
+        needs for self.party, see __init__ and 
+        _encounter_generator. The sources are passed on to 
+        load_level_thresholds and load_catalog, party_thresholds
+        can be passed in when they were already computed, see 
+        EncounterService.party_thresholds, and theme_mask limits
+        the monsters to pick from, see BestiaryIndex.mask.
+        """
+        self._player_exp_source = player_exp_source
+        self._monster_source = monster_source
+        # DataFrames for the monster_df and player_exp_df properties
+        self._player_exp_df = None
+        self._monster_df = None
+        
+        # names, crs and xp per monster id (catalog row), monster
+        # name to id, and the party's xp thresholds, see 
+        # _encounter_difficulties
+        catalog = load_catalog(monster_source)
+        self.monster_names, self.monster_ids = load_monster_ids(monster_source)
+        self.monster_cr = catalog['cr']
+        self.monster_xp = catalog['xp']
+        self.party_thresholds = self._party_thresholds() if party_thresholds is None else party_thresholds
+        
+        # monsters that can be picked for an encounter: weak enough
+        # for the party, and with a nonzero pick weight (their cr)
+        self.cr_mask = (self.monster_cr > 0) & (self.monster_cr <= self.avg_party_level)
+        if theme_mask is not None:
+            self.cr_mask &= theme_mask
+        self._check_encounter_difficulties(themed=theme_mask is not None)
+        
+        # optional EncounterIndex to sample encounters from instead
+        # of building them one monster at a time (a different 
+        # distribution, see EncounterIndex)
+        if encounter_index is not None and not encounter_index.matches(self):
+            raise ValueError('encounter_index was built for a different party or bestiary')
+        self.encounter_index = encounter_index
+    
     def _vertical_plot(self, walls, obscure=True):
         """
         Helper function to plot all vertical walls 
-        given an array.
+        given an array of wall codes.
         """
         m, n = walls.shape
         for i, j in self._indices(walls):
-            if walls[i, j] == 1:
+            if walls[i, j] == self.wall_code:
                 if obscure:
-                    if (i, j) not in self.obscured_squares:
+                    if self.visible_mask[i, j]:
                         self.ax.vlines(
                             (j+1)/(n+1), 
                             1-i/(m), 
                             1-(i+1)/(m),
                             linewidth=self.wall_linewidth
                         )
-                    elif (i, j+1) not in self.obscured_squares:
+                    elif self.visible_mask[i, j+1]:
                         self.ax.vlines(
                             (j+1)/(n+1), 
                             1-i/(m), 
@@ -1632,9 +2137,9 @@ class Dungeon:
                         linewidth=self.wall_linewidth
                     )
                     
-            elif walls[i, j] == self.closed_door_value:
+            elif walls[i, j] == self.closed_door_code:
                 if obscure:
-                    if (i, j) not in self.obscured_squares:
+                    if self.visible_mask[i, j]:
                         self.ax.vlines(
                             (j+1)/(n+1), 
                             1-i/(m), 
@@ -1642,7 +2147,7 @@ class Dungeon:
                             color=self.color_dict[self.closed_door_value],
                             linewidth=self.door_linewidth
                         )
-                    elif (i, j+1) not in self.obscured_squares:
+                    elif self.visible_mask[i, j+1]:
                         self.ax.vlines(
                             (j+1)/(n+1), 
                             1-i/(m), 
@@ -1659,7 +2164,7 @@ class Dungeon:
                         linewidth=self.door_linewidth
                     )
                     
-            elif walls[i, j] == self.open_door_value:
+            elif walls[i, j] == self.open_door_code:
                 x = [(j+1)/(n+1), (j+1)/(n+1)]
                 ymin = [
                     1-(i*self.square_density)/(m*self.square_density),
@@ -1670,7 +2175,7 @@ class Dungeon:
                     1-((i + 1)*self.square_density)/(m*self.square_density)
                 ]
                 if obscure:
-                    if (i, j) not in self.obscured_squares:
+                    if self.visible_mask[i, j]:
                         self.ax.vlines(
                             x, 
                             ymin, 
@@ -1678,7 +2183,7 @@ class Dungeon:
                             color=self.color_dict[self.open_door_value],
                             linewidth=self.door_linewidth
                         )
-                    elif (i, j+1) not in self.obscured_squares:
+                    elif self.visible_mask[i, j+1]:
                         self.ax.vlines(
                             x, 
                             ymin, 
@@ -1698,1707 +2203,409 @@ class Dungeon:
 
     # class methods
     @classmethod
-    def _art(cls, value, n):
-        if value == 25:
-            art_dict = {
-                1: 'Silver ewer',
-                2: 'Carved bone statuette',
-                3: 'Small gold bracelet',
-                4: 'Cloth-of-gold vestments',
-                5: 'Black velvet mask stitched with silver thread',
-                6: 'Copper chalice with silver filigree',
-                7: 'Pair of engraved bone dice',
-                8: 'Small mirror set in a painted wooden frame',
-                9: 'Embroidered silk handkerchief',
-                10: 'Gold locket with a painted portrait inside	'
-            }
-        elif value == 250:
-            art_dict = {
-                1: 'Gold ring set with bloodstones',
-                2: 'Carved ivory statuette',
-                3: 'Large gold bracelet',
-                4: 'Silver necklace with a gemstone pendant',
-                5: 'Bronze crown',
-                6: 'Silk robe with gold embroidery',
-                7: 'Large well-made tapestry',
-                8: 'Brass mug with jade inlay',
-                9: 'Box of turquoise animal figurines',
-                10: 'Gold bird cage with electrum filigree'
-            }
-        elif value == 750:
-            art_dict = {
-                1: 'Silver chalice set with moonstones',
-                2: 'Silver-plated steel longsword with jet set in hilt',
-                3: 'Carved harp of exotic wood with ivory inlay and zircon gems',
-                4: 'Small gold idol',
-                5: 'Gold dragon comb set with red garnets as eyes',
-                6: 'Bottle stopper cork embossed with gold leaf and set with amethysts',
-                7: 'Ceremonial electrum dagger with a black pearl in the pommel',
-                8: 'Silver and gold brooch',
-                9: 'Obsidian statuette with gold fittings and inlay',
-                10: 'Painted gold war mask'
-            }
-        elif value == 2500:
-            art_dict = {
-                1: 'Fine gold chain set with a fire opal',
-                2: 'Old masterpiece painting',
-                3: 'Embroidered silk and velvet mantle set with numerous moonstones',
-                4: 'Platinum bracelet set with a sapphire',
-                5: 'Embroidered glove set with jewel chips',
-                6: 'Jeweled anklet',
-                7: 'Gold music box',
-                8: 'Gold circlet set with four aquamarines',
-                9: 'Eye patch with a mock eye set in blue sapphire andmoonstone',
-                10: 'A necklace string of small pink pearls'
-            }
-        elif value == 7500:
-            art_dict = {
-                1: 'Jeweled gold crown',
-                2: 'Jeweled platinum ring',
-                3: 'Small gold statuette set with rubies',
-                4: 'Gold cup set with emeralds',
-                5: 'Gold jewelry box with platinum filigree',
-                6: "Painted gold child's sarcophagus",
-                7: 'Jade game board with solid gold playing pieces',
-                8: 'Bejeweled ivory drinking horn with gold filigree'
-            }
-        else:
-            raise ValueError(f'Invalid art value: {value}')
+    def chest_coin_dice(cls, cr, difficulty):
+        """
+        Dice for the coins in a treasure chest of the given 
+        difficulty value, for a party of average level cr.
+
+        Returns
+        -------
+        dict of coin keyword to DiceExpression
+        """
+        return dict(cls._chest_coin_dice(cr, difficulty))
+    
+    @classmethod
+    def expand_treasure(cls, treasure):
+        """
+        Name the gems, art and magic items of a compact treasure
+        hoard, see generate_treasure_hoard.
+
+        Returns
+        -------
+        dict like generate_treasure_hoard(compact=False) returns
+        """
+        treasure = dict(treasure)
+        tables = {
+            cls.gems_keyword: gem_tables,
+            cls.art_keyword: art_tables,
+            cls.magic_items_keyword: magic_item_names
+        }
+        for keyword, names in tables.items():
+            if keyword in treasure:
+                treasure[keyword] = [
+                    names[key][i] for key, indices in treasure[keyword].items() for i in indices.tolist()
+                ]
+        return treasure
+    
+    @classmethod
+    def generate_maps(cls, k, m=10, n=10, p_wall=0.3, generation_mode='rejection', max_batch_squares=int(1e7), maxiter=int(1e3), rng=None):
+        """
+        Generate k connected dungeon maps at once.
+
+        Walls for a whole batch of maps are drawn in one call,
+        and the connected components of every map are labelled
+        with one call on the block diagonal adjacency matrix of
+        the batch. In 'rejection' mode disconnected maps are 
+        dropped and more batches are drawn until k maps are 
+        kept. In 'repair' mode every map is repaired instead 
+        (see _connect_walls).
+
+        Returns
+        -------
+        A_codes:  numpy array
+            uint8 array of the vertical walls, k x m x n-1.
 
-        return [art_dict[cls._roll(1, dx=len(art_dict))] for _ in range(n)]
+        B_codes:  numpy array
+            uint8 array of the horizontal walls, k x m-1 x n.
+
+        Each pair (A_codes[i], B_codes[i]) can be passed to the
+        constructor as walls. rng may be a numpy Generator or a 
+        seed for one.
+        """
+        rng = np.random.default_rng(rng)
+        if generation_mode not in (cls.rejection_keyword, cls.repair_keyword):
+            raise ValueError(f"Invalid generation mode: {generation_mode}")
+        
+        A_maps, B_maps = [], []
+        n_maps, n_drawn = 0, 0
+        for _ in range(maxiter):
+            if n_maps >= k:
+                break
+            
+            # draw enough maps to expect the rest to be connected
+            acceptance = (n_maps + 1) / (n_drawn + 1)
+            size = int(min(np.ceil((k - n_maps) / acceptance), max(1, max_batch_squares // (m*n))))
+            A = cls.wall_code * rng.choice(2, size=(size, m, n-1), p=[1-p_wall, p_wall]).astype(np.uint8)
+            B = cls.wall_code * rng.choice(2, size=(size, m-1, n), p=[1-p_wall, p_wall]).astype(np.uint8)
+            n_drawn += size
+
+            if generation_mode == cls.repair_keyword:
+                for i in range(size):
+                    A[i], B[i] = cls._connect_walls(A[i], B[i], rng=rng)
+            else:
+                labels = connected_components(cls._adjacency(A, B))[1].reshape(size, m*n)
+                n_components = np.sum(np.diff(np.sort(labels, axis=1), axis=1) != 0, axis=1) + 1
+                connected = n_components <= cls.max_connected_components
+                A, B = A[connected], B[connected]
+            
+            A_maps.append(A)
+            B_maps.append(B)
+            n_maps += len(A)
+        
+        if n_maps < k:
+            raise RuntimeError(f"Only {n_maps} of {k} maps were connected after {maxiter} batches")
+        
+        return np.concatenate(A_maps)[:k], np.concatenate(B_maps)[:k]
+    
+    @classmethod
+    def hoard_coin_dice(cls, cr):
+        """
+        Dice for the coins in a treasure hoard, for a party of 
+        average level cr. Their exact distributions, means and 
+        percentiles are available without rolling, e.g.
+
+            Dungeon.hoard_coin_dice(7)[Dungeon.gold_piece_keyword].mean
+
+        Returns
+        -------
+        dict of coin keyword to DiceExpression
+        """
+        return dict(cls._hoard_coin_dice(cr))
+    
+    @classmethod
+    def trap_damage_dice(cls, cr):
+        """
+        Dice for the damage of a trap of each severity, for a party
+        of average level cr.
+
+        Returns
+        -------
+        dict of severity keyword to DiceExpression
+        """
+        band = cls._band(cr, cls.trap_thresholds)
+        threshold = cls.trap_thresholds[band] if band < len(cls.trap_thresholds) else 0
+        return {
+            severity: dice(formula, cr=cr, threshold=threshold)
+            for severity, formula in cls.trap_damage_formulas[band].items()
+        }
+    
+    @classmethod
+    def _adjacency(cls, A, B):
+        """
+        Helper function to determine the sparse adjacency 
+        matrix C from wall code matrices A and B. A and B may 
+        be stacks of maps (k x m x n-1 and k x m-1 x n), in 
+        which case C is block diagonal with one m*n block per 
+        map.
+        """
+        m, n = A.shape[-2], B.shape[-1]
+        ind = np.arange(int(np.prod(A.shape[:-2])) * m * n).reshape(A.shape[:-2] + (m, n))
+
+        # squares are joined wherever the wall between them
+        # is open (A: left/right neighbours, B: up/down neighbours)
+        open_A = A < cls.closed_door_code
+        open_B = B < cls.closed_door_code
+        rows = np.concatenate((ind[..., :, :-1][open_A], ind[..., :-1, :][open_B]))
+        cols = np.concatenate((ind[..., :, 1:][open_A], ind[..., 1:, :][open_B]))
+
+        # add both directions plus the diagonal (each square
+        # is adjacent to itself)
+        diag = ind.ravel()
+        rows, cols = np.concatenate((rows, cols, diag)), np.concatenate((cols, rows, diag))
+        
+        return csr_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols)), 
+            shape=(ind.size, ind.size)
+        )
+    
+    @classmethod
+    def _art(cls, value, n, rng=None):
+        indices = cls._art_indices(value, n, rng=rng)
+        names = art_tables[value]
+        return [names[i] for i in indices.tolist()]
     
     @classmethod
-    def _art_from_dict(cls, treasure_art):
+    def _art_from_dict(cls, treasure_art, rng=None, compact=False):
+        rng = np.random.default_rng(rng)
+        if compact:
+            return cls._compact_items(treasure_art, cls._art_indices, rng=rng)
         total_art = []
         for value in treasure_art:
-            total_art = total_art + cls._art(value, treasure_art[value])
+            total_art.extend(cls._art(value, treasure_art[value], rng=rng))
 
         return total_art
     
     @classmethod
-    def _coins(cls, cr):
-        coins = dict()
-
-        # using cr + 4 (for ex.) scales treasure more continuously
-        # 3 values are the expected values of min_cr, avg_cr, max_cr
-        if cr <= cls.treasure_threshold_small:
-            coins[cls.copper_piece_keyword] = 100 * cls._roll(6, dx=cr + 4)  # 1800, 2250, 2700
-            coins[cls.silver_piece_keyword] = 100 * cls._roll(3, dx=cr + 4)  # 900, 1125, 1350
-            coins[cls.gold_piece_keyword] = 10 * cls._roll(2, dx=cr + 4)  # 60, 75, 90
-        elif cr <= cls.treasure_threshold_medium:
-            coins[cls.copper_piece_keyword] = 100 * cls._roll(2, dx=cr - 1)  # 500, 750, 1000
-            coins[cls.silver_piece_keyword] = 1000 * cls._roll(2, dx=cr - 1)  # 5000, 7500, 10000
-            coins[cls.gold_piece_keyword] = 100 * cls._roll(6, dx=cr - 1)  # 1500, 2250, 3000
-            coins[cls.platinum_piece_keyword] = 10 * cls._roll(3, dx=cr - 1)  # 75, 112.5, 150
-        elif cr <= cls.treasure_threshold_large:
-            coins[cls.gold_piece_keyword] = 1000 * cls._roll(4, dx=cr - 7)  # 10000, 15000, 20000
-            coins[cls.platinum_piece_keyword] = 100 * cls._roll(5, dx=cr - 7)  # 1250, 1875, 2500
-        else:
-            coins[cls.gold_piece_keyword] = 1000 * cls._roll(12, dx=6)  # 42000
-            coins[cls.platinum_piece_keyword] = 1000 * cls._roll(8, dx=6)  # 28000
-
-        return coins
+    def _art_indices(cls, value, n, rng=None):
+        if value not in art_tables:
+            raise ValueError(f'Invalid art value: {value}')
+        return roll_many(rng, 1, dx=len(art_tables[value]), k=n) - 1
     
     @classmethod
-    def _gems(cls, value, n):
-        if value == 10:
-            gem_dict = {
-                1: 'Azurite (opaque mottled deep blue)',
-                2: 'Banded agate (translucent striped brown, blue, white, or red)',
-                3: 'Blue quartz (transparent pale blue)',
-                4: 'Eye agate (translucent circles of gray, white, brown, blue, or green)',
-                5: 'Hematite (opaque gray-black)',
-                6: 'Lapis lazuli (opaque light and dark blue with yellow flecks)',
-                7: 'Malachite (opaque striated light and dark green)',
-                8: 'Moss agate (translucent pink or yellow-white with mossy gray or green markings)',
-                9: 'Obsidian (opaque black)',
-                10: 'Rhodochrosite (opaque light pink)',
-                11: 'Tiger eye (translucent brown with golden center)',
-                12: 'Turquoise (opaque light blue-green)'
-            }
-        elif value == 50:
-            gem_dict = {
-                1: 'Bloodstone (opaque dark gray with red flecks)',
-                2: 'Carnelian (opaque orange to red-brown)',
-                3: 'Chalcedony (opaque white)',
-                4: 'Chrysoprase (translucent green)',
-                5: 'Citrine (transparent pale yellow-brown)',
-                6: 'Jasper (opaque blue, black, or brown)',
-                7: 'Moonstone (translucent white with pale blue glow)',
-                8: 'Onyx (opaque bands of black and white, or pure black or white)',
-                9: 'Quartz (transparent white, smoky gray, or yellow)',
-                10: 'Sardonyx (opaque bands of red and white)',
-                11: 'Star rose quartz (translucent rosy stone with white star-shaped center)',
-                12: 'Zircon (transparent pale blue-green)'
-            }
-        elif value == 100:
-            gem_dict = {
-                1: 'Amber (transparent watery gold to rich gold)',
-                2: 'Amethyst (transparent deep purple)',
-                3: 'Chrysoberyl (transparent yellow-green to pale green)',
-                4: 'Coral (opaque crimson)',
-                5: 'Garnet (transparent red, brown-green, or violet)',
-                6: 'Jade (translucent light green, deep green, or white)',
-                7: 'Jet (opaque deep black)',
-                8: 'Pearl (opaque lustrous white, yellow, or pink)',
-                9: 'Spinel (transparent red, red-brown, or deep green)',
-                10: 'Tourmaline (transparent pale green, blue, brown, or red)'
-            }
-        elif value == 500:
-            gem_dict = {
-                1: 'Alexandrite (transparent dark green)',
-                2: 'Aquamarine (transparent pale blue-green)',
-                3: 'Black pearl (opaque pure black)',
-                4: 'Blue spinel (transparent deep blue)',
-                5: 'Peridot (transparent rich olive green)',
-                6: 'Topaz (transparent golden yellow)',
-            }
-        elif value == 1000:
-            gem_dict = {
-                1: 'Black opal (translucent dark green with black mottling and golden flecks)',
-                2: 'Blue sapphire (transparent blue-white to medium blue)',
-                3: 'Emerald (transparent deep bright green)',
-                4: 'Fire opal (translucent fiery red)',
-                5: 'Opal (translucent pale blue with green and golden mottling)',
-                6: 'Star ruby (translucent ruby with white star-shaped center)',
-                7: 'Star sapphire (translucent blue sapphire with white star-shaped center)',
-                8: 'Yellow sapphire (transparent fiery yellow or yellow green)'
-            }
-        elif value == 5000:
-            gem_dict = {
-                1: 'Black sapphire (translucent lustrous black with glowing highlights)',
-                2: 'Diamond (transparent blue-white, canary, pink, brown, or blue)',
-                3: 'Jacinth (transparent fiery orange)',
-                4: 'Ruby (transparent clear red to deep crimson)'
-            }
-        else:
-            raise ValueError(f'Invalid gem value: {value}')
-
-        return [gem_dict[cls._roll(1, dx=len(gem_dict))] for _ in range(n)]
+    @lru_cache(maxsize=1024)
+    def _chest_coin_dice(cls, cr, difficulty):
+        """
+        chest_coin_dice as (coin keyword, DiceExpression) pairs, 
+        compiled once per cr.
+        """
+        formulas = cls.chest_coin_formulas[cls._band(cr, cls.treasure_thresholds)]
+        if difficulty not in formulas:
+            raise ValueError(f"Invalid difficulty: {difficulty}")
+        return tuple((coin, dice(formula, cr=cr)) for coin, formula in formulas[difficulty].items())
     
     @classmethod
-    def _gems_art_magic(cls, cr):
-        roll = cls._roll(1, dx=100)
-        gem_art_magic = dict()
-        if cr <= cls.treasure_threshold_small:
-            if roll <= 6:
-                pass
-            elif roll <= 16:
-                gem_art_magic[cls.gems_keyword] = {
-                    10: cls._roll(2, dx=6)  # value, quantity
-                }
-            elif roll <= 26:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-            elif roll <= 36:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(2, dx=6)
-                }
-            elif roll <= 44:
-                gem_art_magic[cls.gems_keyword] = {
-                    10: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 52:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 60:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 65:
-                gem_art_magic[cls.gems_keyword] = {
-                    10: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 70:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 75:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 78:
-                gem_art_magic[cls.gems_keyword] = {
-                    10: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 80:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 85:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 92:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': cls._roll(1, dx=4)
-                }
-            elif roll <= 97:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': cls._roll(1, dx=4)
-                }
-            elif roll <= 99:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': 1
-                }
-            else:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(2, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': 1
-                }
-        elif cr <= cls.treasure_threshold_medium:
-            if roll <= 4:
-                pass
-            elif roll <= 10:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)  # value, quantity
-                }
-            elif roll <= 16:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(3, dx=6)
-                }
-            elif roll <= 22:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-            elif roll <= 28:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }            
-            elif roll <= 32:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 36:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 40:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 44:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=6)
-                }
-            elif roll <= 49:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 54:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 59:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 63:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'B': cls._roll(1, dx=4)
-                }
-            elif roll <= 66:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 69:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 72:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 74:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=4)
-                }
-            elif roll <= 76:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': 1
-                }
-            elif roll <= 78:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': 1
-                }
-            elif roll <= 79:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': 1
-                }
-            elif roll <= 80:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': 1
-                }
-            elif roll <= 84:
-                gem_art_magic[cls.art_keyword] = {
-                    25: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': cls._roll(1, dx=4)
-                }
-            elif roll <= 88:
-                gem_art_magic[cls.gems_keyword] = {
-                    50: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': cls._roll(1, dx=4)
-                }
-            elif roll <= 91:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': cls._roll(1, dx=4)
-                }
-            elif roll <= 94:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': cls._roll(1, dx=4)
-                }
-            elif roll <= 96:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 98:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': cls._roll(1, dx=6)
-                }
-            elif roll <= 99:
-                gem_art_magic[cls.gems_keyword] = {
-                    100: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': 1
-                }
-            else:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': 1
-                }
-        elif cr <= cls.treasure_threshold_large:
-            if roll <= 3:
-                pass
-            elif roll <= 6:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-            elif roll <= 9:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-            elif roll <= 12:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-            elif roll <= 15:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-            elif roll <= 19:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=4),
-                    'B': cls._roll(1, dx=6)
-                }
-            elif roll <= 23:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=4),
-                    'B': cls._roll(1, dx=6)
-                }
-            elif roll <= 26:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=4),
-                    'B': cls._roll(1, dx=6)
-                }
-            elif roll <= 29:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'A': cls._roll(1, dx=4),
-                    'B': cls._roll(1, dx=6)
-                }
-            elif roll <= 35:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=6)
-                }
-            elif roll <= 40:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=6)
-                }
-            elif roll <= 45:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=6)
-                }
-            elif roll <= 50:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=6)
-                }
-            elif roll <= 54:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=4)
-                }
-            elif roll <= 58:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=4)
-                }
-            elif roll <= 62:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=4)
-                }
-            elif roll <= 66:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=4)
-                }
-            elif roll <= 68:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': 1
-                }
-            elif roll <= 70:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': 1
-                }
-            elif roll <= 72:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': 1
-                }
-            elif roll <= 74:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': 1
-                }
-            elif roll <= 76:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': 1,
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 78:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': 1,
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 80:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': 1,
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 82:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'F': 1,
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 85:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 88:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 90:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 92:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 94:
-                gem_art_magic[cls.art_keyword] = {
-                    250: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': 1
-                }
-            elif roll <= 96:
-                gem_art_magic[cls.art_keyword] = {
-                    750: cls._roll(2, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': 1
-                }
-            elif roll <= 98:
-                gem_art_magic[cls.gems_keyword] = {
-                    500: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': 1
-                }
-            else:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': 1
-                }
-        else:
-            if roll <= 2:
-                pass
-            elif roll <= 5:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=8)
-                }
-            elif roll <= 8:
-                gem_art_magic[cls.art_keyword] = {
-                    2500: cls._roll(1, dx=10)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=8)
-                }
-            elif roll <= 11:
-                gem_art_magic[cls.art_keyword] = {
-                    7500: cls._roll(1, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=8)
-                }
-            elif roll <= 14:
-                gem_art_magic[cls.gems_keyword] = {
-                    5000: cls._roll(1, dx=8)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'C': cls._roll(1, dx=8)
-                }
-            elif roll <= 22:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=6)
-                }
-            elif roll <= 30:
-                gem_art_magic[cls.art_keyword] = {
-                    2500: cls._roll(1, dx=10)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=6)
-                }
-            elif roll <= 38:
-                gem_art_magic[cls.art_keyword] = {
-                    7500: cls._roll(1, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=6)
-                }
-            elif roll <= 46:
-                gem_art_magic[cls.gems_keyword] = {
-                    5000: cls._roll(1, dx=8)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'D': cls._roll(1, dx=6)
-                }
-            elif roll <= 52:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': cls._roll(1, dx=6)
-                }
-            elif roll <= 58:
-                gem_art_magic[cls.art_keyword] = {
-                    2500: cls._roll(1, dx=10)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': cls._roll(1, dx=6)
-                }
-            elif roll <= 63:
-                gem_art_magic[cls.art_keyword] = {
-                    7500: cls._roll(1, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': cls._roll(1, dx=6)
-                }
-            elif roll <= 68:
-                gem_art_magic[cls.gems_keyword] = {
-                    5000: cls._roll(1, dx=8)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'E': cls._roll(1, dx=6)
-                }
-            elif roll <= 69:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 70:
-                gem_art_magic[cls.art_keyword] = {
-                    2500: cls._roll(1, dx=10)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 71:
-                gem_art_magic[cls.art_keyword] = {
-                    7500: cls._roll(1, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 72:
-                gem_art_magic[cls.gems_keyword] = {
-                    5000: cls._roll(1, dx=8)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'G': cls._roll(1, dx=4)
-                }
-            elif roll <= 74:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 76:
-                gem_art_magic[cls.art_keyword] = {
-                    2500: cls._roll(1, dx=10)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 78:
-                gem_art_magic[cls.art_keyword] = {
-                    7500: cls._roll(1, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 80:
-                gem_art_magic[cls.gems_keyword] = {
-                    5000: cls._roll(1, dx=8)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'H': cls._roll(1, dx=4)
-                }
-            elif roll <= 85:
-                gem_art_magic[cls.gems_keyword] = {
-                    1000: cls._roll(3, dx=6)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': cls._roll(1, dx=4)
-                }
-            elif roll <= 90:
-                gem_art_magic[cls.art_keyword] = {
-                    2500: cls._roll(1, dx=10)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': cls._roll(1, dx=4)
-                }
-            elif roll <= 95:
-                gem_art_magic[cls.art_keyword] = {
-                    7500: cls._roll(1, dx=4)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': cls._roll(1, dx=4)
-                }
+    def _coins(cls, cr, rng=None):
+        rng = np.random.default_rng(rng)
+        return {coin: expression.sample(rng=rng) for coin, expression in cls._hoard_coin_dice(cr)}
+    
+    @classmethod
+    def _compact_items(cls, counts, indices, rng=None):
+        """
+        Items for a dict of gem or art value (or magic item table)
+        to quantity, as a dict of the same keys to uint8 arrays of
+        the items' indices in their table, see expand_treasure. 
+        indices(key, n, rng=rng) draws the indices of n items.
+        """
+        return {key: indices(key, n, rng=rng).astype(np.uint8) for key, n in counts.items()}
+    
+    @classmethod
+    def _connect_walls(cls, A, B, rng=None):
+        """
+        Helper function to remove the fewest walls from A and B
+        needed to leave at most max_connected_components 
+        connected components. Walls between two different 
+        components are visited in a random order and removed 
+        whenever they join components that are still apart 
+        (Kruskal's algorithm on the components).
+        """
+        rng = np.random.default_rng(rng)
+        n_components, labels = connected_components(cls._adjacency(A, B))
+        if n_components <= cls.max_connected_components:
+            return A, B
+        labels = labels.reshape(A.shape[0], B.shape[1])
+
+        # walls separating two components, as flat indices into
+        # A followed by flat indices into B
+        A_mask = (A == cls.wall_code) & (labels[:, :-1] != labels[:, 1:])
+        B_mask = (B == cls.wall_code) & (labels[:-1, :] != labels[1:, :])
+        walls = np.concatenate((np.flatnonzero(A_mask), A.size + np.flatnonzero(B_mask)))
+        first = np.concatenate((labels[:, :-1][A_mask], labels[:-1, :][B_mask]))
+        second = np.concatenate((labels[:, 1:][A_mask], labels[1:, :][B_mask]))
+
+        parent = np.arange(n_components)
+        for k in rng.permutation(len(walls)):
+            root1 = cls._find_root(parent, first[k])
+            root2 = cls._find_root(parent, second[k])
+            if root1 == root2:
+                continue
+            
+            parent[root1] = root2
+            if walls[k] < A.size:
+                A.flat[walls[k]] = cls.open_code
             else:
-                gem_art_magic[cls.gems_keyword] = {
-                    5000: cls._roll(1, dx=8)
-                }
-                gem_art_magic[cls.magic_items_keyword] = {
-                    'I': cls._roll(1, dx=4)
-                }
+                B.flat[walls[k] - A.size] = cls.open_code
+            
+            n_components -= 1
+            if n_components <= cls.max_connected_components:
+                break
+        
+        return A, B
+    
+    @classmethod
+    def _encounter_generator(cls, party, player_exp_source=None, monster_source=None, rng=None, encounter_index=None, party_thresholds=None, theme_mask=None):
+        """
+        A Dungeon without a map, that can only generate encounters
+        (generate_encounter, generate_all_encounters and 
+        generate_encounter_xp) for party, see EncounterService.
+        """
+        dungeon = cls.__new__(cls)
+        dungeon.rng = np.random.default_rng(rng)
+        dungeon.party = party
+        dungeon.avg_party_level = cls._avg_party_level(party)
+        dungeon._setup_encounters(
+            player_exp_source, 
+            monster_source, 
+            encounter_index=encounter_index, 
+            party_thresholds=party_thresholds,
+            theme_mask=theme_mask
+        )
+        return dungeon
+    
+    @classmethod
+    def _gem_indices(cls, value, n, rng=None):
+        if value not in gem_tables:
+            raise ValueError(f'Invalid gem value: {value}')
+        return roll_many(rng, 1, dx=len(gem_tables[value]), k=n) - 1
+    
+    @classmethod
+    def _gems(cls, value, n, rng=None):
+        indices = cls._gem_indices(value, n, rng=rng)
+        names = gem_tables[value]
+        return [names[i] for i in indices.tolist()]
+    
+    @classmethod
+    def _gems_art_magic(cls, cr, rng=None):
+        rng = np.random.default_rng(rng)
+        roll = cls._roll(1, dx=100, rng=rng)
+        band = cls._band(cr, cls.treasure_thresholds)
+        _, gems, art, magic_items = hoard_tables[band][bisect_left(hoard_rolls[band], roll)]
 
+        gem_art_magic = dict()
+        if gems is not None:
+            value, quantity = gems
+            gem_art_magic[cls.gems_keyword] = {value: dice(quantity).sample(rng=rng)}  # value, quantity
+        if art is not None:
+            value, quantity = art
+            gem_art_magic[cls.art_keyword] = {value: dice(quantity).sample(rng=rng)}
+        if magic_items:
+            gem_art_magic[cls.magic_items_keyword] = {
+                table: dice(quantity).sample(rng=rng) for table, quantity in magic_items
+            }
         return gem_art_magic
     
     @classmethod
-    def _gems_from_dict(cls, treasure_gems):
+    def _gems_from_dict(cls, treasure_gems, rng=None, compact=False):
+        rng = np.random.default_rng(rng)
+        if compact:
+            return cls._compact_items(treasure_gems, cls._gem_indices, rng=rng)
         total_gems = []
         for value in treasure_gems:
-            total_gems = total_gems + cls._gems(value, treasure_gems[value])
+            total_gems.extend(cls._gems(value, treasure_gems[value], rng=rng))
 
         return total_gems
     
     @classmethod
-    def _magic_item_table_A(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 50:
-            return 'Potion of healing'
-        elif roll <= 60:
-            return 'Spell scroll (cantrip)'
-        elif roll <= 70:
-            return 'Potion of climbing'
-        elif roll <= 90:
-            return 'Spell scroll (1st level)'
-        elif roll <= 94:
-            return 'Spell scroll (2nd level)'
-        elif roll <= 98:
-            return 'Potion of healing (greater)'
-        elif roll <= 99:
-            return 'Bag of holding'
-        else:
-            return 'Driftglobe'
-        
+    @lru_cache(maxsize=1024)
+    def _hoard_coin_dice(cls, cr):
+        """
+        hoard_coin_dice as (coin keyword, DiceExpression) pairs,
+        compiled once per cr.
+        """
+        formulas = cls.hoard_coin_formulas[cls._band(cr, cls.treasure_thresholds)]
+        return tuple((coin, dice(formula, cr=cr)) for coin, formula in formulas.items())
+    
     @classmethod
-    def _magic_item_table_B(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 15:
-            return 'Potion of healing'
-        elif roll <= 22:
-            return 'Potion of fire breath'
-        elif roll <= 29:
-            return 'Potion of resistance'
-        elif roll <= 34:
-            return 'Ammunition, +1'
-        elif roll <= 39:
-            return 'Potion of animal friendship'
-        elif roll <= 44:
-            return 'Potion of hill giant strength'
-        elif roll <= 49:
-            return 'Potion of growth'
-        elif roll <= 54:
-            return 'Potion of water breathing'
-        elif roll <= 59:
-            return 'Spell scroll (2nd level)'
-        elif roll <= 64:
-            return 'Spell scroll (3rd level)'
-        elif roll <= 67:
-            return 'Bag of holding'
-        elif roll <= 70:
-            return 'Keoghtom’s ointment'
-        elif roll <= 73:
-            return 'Oil of slipperiness'
-        elif roll <= 75:
-            return 'Dust of disappearance'
-        elif roll <= 77:
-            return 'Dust of dryness'
-        elif roll <= 79:
-            return 'Dust of sneezing and choking'
-        elif roll <= 81:
-            return 'Elemental gem'
-        elif roll <= 83:
-            return 'Philter of love'
-        elif roll <= 84:
-            return 'Alchemy jug'
-        elif roll <= 85:
-            return 'Cap of water breathing'
-        elif roll <= 86:
-            return 'Cloak of the manta ray'
-        elif roll <= 87:
-            return 'Driftglobe'
-        elif roll <= 88:
-            return 'Goggles of night'
-        elif roll <= 89:
-            return 'Helm of comprehending languages'
-        elif roll <= 90:
-            return 'Immovable rod'
-        elif roll <= 91:
-            return 'Lantern of revealing'
-        elif roll <= 92:
-            return 'Mariner’s armor'
-        elif roll <= 93:
-            return 'Mithral armor'
-        elif roll <= 94:
-            return 'Potion of poison'
-        elif roll <= 95:
-            return 'Ring of swimming'
-        elif roll <= 96:
-            return 'Robe of useful items'
-        elif roll <= 97:
-            return 'Rope of climbing'
-        elif roll <= 98:
-            return 'Saddle of the cavalier'
-        elif roll <= 99:
-            return 'Wand of magic detection'
-        else:
-            return 'Wand of secrets'
-
+    def _magic_item_indices(cls, table, n, rng=None):
+        if table not in magic_item_thresholds:
+            raise ValueError(f'Invalid magic item table: {table}')
+        thresholds = magic_item_thresholds[table]
+        draws = roll_many(rng, 1, dx=thresholds[-1], k=n) - 1
+        return np.searchsorted(thresholds, draws, side='right')
+    
     @classmethod
-    def _magic_item_table_C(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 15:
-            return 'Potion of healing (superior)'
-        elif roll <= 22:
-            return 'Spell scroll (4th level)'
-        elif roll <= 27:
-            return 'Ammunition, +2'
-        elif roll <= 32:
-            return 'Potion of clairvoyance'
-        elif roll <= 37:
-            return 'Potion of diminution'
-        elif roll <= 42:
-            return 'Potion of gaseous form'
-        elif roll <= 47:
-            return 'Potion of frost giant strength'
-        elif roll <= 52:
-            return 'Potion of stone giant strength'
-        elif roll <= 57:
-            return 'Potion of heroism'
-        elif roll <= 62:
-            return 'Potion of invulnerability'
-        elif roll <= 67:
-            return 'Potion of mind reading'
-        elif roll <= 72:
-            return 'Spell scroll (5th level)'
-        elif roll <= 75:
-            return 'Elixir of health'
-        elif roll <= 78:
-            return 'Oil of etherealness'
-        elif roll <= 81:
-            return 'Potion of fire giant strength'
-        elif roll <= 84:
-            return 'Quaal’s feather token'
-        elif roll <= 87:
-            return 'Scroll of protection'
-        elif roll <= 89:
-            return 'Bag of beans'
-        elif roll <= 91:
-            return 'Bead of force'
-        elif roll <= 92:
-            return 'Chime of opening'
-        elif roll <= 93:
-            return 'Decanter of endless water'
-        elif roll <= 94:
-            return 'Eyes of minute seeing'
-        elif roll <= 95:
-            return 'Folding boat'
-        elif roll <= 96:
-            return 'Heward’s handy haversack'
-        elif roll <= 97:
-            return 'Horseshoes of speed'
-        elif roll <= 98:
-            return 'Necklace of fireballs'
-        elif roll <= 99:
-            return 'Periapt of health'
-        else:
-            return 'Sending stones'
-
+    def _magic_item_table_A(cls, rng=None):
+        return cls._magic_items('A', 1, rng=rng)[0]
+    
     @classmethod
-    def _magic_item_table_D(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 20:
-            return 'Potion of healing (supreme)'
-        elif roll <= 30:
-            return 'Potion of invisibility'
-        elif roll <= 40:
-            return 'Potion of speed'
-        elif roll <= 50:
-            return 'Spell scroll (6th level)'
-        elif roll <= 57:
-            return 'Spell scroll (7th level)'
-        elif roll <= 62:
-            return 'Ammunition, +3'
-        elif roll <= 67:
-            return 'Oil of sharpness'
-        elif roll <= 72:
-            return 'Potion of flying'
-        elif roll <= 77:
-            return 'Potion of cloud giant strength'
-        elif roll <= 82:
-            return 'Potion of longevity'
-        elif roll <= 87:
-            return 'Potion of vitality'
-        elif roll <= 92:
-            return 'Spell scroll (8th level)'
-        elif roll <= 95:
-            return 'Horseshoes of a zephyr'
-        elif roll <= 98:
-            return 'Nolzur’s marvelous pigments'
-        elif roll <= 99:
-            return 'Bag of devouring'
-        else:
-            return 'Portable hole'
-
+    def _magic_item_table_B(cls, rng=None):
+        return cls._magic_items('B', 1, rng=rng)[0]
+    
     @classmethod
-    def _magic_item_table_E(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 30:
-            return 'Spell scroll (8th level)'
-        elif roll <= 55:
-            return 'Potion of storm giant strength'
-        elif roll <= 70:
-            return 'Potion of healing (supreme)'
-        elif roll <= 85:
-            return 'Spell scroll (9th level)'
-        elif roll <= 93:
-            return 'Universal solvent'
-        elif roll <= 98:
-            return 'Arrow of slaying'
-        else:
-            return 'Sovereign glue'
-
+    def _magic_item_table_C(cls, rng=None):
+        return cls._magic_items('C', 1, rng=rng)[0]
+    
     @classmethod
-    def _magic_item_table_F(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 15:
-            return 'Weapon, +1'
-        elif roll <= 18:
-            return 'Shield, +1'
-        elif roll <= 21:
-            return 'Sentinel shield'
-        elif roll <= 23:
-            return 'Amulet of proof against detection and location'
-        elif roll <= 25:
-            return 'Boots of elvenkind'
-        elif roll <= 27:
-            return 'Boots of striding and springing'
-        elif roll <= 29:
-            return 'Bracers of archery'
-        elif roll <= 31:
-            return 'Brooch of shielding'
-        elif roll <= 33:
-            return 'Broom of flying'
-        elif roll <= 35:
-            return 'Cloak of elvenkind'
-        elif roll <= 37:
-            return 'Cloak of protection'
-        elif roll <= 39:
-            return 'Gauntlets of ogre power'
-        elif roll <= 41:
-            return 'Hat of disguise'
-        elif roll <= 43:
-            return 'Javelin of lightning'
-        elif roll <= 45:
-            return 'Pearl of power'
-        elif roll <= 47:
-            return 'Rod of the pact keeper, +1'
-        elif roll <= 49:
-            return 'Slippers of spider climbing'
-        elif roll <= 51:
-            return 'Staff of the adder'
-        elif roll <= 53:
-            return 'Staff of the python'
-        elif roll <= 55:
-            return 'Sword of vengeance'
-        elif roll <= 57:
-            return 'Trident of fish command'
-        elif roll <= 59:
-            return 'Wand of magic missiles'
-        elif roll <= 61:
-            return 'Wand of the war mage, +1'
-        elif roll <= 63:
-            return 'Wand of web'
-        elif roll <= 65:
-            return 'Weapon of warning'
-        elif roll <= 66:
-            return 'Adamantine armor (chain mail)'
-        elif roll <= 67:
-            return 'Adamantine armor (chain shirt)'
-        elif roll <= 68:
-            return 'Adamantine armor (scale mail)'
-        elif roll <= 69:
-            return 'Bag of tricks (gray)'
-        elif roll <= 70:
-            return 'Bag of tricks (rust)'
-        elif roll <= 71:
-            return 'Bag of tricks (tan)'
-        elif roll <= 72:
-            return 'Boots of the winterlands'
-        elif roll <= 73:
-            return 'Circlet of blasting'
-        elif roll <= 74:
-            return 'Deck of illusions'
-        elif roll <= 75:
-            return 'Eversmoking bottle'
-        elif roll <= 76:
-            return 'Eyes of charming'
-        elif roll <= 77:
-            return 'Eyes of the eagle'
-        elif roll <= 78:
-            return 'Figurine of wondrous power (silver raven)'
-        elif roll <= 79:
-            return 'Gem of brightness'
-        elif roll <= 80:
-            return 'Gloves of missile snaring'
-        elif roll <= 81:
-            return 'Gloves of swimming and climbing'
-        elif roll <= 82:
-            return 'Gloves of thievery'
-        elif roll <= 83:
-            return 'Headband of intellect'
-        elif roll <= 84:
-            return 'Helm of telepathy'
-        elif roll <= 85:
-            return 'Instrument of the bards (Doss lute)'
-        elif roll <= 86:
-            return 'Instrument of the bards (Fochlucan bandore)'
-        elif roll <= 87:
-            return 'Instrument of the bards (Mac-Fuimidh cittern)'
-        elif roll <= 88:
-            return 'Medallion of thoughts'
-        elif roll <= 89:
-            return 'Necklace of adaptation'
-        elif roll <= 90:
-            return 'Periapt of wound closure'
-        elif roll <= 91:
-            return 'Pipes of haunting'
-        elif roll <= 92:
-            return 'Pipes of the sewers'
-        elif roll <= 93:
-            return 'Ring of jumping'
-        elif roll <= 94:
-            return 'Ring of mind shielding'
-        elif roll <= 95:
-            return 'Ring of warmth'
-        elif roll <= 96:
-            return 'Ring of water walking'
-        elif roll <= 97:
-            return 'Quiver of Ehlonna'
-        elif roll <= 98:
-            return 'Stone of good luck (luckstone)'
-        elif roll <= 99:
-            return 'Wind fan'
-        else:
-            return 'Winged boots'
-
+    def _magic_item_table_D(cls, rng=None):
+        return cls._magic_items('D', 1, rng=rng)[0]
+    
     @classmethod
-    def _magic_item_table_G(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 11:
-            return 'Weapon, +2'
-        elif roll <= 14:
-            figurines = [
-                None,
-                'Figurine of wondrous power (Bronze griffon)',
-                'Figurine of wondrous power (Ebony fly)',
-                'Figurine of wondrous power (Golden lions)',
-                'Figurine of wondrous power (Ivory goats)',
-                'Figurine of wondrous power (Marble elephant)',
-                'Figurine of wondrous power (Onyx dog)',
-                'Figurine of wondrous power (Onyx dog)',
-                'Figurine of wondrous power (Serpentine owl)'
-            ]
-            return figurines[cls._roll(1, dx=8)]
-        elif roll <= 15:
-            return 'Adamantine armor (breastplate)'
-        elif roll <= 16:
-            return 'Adamantine armor (splint)'
-        elif roll <= 17:
-            return 'Amulet of health'
-        elif roll <= 18:
-            return 'Armor of vulnerability'
-        elif roll <= 19:
-            return 'Arrow-catching shield'
-        elif roll <= 20:
-            return 'Belt of dwarvenkind'
-        elif roll <= 21:
-            return 'Belt of hill giant strength'
-        elif roll <= 22:
-            return 'Berserker axe'
-        elif roll <= 23:
-            return 'Boots of levitation'
-        elif roll <= 24:
-            return 'Boots of speed'
-        elif roll <= 25:
-            return 'Bowl of commanding water elementals'
-        elif roll <= 26:
-            return 'Bracers of defense'
-        elif roll <= 27:
-            return 'Brazier of commanding fire elementals'
-        elif roll <= 28:
-            return 'Cape of the mountebank'
-        elif roll <= 29:
-            return 'Censer of controlling air elementals'
-        elif roll <= 30:
-            return 'Armor, +1 chain mail'
-        elif roll <= 31:
-            return 'Armor of resistance (chain mail)'
-        elif roll <= 32:
-            return 'Armor, +1 chain shirt'
-        elif roll <= 33:
-            return 'Armor of resistance (chain shirt)'
-        elif roll <= 34:
-            return 'Cloak of displacement'
-        elif roll <= 35:
-            return 'Cloak of the bat'
-        elif roll <= 36:
-            return 'Cube of force'
-        elif roll <= 37:
-            return 'Daern’s instant fortress'
-        elif roll <= 38:
-            return 'Dagger of venom'
-        elif roll <= 39:
-            return 'Dimensional shackles'
-        elif roll <= 40:
-            return 'Dragon slayer'
-        elif roll <= 41:
-            return 'Elven chain'
-        elif roll <= 42:
-            return 'Flame tongue'
-        elif roll <= 43:
-            return 'Gem of seeing'
-        elif roll <= 44:
-            return 'Giant slayer'
-        elif roll <= 45:
-            return 'Glamoured studded leather'
-        elif roll <= 46:
-            return 'Helm of teleportation'
-        elif roll <= 47:
-            return 'Horn of blasting'
-        elif roll <= 48:
-            return 'Horn of Valhalla (silver or brass)'
-        elif roll <= 49:
-            return 'Instrument of the bards (Canaith mandolin)'
-        elif roll <= 50:
-            return 'Instrument of the bards (Cli lyre)'
-        elif roll <= 51:
-            return 'Ioun stone (awareness)'
-        elif roll <= 52:
-            return 'Ioun stone (protection)'
-        elif roll <= 53:
-            return 'Ioun stone (reserve)'
-        elif roll <= 54:
-            return 'Ioun stone (sustenance)'
-        elif roll <= 55:
-            return 'Iron bands of Bilarro'
-        elif roll <= 56:
-            return 'Armor, +1 leather'
-        elif roll <= 57:
-            return 'Armor of resistance (leather)'
-        elif roll <= 58:
-            return 'Mace of disruption'
-        elif roll <= 59:
-            return 'Mace of smiting'
-        elif roll <= 60:
-            return 'Mace of terror'
-        elif roll <= 61:
-            return 'Mantle of spell resistance'
-        elif roll <= 62:
-            return 'Necklace of prayer beads'
-        elif roll <= 63:
-            return 'Periapt of proof against poison'
-        elif roll <= 64:
-            return 'Ring of animal influence'
-        elif roll <= 65:
-            return 'Ring of evasion'
-        elif roll <= 66:
-            return 'Ring of feather falling'
-        elif roll <= 67:
-            return 'Ring of free action'
-        elif roll <= 68:
-            return 'Ring of protection'
-        elif roll <= 69:
-            return 'Ring of resistance'
-        elif roll <= 70:
-            return 'Ring of spell storing'
-        elif roll <= 71:
-            return 'Ring of the ram'
-        elif roll <= 72:
-            return 'Ring of X-ray vision'
-        elif roll <= 73:
-            return 'Robe of eyes'
-        elif roll <= 74:
-            return 'Rod of rulership'
-        elif roll <= 75:
-            return 'Rod of the pact keeper, +2'
-        elif roll <= 76:
-            return 'Rope of entanglement'
-        elif roll <= 77:
-            return 'Armor, +1 scale mail'
-        elif roll <= 78:
-            return 'Armor of resistance (scale mail)'
-        elif roll <= 79:
-            return 'Shield, +2'
-        elif roll <= 80:
-            return 'Shield of missile attraction'
-        elif roll <= 81:
-            return 'Staff of charming'
-        elif roll <= 82:
-            return 'Staff of healing'
-        elif roll <= 83:
-            return 'Staff of swarming insects'
-        elif roll <= 84:
-            return 'Staff of the woodlands'
-        elif roll <= 85:
-            return 'Staff of withering'
-        elif roll <= 86:
-            return 'Stone of controlling earth elementals'
-        elif roll <= 87:
-            return 'Sun blade'
-        elif roll <= 88:
-            return 'Sword of life stealing'
-        elif roll <= 89:
-            return 'Sword of wounding'
-        elif roll <= 90:
-            return 'Tentacle rod'
-        elif roll <= 91:
-            return 'Vicious weapon'
-        elif roll <= 92:
-            return 'Wand of binding'
-        elif roll <= 93:
-            return 'Wand of enemy detection'
-        elif roll <= 94:
-            return 'Wand of fear'
-        elif roll <= 95:
-            return 'Wand of fireballs'
-        elif roll <= 96:
-            return 'Wand of lightning bolts'
-        elif roll <= 97:
-            return 'Wand of paralysis'
-        elif roll <= 98:
-            return 'Wand of the war mage, +2'
-        elif roll <= 99:
-            return 'Wand of wonder'
-        else:
-            return 'Wings of flying'
-
+    def _magic_item_table_E(cls, rng=None):
+        return cls._magic_items('E', 1, rng=rng)[0]
+    
     @classmethod
-    def _magic_item_table_H(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 10:
-            return 'Weapon, +3'
-        elif roll <= 12:
-            return 'Amulet of the planes'
-        elif roll <= 14:
-            return 'Carpet of flying'
-        elif roll <= 16:
-            return 'Crystal ball (very rare version)'
-        elif roll <= 18:
-            return 'Ring of regeneration'
-        elif roll <= 20:
-            return 'Ring of shooting stars'
-        elif roll <= 22:
-            return 'Ring of telekinesis'
-        elif roll <= 24:
-            return 'Robe of scintillating colors'
-        elif roll <= 26:
-            return 'Robe of stars'
-        elif roll <= 28:
-            return 'Rod of absorption'
-        elif roll <= 30:
-            return 'Rod of alertness'
-        elif roll <= 32:
-            return 'Rod of security'
-        elif roll <= 34:
-            return 'Rod of the pact keeper, +3'
-        elif roll <= 36:
-            return 'Scimitar of speed'
-        elif roll <= 38:
-            return 'Shield, +3'
-        elif roll <= 40:
-            return 'Staff of fire'
-        elif roll <= 42:
-            return 'Staff of frost'
-        elif roll <= 44:
-            return 'Staff of power'
-        elif roll <= 46:
-            return 'Staff of striking'
-        elif roll <= 48:
-            return 'Staff of thunder and lightning'
-        elif roll <= 50:
-            return 'Sword of sharpness'
-        elif roll <= 52:
-            return 'Wand of polymorph'
-        elif roll <= 54:
-            return 'Wand of the war mage, +3'
-        elif roll <= 55:
-            return 'Adamantine armor (half plate)'
-        elif roll <= 56:
-            return 'Adamantine armor (plate)'
-        elif roll <= 57:
-            return 'Animated shield'
-        elif roll <= 58:
-            return 'Belt of fire giant strength'
-        elif roll <= 59:
-            return 'Belt of frost giant strength (or stone)'
-        elif roll <= 60:
-            return 'Armor, +1 breastplate'
-        elif roll <= 61:
-            return 'Armor of resistance (breastplate)'
-        elif roll <= 62:
-            return 'Candle of invocation'
-        elif roll <= 63:
-            return 'Armor, +2 chain mail'
-        elif roll <= 64:
-            return 'Armor, +2 chain shirt'
-        elif roll <= 65:
-            return 'Cloak of arachnida'
-        elif roll <= 66:
-            return 'Dancing sword'
-        elif roll <= 67:
-            return 'Demon armor'
-        elif roll <= 68:
-            return 'Dragon scale mail'
-        elif roll <= 69:
-            return 'Dwarven plate'
-        elif roll <= 70:
-            return 'Dwarven thrower'
-        elif roll <= 71:
-            return 'Efreeti bottle'
-        elif roll <= 72:
-            return 'Figurine of wondrous power (obsidian steed)'
-        elif roll <= 73:
-            return 'Frost brand'
-        elif roll <= 74:
-            return 'Helm of brilliance'
-        elif roll <= 75:
-            return 'Horn of Valhalla (bronze)'
-        elif roll <= 76:
-            return 'Instrument of the bards (Anstruth harp)'
-        elif roll <= 77:
-            return 'Ioun stone (absorption)'
-        elif roll <= 78:
-            return 'Ioun stone (agility)'
-        elif roll <= 79:
-            return 'Ioun stone (fortitude)'
-        elif roll <= 80:
-            return 'Ioun stone (insight)'
-        elif roll <= 81:
-            return 'Ioun stone (intellect)'
-        elif roll <= 82:
-            return 'Ioun stone (leadership)'
-        elif roll <= 83:
-            return 'Ioun stone (strength)'
-        elif roll <= 84:
-            return 'Armor, +2 leather'
-        elif roll <= 85:
-            return 'Manual of bodily health'
-        elif roll <= 86:
-            return 'Manual of gainful exercise'
-        elif roll <= 87:
-            return 'Manual of golems'
-        elif roll <= 88:
-            return 'Manual of quickness of action'
-        elif roll <= 89:
-            return 'Mirror of life trapping'
-        elif roll <= 90:
-            return 'Nine lives stealer'
-        elif roll <= 91:
-            return 'Oathbow'
-        elif roll <= 92:
-            return 'Armor, +2 scale mail'
-        elif roll <= 93:
-            return 'Spellguard shield'
-        elif roll <= 94:
-            return 'Armor, +1 splint'
-        elif roll <= 95:
-            return 'Armor of resistance (splint)'
-        elif roll <= 96:
-            return 'Armor, +1 studded leather'
-        elif roll <= 97:
-            return 'Armor of resistance (studded leather)'
-        elif roll <= 98:
-            return 'Tome of clear thought'
-        elif roll <= 99:
-            return 'Tome of leadership and influence'
-        else:
-            return 'Tome of understanding'
-
+    def _magic_item_table_F(cls, rng=None):
+        return cls._magic_items('F', 1, rng=rng)[0]
+    
     @classmethod
-    def _magic_item_table_I(cls):
-        roll = cls._roll(1, dx=100)
-        if roll <= 5:
-            return 'Defender'
-        elif roll <= 10:
-            return 'Hammer of thunderbolts'
-        elif roll <= 15:
-            return 'Luck blade'
-        elif roll <= 20:
-            return 'Sword of answering'
-        elif roll <= 23:
-            return 'Holy avenger'
-        elif roll <= 26:
-            return 'Ring of djinni summoning'
-        elif roll <= 29:
-            return 'Ring of invisibility'
-        elif roll <= 32:
-            return 'Ring of spell turning'
-        elif roll <= 35:
-            return 'Rod of lordly might'
-        elif roll <= 38:
-            return 'Staff of the magi'
-        elif roll <= 41:
-            return 'Vorpal sword'
-        elif roll <= 43:
-            return 'Belt of cloud giant strength'
-        elif roll <= 45:
-            return 'Armor, +2 breastplate'
-        elif roll <= 47:
-            return 'Armor, +3 chain mail'
-        elif roll <= 49:
-            return 'Armor, +3 chain shirt'
-        elif roll <= 51:
-            return 'Cloak of invisibility'
-        elif roll <= 53:
-            return 'Crystal ball (legendary version)'
-        elif roll <= 55:
-            return 'Armor, +1 half plate'
-        elif roll <= 57:
-            return 'Iron flask'
-        elif roll <= 59:
-            return 'Armor, +3 leather'
-        elif roll <= 61:
-            return 'Armor, +1 plate'
-        elif roll <= 63:
-            return 'Robe of the archmagi'
-        elif roll <= 65:
-            return 'Rod of resurrection'
-        elif roll <= 67:
-            return 'Armor, +1 scale mail'
-        elif roll <= 69:
-            return 'Scarab of protection'
-        elif roll <= 71:
-            return 'Armor, +2 splint'
-        elif roll <= 73:
-            return 'Armor, +2 studded leather'
-        elif roll <= 75:
-            return 'Well of many worlds'
-        elif roll <= 76:
-            armor = [
-                None,
-                'Armor, +2 half plate',
-                'Armor, +2 half plate',
-                'Armor, +2 plate',
-                'Armor, +2 plate',
-                'Armor, +3 studded leather',
-                'Armor, +3 studded leather',
-                'Armor, +3 breastplate',
-                'Armor, +3 breastplate',
-                'Armor, +3 splint',
-                'Armor, +3 splint',
-                'Armor, +3 half plate',
-                'Armor, +3 plate'
-            ]
-            return armor[cls._roll(1, dx=12)]
-        elif roll <= 77:
-            return 'Apparatus of Kwalish'
-        elif roll <= 78:
-            return 'Armor of invulnerability'
-        elif roll <= 79:
-            return 'Belt of storm giant strength'
-        elif roll <= 80:
-            return 'Cubic gate'
-        elif roll <= 81:
-            return 'Deck of many things'
-        elif roll <= 82:
-            return 'Efreeti chain'
-        elif roll <= 83:
-            return 'Armor of resistance (half plate)'
-        elif roll <= 84:
-            return 'Horn of Valhalla (iron)'
-        elif roll <= 85:
-            return 'Instrument of the bards (Ollamh harp)'
-        elif roll <= 86:
-            return 'Ioun stone (greater absorption)'
-        elif roll <= 87:
-            return 'Ioun stone (mastery)'
-        elif roll <= 88:
-            return 'Ioun stone (regeneration)'
-        elif roll <= 89:
-            return 'Plate armor of etherealness'
-        elif roll <= 90:
-            return 'Armor of resistance (plate)'
-        elif roll <= 91:
-            return 'Ring of air elemental command'
-        elif roll <= 92:
-            return 'Ring of earth elemental command'
-        elif roll <= 93:
-            return 'Ring of fire elemental command'
-        elif roll <= 94:
-            return 'Ring of three wishes'
-        elif roll <= 95:
-            return 'Ring of water elemental command'
-        elif roll <= 96:
-            return 'Sphere of annihilation'
-        elif roll <= 97:
-            return 'Talisman of pure good'
-        elif roll <= 98:
-            return 'Talisman of the sphere'
-        elif roll <= 99:
-            return 'Talisman of ultimate evil'
-        else:
-            return 'Tome of the stilled tongue'
+    def _magic_item_table_G(cls, rng=None):
+        return cls._magic_items('G', 1, rng=rng)[0]
     
     @classmethod
-    def _magic_items(cls, table, n):
-        if table == 'A':
-            return [cls._magic_item_table_A() for _ in range(n)]
-        elif table == 'B':
-            return [cls._magic_item_table_B() for _ in range(n)]
-        elif table == 'C':
-            return [cls._magic_item_table_C() for _ in range(n)]
-        elif table == 'D':
-            return [cls._magic_item_table_D() for _ in range(n)]
-        elif table == 'E':
-            return [cls._magic_item_table_E() for _ in range(n)]
-        elif table == 'F':
-            return [cls._magic_item_table_F() for _ in range(n)]
-        elif table == 'G':
-            return [cls._magic_item_table_G() for _ in range(n)]
-        elif table == 'H':
-            return [cls._magic_item_table_H() for _ in range(n)]
-        elif table == 'I':
-            return [cls._magic_item_table_I() for _ in range(n)]
-        else:
-            raise ValueError(f'Invalid magic item table: {table}')
+    def _magic_item_table_H(cls, rng=None):
+        return cls._magic_items('H', 1, rng=rng)[0]
+    
+    @classmethod
+    def _magic_item_table_I(cls, rng=None):
+        return cls._magic_items('I', 1, rng=rng)[0]
     
     @classmethod
-    def _magic_items_from_dict(cls, treasure_magic_items):
+    def _magic_items(cls, table, n, rng=None):
+        """
+        n items from magic item table A to I, drawn at once from 
+        the compiled tables in treasure_tables.
+        """
+        indices = cls._magic_item_indices(table, n, rng=rng)
+        return magic_item_names[table][indices].tolist()
+    
+    @classmethod
+    def _magic_items_from_dict(cls, treasure_magic_items, rng=None, compact=False):
+        rng = np.random.default_rng(rng)
+        if compact:
+            return cls._compact_items(treasure_magic_items, cls._magic_item_indices, rng=rng)
         total_magic_items = []
         for table in treasure_magic_items:
-            total_magic_items = total_magic_items + cls._magic_items(table, treasure_magic_items[table])
+            total_magic_items.extend(cls._magic_items(table, treasure_magic_items[table], rng=rng))
 
         return total_magic_items
     
+    @classmethod
+    def _monster_quantity_multiplier(cls, n):
+        """
+        Adjusted xp multiplier for n monsters, n can be an array.
+        """
+        return cls.monster_quantity_multipliers[
+            np.searchsorted(cls.monster_quantity_brackets, n)
+        ]
+    
+    @classmethod
+    def _wall_codes(cls, walls):
+        """
+        Helper function to convert an array of wall values 
+        (0, open_door_value, closed_door_value or 1) to uint8 
+        wall codes.
+        """
+        return np.searchsorted(cls.wall_code_values, walls).astype(np.uint8)
+    
     
     # static methods
     @staticmethod
@@ -3408,18 +2615,24 @@ class Dungeon:
         return total_levels / party_members
     
     @staticmethod
-    def _extract_cr(row):
-        if 'lvl' in row.name:
-            return float(row.name[row.name.find('lvl') + 4:])
-        elif row['cr'] == '1/2':
-            return .5
-        elif row['cr'] == '1/4':
-            return .25
-        elif row['cr'] == '1/8':
-            return .125
-        else:
-            return float(row['cr'])
-  
+    def _band(cr, thresholds):
+        """
+        Index of the first of the increasing thresholds that cr 
+        does not exceed, len(thresholds) above all of them.
+        """
+        return bisect_left(thresholds, cr)
+    
+    @staticmethod
+    def _find_root(parent, i):
+        """
+        Helper function to find the root of i in the union-find
+        forest parent, halving the path on the way up.
+        """
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
     @staticmethod
     def _indices(A):
         """ 
@@ -3432,20 +2645,8 @@ class Dungeon:
         return list(zip(x_indices, y_indices))
     
     @staticmethod
-    def _monster_quantity_multiplier(n):
-        if n <= 1:
-            return 1
-        elif n <= 2: 
-            return 1.5
-        elif n <= 6:
-            return 2
-        elif n <= 10:
-            return 2.5
-        elif n <= 14:
-            return 3
-        else:
-            return 4
-        
-    @staticmethod
-    def _roll(n, dx=6):
-        return np.sum(np.random.randint(1, dx + 1, size=n))
\ No newline at end of file
+    def _roll(n, dx=6, rng=None):
+        if isinstance(rng, DiceEngine):
+            return rng.roll(n, dx)
+        rng = np.random.default_rng(rng)
+        return int(np.sum(rng.integers(1, dx + 1, size=n)))
\ No newline at end of file
@@ -0,0 +1,315 @@
+import hashlib
+
+import numpy as np
+
+
+class EncounterIndex:
+    """
+    Every encounter of up to two monster types that lands exactly
+    on each difficulty, for one party and bestiary, with alias
+    tables to sample them in constant time.
+
+    Monsters worth the same xp are interchangeable as far as
+    difficulty goes, so compositions are enumerated over xp
+    classes and stored compactly as entries
+
+        (class a, quantity of a, class b, range of quantities of b)
+
+    with b = -1 for single type encounters. An encounter weighs 
+    the product of the crs of its monsters and every quantity in
+    range is equally likely. Sampling draws an entry from the 
+    alias table, a quantity in its range and then concrete 
+    monsters uniformly from each class.
+
+    This is a different distribution from 
+    Dungeon.generate_encounter's: the greedy builder picks one
+    monster at a time and often stops after one type or goes on
+    to three or more, while the index never has more than two 
+    and favours pairs, which outnumber single types. Use it when
+    fast, reproducible sampling matters more than matching the
+    greedy builder.
+
+    Build it once per party with EncounterIndex.build, keep it
+    with save and load, and pass it to Dungeon(encounter_index=...).
+    """
+    def __init__(self, party, bestiary, difficulty_values, monster_names,
+                 class_start, class_size, class_members, bands):
+        self.party = party
+        self.bestiary = bestiary
+        self.difficulty_values = difficulty_values
+        self.monster_names = monster_names
+        self.class_start = class_start
+        self.class_size = class_size
+        self.class_members = class_members
+        self.bands = bands  # difficulty value -> dict of entry arrays
+
+    @classmethod
+    def build(cls, source):
+        """
+        Enumerate the encounters of source's party.
+
+        Parameters
+        ----------
+        source:  Dungeon
+            Or anything with the same encounter attributes (party,
+            party_thresholds, difficulty_values, monster_names,
+            monster_cr, monster_xp, cr_mask, min_monsters) and the
+            _min_quantity helper.
+
+        Returns
+        -------
+        EncounterIndex
+        """
+        members = np.flatnonzero(source.cr_mask)
+        members = members[np.argsort(source.monster_xp[members], kind='stable')]
+        class_xp, class_start, class_size = np.unique(
+            source.monster_xp[members], return_index=True, return_counts=True
+        )
+        class_cr = source.monster_cr[members[class_start]]
+
+        bands = dict()
+        for k, difficulty_value in enumerate(source.difficulty_values[1:-1], start=1):
+            lower, upper = source.party_thresholds[k - 1], source.party_thresholds[k]
+            entries = enumerate_encounters(class_xp, lower, upper, source._min_quantity, source.min_monsters)
+            weight = cls._weights(entries, class_cr, class_size)
+            keep = weight > 0
+            entries = {key: value[keep] for key, value in entries.items()}
+            entries['prob'], entries['alias'] = cls._alias_table(weight[keep])
+            bands[int(difficulty_value)] = entries
+
+        return cls(
+            cls._party_key(source.party),
+            cls._bestiary_key(source.monster_names, source.monster_xp),
+            np.asarray(source.difficulty_values),
+            np.asarray(source.monster_names, dtype=object),
+            class_start,
+            class_size,
+            members,
+            bands
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index written by save.
+        """
+        with np.load(path) as f:
+            difficulty_values = f['difficulty_values']
+            bands = {
+                int(value): {
+                    key: f[f'band{value}_{key}']
+                    for key in ('a', 'count_a', 'b', 'low_b', 'high_b', 'prob', 'alias')
+                }
+                for value in difficulty_values[1:-1]
+            }
+            return cls(
+                tuple(map(tuple, f['party'].tolist())),
+                str(f['bestiary']),
+                difficulty_values,
+                f['monster_names'].astype(object),
+                f['class_start'],
+                f['class_size'],
+                f['class_members'],
+                bands
+            )
+
+    def save(self, path):
+        """
+        Write the index to path as a .npz file.
+        """
+        arrays = {
+            f'band{value}_{key}': array
+            for value, entries in self.bands.items()
+            for key, array in entries.items()
+        }
+        np.savez(
+            path,
+            party=np.array(self.party, dtype=int).reshape(-1, 2),
+            bestiary=np.array(self.bestiary),
+            difficulty_values=self.difficulty_values,
+            monster_names=np.asarray(self.monster_names, dtype=str),
+            class_start=self.class_start,
+            class_size=self.class_size,
+            class_members=self.class_members,
+            **arrays
+        )
+
+    def matches(self, source):
+        """
+        Whether the index was built for source's party, bestiary
+        and eligible monsters (cr_mask, including any theme).
+        """
+        return (
+            self.party == self._party_key(source.party)
+            and self.bestiary == self._bestiary_key(source.monster_names, source.monster_xp)
+            and np.array_equal(np.sort(self.class_members), np.flatnonzero(source.cr_mask))
+        )
+
+    def sample(self, difficulty_value, rng=None):
+        """
+        Draw an encounter of difficulty_value.
+
+        Parameters
+        ----------
+        difficulty_value:  int
+            One of the easy to deadly difficulty values.
+
+        rng:  numpy.random.Generator, optional
+
+        Returns
+        -------
+        dict of monster name to quantity
+        """
+        rng = np.random.default_rng(rng)
+        entries = self.bands[difficulty_value]
+        if len(entries['prob']) == 0:
+            raise ValueError(f'no encounter of up to two monster types has difficulty {difficulty_value}')
+
+        i = rng.integers(len(entries['prob']))
+        if rng.random() >= entries['prob'][i]:
+            i = entries['alias'][i]
+
+        a, b = entries['a'][i], entries['b'][i]
+        first = rng.integers(self.class_size[a])
+        count = int(rng.integers(entries['low_b'][i], entries['high_b'][i] + 1))
+        if b < 0:
+            return {self._monster_name(a, first): count}
+        
+        if a == b:
+            # a second, different monster from the same class
+            second = rng.integers(self.class_size[b] - 1)
+            second += second >= first
+        else:
+            second = rng.integers(self.class_size[b])
+        return {
+            self._monster_name(a, first): int(entries['count_a'][i]),
+            self._monster_name(b, second): count
+        }
+
+    def _monster_name(self, monster_class, i):
+        return self.monster_names[self.class_members[self.class_start[monster_class] + i]]
+
+    @staticmethod
+    def _alias_table(weights):
+        """
+        Vose's alias method, returns the acceptance probabilities
+        and aliases of each entry.
+        """
+        n = len(weights)
+        prob = weights * n / weights.sum() if n else weights.astype(float)
+        alias = np.arange(n)
+        small = list(np.flatnonzero(prob < 1))
+        large = list(np.flatnonzero(prob >= 1))
+        while small and large:
+            s, l = small.pop(), large[-1]
+            alias[s] = l
+            prob[l] -= 1 - prob[s]
+            if prob[l] < 1:
+                small.append(large.pop())
+        prob[small] = 1
+        prob[large] = 1
+        return prob, alias
+
+    @staticmethod
+    def _bestiary_key(monster_names, monster_xp):
+        digest = hashlib.sha1()
+        digest.update('\n'.join(map(str, monster_names)).encode())
+        digest.update(np.asarray(monster_xp, dtype=np.int64).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _party_key(party):
+        return tuple(sorted((int(level), int(count)) for level, count in party.items()))
+
+    @staticmethod
+    def _weights(entries, class_cr, class_size):
+        """
+        Total cr weight of the encounters behind each entry.
+        """
+        a, b = entries['a'], entries['b']
+        n = entries['high_b'] - entries['low_b'] + 1
+        single = b < 0
+        b = np.where(single, a, b)
+
+        weight_a = class_cr[a] * class_size[a]
+        weight_b = np.where(
+            a == b,
+            # ordered pairs of different monsters, halved since
+            # swapping the quantities gives the same encounters
+            class_cr[b] * (class_size[b] - 1) / 2,
+            class_cr[b] * class_size[b]
+        )
+        return np.where(single, weight_a, weight_a * weight_b) * n
+
+
+def enumerate_encounters(class_xp, lower, upper, min_quantity, min_monsters=1):
+    """
+    Every encounter of up to two xp classes with adjusted xp in
+    [lower, upper), as the entry arrays of EncounterIndex.
+
+    Parameters
+    ----------
+    class_xp:  numpy.ndarray of int
+        Distinct xp of the eligible monsters, in increasing order.
+
+    lower, upper:  int
+        Adjusted xp bounds of one difficulty, consecutive party
+        thresholds.
+
+    min_quantity:  callable
+        Dungeon._min_quantity of the party, which applies the
+        monster quantity multipliers.
+
+    min_monsters:  int
+        Smallest quantity of a monster in an encounter.
+
+    Returns
+    -------
+    dict of 'a', 'count_a', 'b', 'low_b' and 'high_b' to int arrays
+    """
+    entries = {key: [] for key in ('a', 'count_a', 'b', 'low_b', 'high_b')}
+
+    def add(a, count_a, b, low, high):
+        keep = low <= high
+        n = np.count_nonzero(keep)
+        entries['a'].append(np.full(n, a))
+        entries['count_a'].append(np.full(n, count_a))
+        entries['b'].append(np.broadcast_to(b, keep.shape)[keep])
+        entries['low_b'].append(low[keep])
+        entries['high_b'].append(high[keep])
+
+    # single monster types, with their quantity range in the b
+    # slots and b = -1
+    low = min_quantity(0, 0, class_xp, min_monsters, lower)
+    high = min_quantity(0, 0, class_xp, min_monsters, upper) - 1
+    for a in range(len(class_xp)):
+        add(a, 0, -1, low[a:a + 1], high[a:a + 1])
+
+    # pairs a <= b, every quantity of a with the range of b
+    for a, xp in enumerate(class_xp):
+        other_xp = class_xp[a:]
+        count_a = min_monsters
+        while True:
+            high = min_quantity(count_a * xp, count_a, other_xp, min_monsters, upper) - 1
+            if high.max() < min_monsters:
+                break
+            low = min_quantity(count_a * xp, count_a, other_xp, min_monsters, lower)
+            add(a, count_a, np.arange(a, len(class_xp)), low, high)
+            count_a += 1
+
+    return {key: np.concatenate(value).astype(int) for key, value in entries.items()}
+
+
+def has_encounter(class_xp, lower, upper, min_quantity, min_monsters=1):
+    """
+    Whether an encounter of up to two xp classes has adjusted xp
+    in [lower, upper), see enumerate_encounters. Single types are
+    checked first, in closed form.
+    """
+    if len(class_xp) == 0:
+        return False
+    low = min_quantity(0, 0, class_xp, min_monsters, lower)
+    high = min_quantity(0, 0, class_xp, min_monsters, upper) - 1
+    if np.any(low <= high):
+        return True
+    return len(enumerate_encounters(class_xp, lower, upper, min_quantity, min_monsters)['a']) > 0
@@ -0,0 +1,110 @@
+import numpy as np
+
+from .data import load_bestiary_index, load_level_thresholds
+from .dungeon_generator import Dungeon
+
+
+class EncounterService:
+    """
+    Encounters for many parties at once, without building a map
+    for each of them.
+
+    The bestiary and xp tables are loaded once per service. Party
+    thresholds are computed for all parties with one matrix
+    product, and encounters are then generated with the same code
+    as Dungeon.generate_all_encounters, so a party gets exactly
+    the encounters a Dungeon would draw from a generator in the
+    same state.
+
+    Parameters
+    ----------
+    seed:  int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Seed of the generator all encounters are drawn from.
+
+    remote_data:  bool
+        Fetch the tables from Dungeon.player_exp_df_url and
+        Dungeon.monster_df_url instead of the bundled CSVs.
+    """
+    difficulty_keywords = (
+        Dungeon.easy_keyword,
+        Dungeon.medium_keyword,
+        Dungeon.hard_keyword,
+        Dungeon.deadly_keyword
+    )
+
+    def __init__(self, seed=None, remote_data=False):
+        self.rng = np.random.default_rng(seed)
+        self.player_exp_source = Dungeon.player_exp_df_url if remote_data else None
+        self.monster_source = Dungeon.monster_df_url if remote_data else None
+        self.bestiary_index = load_bestiary_index(self.monster_source)
+        self.levels, self.level_thresholds = load_level_thresholds(self.player_exp_source)
+
+    def generate(self, parties, difficulties=None, theme=None):
+        """
+        Generate encounters for every party.
+
+        Parameters
+        ----------
+        parties:  list of dict
+            Parties as passed to Dungeon, {level: number of players}.
+
+        difficulties:  str or list, optional
+            None for all four difficulties, in the order of
+            Dungeon.generate_all_encounters, a single difficulty
+            keyword for every party, or one keyword (or list of
+            keywords) per party.
+
+        theme:  dict, optional
+            Only build encounters from the monsters matching theme,
+            see BestiaryIndex.
+
+        Returns
+        -------
+        list with a dict of difficulty keyword to encounter per party
+        """
+        if difficulties is None or isinstance(difficulties, str):
+            difficulties = [difficulties] * len(parties)
+        if len(difficulties) != len(parties):
+            raise ValueError('difficulties must have one entry per party')
+
+        thresholds = self.party_thresholds(parties)
+        theme_mask = None if theme is None else self.bestiary_index.mask(theme)
+        encounters = []
+        for party, party_thresholds, keywords in zip(parties, thresholds, difficulties):
+            generator = Dungeon._encounter_generator(
+                party,
+                self.player_exp_source,
+                self.monster_source,
+                rng=self.rng,
+                party_thresholds=party_thresholds,
+                theme_mask=theme_mask
+            )
+            if keywords is None:
+                generator.generate_all_encounters()
+                encounters.append(generator.encounters)
+            else:
+                keywords = [keywords] if isinstance(keywords, str) else keywords
+                encounters.append({keyword: generator.generate_encounter(keyword) for keyword in keywords})
+
+        return encounters
+
+    def party_thresholds(self, parties):
+        """
+        Xp thresholds of many parties, see Dungeon._party_thresholds.
+
+        Returns
+        -------
+        array of shape (len(parties), 5) with the easy, medium, hard
+        and deadly thresholds and the upper bound of a deadly
+        encounter of each party
+        """
+        levels = self.levels
+        counts = np.zeros((len(parties), len(levels)), dtype=self.level_thresholds.dtype)
+        for i, party in enumerate(parties):
+            ind = np.searchsorted(levels, list(party)).clip(max=len(levels) - 1)
+            if np.any(levels[ind] != list(party)):
+                raise KeyError(f'unknown player level in party {party}')
+            np.add.at(counts[i], ind, list(party.values()))
+
+        easy, medium, hard, deadly = (counts @ self.level_thresholds).T
+        return np.stack((easy, medium, hard, deadly, deadly + (deadly - hard)), axis=1)
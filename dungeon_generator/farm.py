@@ -0,0 +1,117 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .dungeon_generator import Dungeon
+from .treasure_simulator import TreasureSimulator
+
+
+def dungeon_farm(n_dungeons, *args, seed=None, max_workers=None, **kwargs):
+    """
+    Build n_dungeons dungeons across a pool of processes.
+
+    Every dungeon gets its own random stream, spawned from
+    numpy.random.SeedSequence(seed), so the same seed always
+    gives the same dungeons no matter how many workers are
+    used or in which order they finish.
+
+    Parameters
+    ----------
+    n_dungeons:  int
+        Number of dungeons to build.
+
+    *args, **kwargs:
+        Passed on to the Dungeon constructor, e.g. the party
+        and highest_passive_perception.
+
+    seed:  int or numpy.random.SeedSequence, optional
+        Root seed. If None, fresh entropy is used.
+
+    max_workers:  int, optional
+        Number of worker processes, see
+        concurrent.futures.ProcessPoolExecutor.
+
+    Yields
+    ------
+    (index, dungeon) pairs, as soon as each dungeon is done. 
+    Dungeons not started yet are cancelled when the generator is
+    closed early.
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    children = seed_sequence.spawn(n_dungeons)
+
+    # not a with block: leaving it waits for every queued dungeon,
+    # also when the consumer stops early (break, close) and the 
+    # rest are no longer wanted
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(_build_dungeon, child, args, kwargs): index
+            for index, child in enumerate(children)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def treasure_farm(n, difficulty=None, cr=None, party=None, seed=None, max_workers=None, chunk_size=250000):
+    """
+    Simulate n treasure hoards, or chests of the given difficulty,
+    with TreasureSimulator across a pool of processes.
+
+    The work is split into chunks of chunk_size treasures, each 
+    with its own random stream spawned from 
+    numpy.random.SeedSequence(seed), so the same seed always gives
+    the same columns no matter how many workers are used.
+
+    Parameters
+    ----------
+    n:  int
+
+    difficulty:  int, optional
+        Difficulty value of the chests, None for hoards.
+
+    cr:  float or array of n floats, optional
+
+    party:  dict, optional
+        Instead of cr, see TreasureSimulator.hoards.
+
+    seed:  int or numpy.random.SeedSequence, optional
+
+    max_workers:  int, optional
+
+    chunk_size:  int
+
+    Returns
+    -------
+    dict of column name to array of length n, see 
+    TreasureSimulator
+    """
+    cr = np.broadcast_to(TreasureSimulator._cr(cr, party), (n,))
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    starts = range(0, n, chunk_size)
+    children = seed_sequence.spawn(len(starts))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunks = list(executor.map(
+            _simulate_treasure,
+            children,
+            [cr[start:start + chunk_size] for start in starts],
+            [difficulty] * len(starts)
+        ))
+
+    if not chunks:
+        return TreasureSimulator(seed_sequence).hoards(0, cr=cr)
+    return {column: np.concatenate([chunk[column] for chunk in chunks]) for column in chunks[0]}
+
+
+def _build_dungeon(seed_sequence, args, kwargs):
+    return Dungeon(*args, seed=seed_sequence, **kwargs)
+
+
+def _simulate_treasure(seed_sequence, cr, difficulty):
+    simulator = TreasureSimulator(seed_sequence)
+    if difficulty is None:
+        return simulator.hoards(len(cr), cr=cr)
+    return simulator.chests(len(cr), difficulty, cr=cr)
@@ -0,0 +1,185 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .dice import dice
+from .dungeon_generator import Dungeon
+from .treasure_tables import hoard_tables, magic_item_tables
+
+
+class TreasureSimulator:
+    """
+    Many treasure hoards or chests at once, as columns of numbers
+    instead of lists of item names, for tuning the loot economy.
+
+    Hoards and chests are drawn from the same tables and dice as
+    Dungeon.generate_treasure_hoard and generate_treasure_chest,
+    but every die of a column is rolled for all of them in one
+    vectorized draw. Columns are
+
+        cr                  cr the treasure was generated for
+        CP, SP, EP, GP, PP  coins of each denomination
+        gems, art           number of gems and art objects
+        gems value,         their total value in gp
+        art value
+        magic items A..I    number of items rolled on each magic
+                            item table
+        value               coins, gems and art in gp
+
+    Parameters
+    ----------
+    seed:  int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Seed of the generator all treasure is drawn from.
+    """
+    coin_keywords = (
+        Dungeon.copper_piece_keyword,
+        Dungeon.silver_piece_keyword,
+        Dungeon.electrum_piece_keyword,
+        Dungeon.gold_piece_keyword,
+        Dungeon.platinum_piece_keyword
+    )
+    # worth of each coin in gp
+    coin_values = (0.01, 0.1, 0.5, 1, 10)
+    magic_item_columns = {table: f'{Dungeon.magic_items_keyword} {table}' for table in magic_item_tables}
+    cr_keyword = 'cr'
+    value_keyword = 'value'
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def hoards(self, n, cr=None, party=None):
+        """
+        Simulate n treasure hoards.
+
+        Parameters
+        ----------
+        n:  int
+
+        cr:  float or array of n floats, optional
+            Average party level of each hoard. Hoards of many crs
+            are simulated one cr at a time.
+
+        party:  dict, optional
+            Party as passed to Dungeon, instead of cr.
+
+        Returns
+        -------
+        dict of column name to array of length n, see
+        TreasureSimulator
+        """
+        return self._simulate(n, self._cr(cr, party), self._hoards)
+
+    def chests(self, n, difficulty, cr=None, party=None):
+        """
+        Simulate n treasure chests of the given difficulty value
+        (Dungeon.easy_value, medium_value or hard_value), see
+        hoards.
+        """
+        return self._simulate(n, self._cr(cr, party), self._chests, difficulty)
+
+    @classmethod
+    def summary(cls, columns, percentiles=(5, 50, 95)):
+        """
+        Count, mean, standard deviation, extremes and percentiles
+        of every column, per cr.
+
+        Returns
+        -------
+        pandas.DataFrame with one row per cr
+        """
+        import pandas as pd
+
+        return pd.DataFrame(columns).groupby(cls.cr_keyword).describe(percentiles=[p / 100 for p in percentiles])
+
+    def _simulate(self, n, cr, fill, *args):
+        cr = np.broadcast_to(np.asarray(cr, dtype=float), (n,))
+        columns = {self.cr_keyword: cr.copy()}
+        for coin in self.coin_keywords:
+            columns[coin] = np.zeros(n, dtype=np.int64)
+        for keyword in (Dungeon.gems_keyword, Dungeon.art_keyword):
+            columns[keyword] = np.zeros(n, dtype=np.int64)
+            columns[f'{keyword} {self.value_keyword}'] = np.zeros(n, dtype=np.int64)
+        for column in self.magic_item_columns.values():
+            columns[column] = np.zeros(n, dtype=np.int64)
+
+        for value in np.unique(cr):
+            fill(columns, np.flatnonzero(cr == value), value.item(), *args)
+
+        columns[self.value_keyword] = (
+            sum(columns[coin] * value for coin, value in zip(self.coin_keywords, self.coin_values))
+            + columns[f'{Dungeon.gems_keyword} {self.value_keyword}']
+            + columns[f'{Dungeon.art_keyword} {self.value_keyword}']
+        )
+        return columns
+
+    def _hoards(self, columns, ind, cr):
+        for coin, expression in Dungeon._hoard_coin_dice(cr):
+            columns[coin][ind] = expression.sample(len(ind), rng=self.rng)
+
+        table = _compiled_hoard_table(Dungeon._band(cr, Dungeon.treasure_thresholds))
+        rows = np.searchsorted(table['roll'], self.rng.integers(1, 101, size=len(ind)))
+        for keyword in (Dungeon.gems_keyword, Dungeon.art_keyword):
+            quantity = self._quantities(table[f'{keyword} dice'][rows])
+            columns[keyword][ind] = quantity
+            columns[f'{keyword} {self.value_keyword}'][ind] = quantity * table[f'{keyword} value'][rows]
+        for slot in range(table[Dungeon.magic_items_keyword].shape[1]):
+            quantity = self._quantities(table[f'{Dungeon.magic_items_keyword} dice'][rows, slot])
+            tables = table[Dungeon.magic_items_keyword][rows, slot]
+            for magic_item_table in np.unique(tables[quantity > 0]):
+                hits = tables == magic_item_table
+                columns[self.magic_item_columns[magic_item_table]][ind[hits]] += quantity[hits]
+
+    def _chests(self, columns, ind, cr, difficulty):
+        band = Dungeon._band(cr, Dungeon.treasure_thresholds)
+        if difficulty not in Dungeon.chest_magic_item_tables[band]:
+            raise ValueError(f"Invalid difficulty: {difficulty}")
+
+        # 1 for a magic item, 2 for coins and 3 for an empty chest,
+        # see Dungeon.generate_treasure_chest
+        roll = self.rng.integers(1, 4, size=len(ind))
+        magic_item_table = Dungeon.chest_magic_item_tables[band][difficulty]
+        columns[self.magic_item_columns[magic_item_table]][ind[roll == 1]] = 1
+
+        coins = ind[roll == 2]
+        for coin, expression in Dungeon._chest_coin_dice(cr, difficulty):
+            columns[coin][coins] = expression.sample(len(coins), rng=self.rng)
+
+    def _quantities(self, formulas):
+        """
+        Roll each of an array of dice formulas, one vectorized
+        draw per distinct formula.
+        """
+        quantity = np.zeros(len(formulas), dtype=np.int64)
+        for formula in np.unique(formulas):
+            rows = np.flatnonzero(formulas == formula)
+            quantity[rows] = dice(formula).sample(len(rows), rng=self.rng)
+        return quantity
+
+    @staticmethod
+    def _cr(cr, party):
+        if (cr is None) == (party is None):
+            raise ValueError('pass either cr or party')
+        return Dungeon._avg_party_level(party) if cr is None else cr
+
+
+@lru_cache(maxsize=None)
+def _compiled_hoard_table(band):
+    """
+    One treasure hoard table as arrays over its rows, with gems,
+    art and magic items that are absent rolling '0' of value 0.
+    """
+    rows = hoard_tables[band]
+    n_magic_items = max(len(magic_items) for *_, magic_items in rows)
+    magic_items = [list(row[3]) + [('', '0')] * (n_magic_items - len(row[3])) for row in rows]
+    table = {
+        'roll': np.array([row[0] for row in rows]),
+        f'{Dungeon.gems_keyword} value': np.array([row[1][0] if row[1] else 0 for row in rows]),
+        f'{Dungeon.gems_keyword} dice': np.array([row[1][1] if row[1] else '0' for row in rows]),
+        f'{Dungeon.art_keyword} value': np.array([row[2][0] if row[2] else 0 for row in rows]),
+        f'{Dungeon.art_keyword} dice': np.array([row[2][1] if row[2] else '0' for row in rows]),
+        Dungeon.magic_items_keyword: np.array([[table for table, _ in row] for row in magic_items]).reshape(len(rows), n_magic_items),
+        f'{Dungeon.magic_items_keyword} dice': np.array([[quantity for _, quantity in row] for row in magic_items]).reshape(len(rows), n_magic_items)
+    }
+    for array in table.values():
+        array.flags.writeable = False
+    return table
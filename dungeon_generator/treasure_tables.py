@@ -0,0 +1,698 @@
+import numpy as np
+
+# magic item tables A to I from the Dungeon Master's Guide, as
+# (highest d100 roll, item) pairs. A tuple of items is rolled on
+# with one more die, with as many sides as the tuple has items
+magic_item_tables = {
+    'A': (
+        (50, 'Potion of healing'),
+        (60, 'Spell scroll (cantrip)'),
+        (70, 'Potion of climbing'),
+        (90, 'Spell scroll (1st level)'),
+        (94, 'Spell scroll (2nd level)'),
+        (98, 'Potion of healing (greater)'),
+        (99, 'Bag of holding'),
+        (100, 'Driftglobe')
+    ),
+    'B': (
+        (15, 'Potion of healing'),
+        (22, 'Potion of fire breath'),
+        (29, 'Potion of resistance'),
+        (34, 'Ammunition, +1'),
+        (39, 'Potion of animal friendship'),
+        (44, 'Potion of hill giant strength'),
+        (49, 'Potion of growth'),
+        (54, 'Potion of water breathing'),
+        (59, 'Spell scroll (2nd level)'),
+        (64, 'Spell scroll (3rd level)'),
+        (67, 'Bag of holding'),
+        (70, 'Keoghtom’s ointment'),
+        (73, 'Oil of slipperiness'),
+        (75, 'Dust of disappearance'),
+        (77, 'Dust of dryness'),
+        (79, 'Dust of sneezing and choking'),
+        (81, 'Elemental gem'),
+        (83, 'Philter of love'),
+        (84, 'Alchemy jug'),
+        (85, 'Cap of water breathing'),
+        (86, 'Cloak of the manta ray'),
+        (87, 'Driftglobe'),
+        (88, 'Goggles of night'),
+        (89, 'Helm of comprehending languages'),
+        (90, 'Immovable rod'),
+        (91, 'Lantern of revealing'),
+        (92, 'Mariner’s armor'),
+        (93, 'Mithral armor'),
+        (94, 'Potion of poison'),
+        (95, 'Ring of swimming'),
+        (96, 'Robe of useful items'),
+        (97, 'Rope of climbing'),
+        (98, 'Saddle of the cavalier'),
+        (99, 'Wand of magic detection'),
+        (100, 'Wand of secrets')
+    ),
+    'C': (
+        (15, 'Potion of healing (superior)'),
+        (22, 'Spell scroll (4th level)'),
+        (27, 'Ammunition, +2'),
+        (32, 'Potion of clairvoyance'),
+        (37, 'Potion of diminution'),
+        (42, 'Potion of gaseous form'),
+        (47, 'Potion of frost giant strength'),
+        (52, 'Potion of stone giant strength'),
+        (57, 'Potion of heroism'),
+        (62, 'Potion of invulnerability'),
+        (67, 'Potion of mind reading'),
+        (72, 'Spell scroll (5th level)'),
+        (75, 'Elixir of health'),
+        (78, 'Oil of etherealness'),
+        (81, 'Potion of fire giant strength'),
+        (84, 'Quaal’s feather token'),
+        (87, 'Scroll of protection'),
+        (89, 'Bag of beans'),
+        (91, 'Bead of force'),
+        (92, 'Chime of opening'),
+        (93, 'Decanter of endless water'),
+        (94, 'Eyes of minute seeing'),
+        (95, 'Folding boat'),
+        (96, 'Heward’s handy haversack'),
+        (97, 'Horseshoes of speed'),
+        (98, 'Necklace of fireballs'),
+        (99, 'Periapt of health'),
+        (100, 'Sending stones')
+    ),
+    'D': (
+        (20, 'Potion of healing (supreme)'),
+        (30, 'Potion of invisibility'),
+        (40, 'Potion of speed'),
+        (50, 'Spell scroll (6th level)'),
+        (57, 'Spell scroll (7th level)'),
+        (62, 'Ammunition, +3'),
+        (67, 'Oil of sharpness'),
+        (72, 'Potion of flying'),
+        (77, 'Potion of cloud giant strength'),
+        (82, 'Potion of longevity'),
+        (87, 'Potion of vitality'),
+        (92, 'Spell scroll (8th level)'),
+        (95, 'Horseshoes of a zephyr'),
+        (98, 'Nolzur’s marvelous pigments'),
+        (99, 'Bag of devouring'),
+        (100, 'Portable hole')
+    ),
+    'E': (
+        (30, 'Spell scroll (8th level)'),
+        (55, 'Potion of storm giant strength'),
+        (70, 'Potion of healing (supreme)'),
+        (85, 'Spell scroll (9th level)'),
+        (93, 'Universal solvent'),
+        (98, 'Arrow of slaying'),
+        (100, 'Sovereign glue')
+    ),
+    'F': (
+        (15, 'Weapon, +1'),
+        (18, 'Shield, +1'),
+        (21, 'Sentinel shield'),
+        (23, 'Amulet of proof against detection and location'),
+        (25, 'Boots of elvenkind'),
+        (27, 'Boots of striding and springing'),
+        (29, 'Bracers of archery'),
+        (31, 'Brooch of shielding'),
+        (33, 'Broom of flying'),
+        (35, 'Cloak of elvenkind'),
+        (37, 'Cloak of protection'),
+        (39, 'Gauntlets of ogre power'),
+        (41, 'Hat of disguise'),
+        (43, 'Javelin of lightning'),
+        (45, 'Pearl of power'),
+        (47, 'Rod of the pact keeper, +1'),
+        (49, 'Slippers of spider climbing'),
+        (51, 'Staff of the adder'),
+        (53, 'Staff of the python'),
+        (55, 'Sword of vengeance'),
+        (57, 'Trident of fish command'),
+        (59, 'Wand of magic missiles'),
+        (61, 'Wand of the war mage, +1'),
+        (63, 'Wand of web'),
+        (65, 'Weapon of warning'),
+        (66, 'Adamantine armor (chain mail)'),
+        (67, 'Adamantine armor (chain shirt)'),
+        (68, 'Adamantine armor (scale mail)'),
+        (69, 'Bag of tricks (gray)'),
+        (70, 'Bag of tricks (rust)'),
+        (71, 'Bag of tricks (tan)'),
+        (72, 'Boots of the winterlands'),
+        (73, 'Circlet of blasting'),
+        (74, 'Deck of illusions'),
+        (75, 'Eversmoking bottle'),
+        (76, 'Eyes of charming'),
+        (77, 'Eyes of the eagle'),
+        (78, 'Figurine of wondrous power (silver raven)'),
+        (79, 'Gem of brightness'),
+        (80, 'Gloves of missile snaring'),
+        (81, 'Gloves of swimming and climbing'),
+        (82, 'Gloves of thievery'),
+        (83, 'Headband of intellect'),
+        (84, 'Helm of telepathy'),
+        (85, 'Instrument of the bards (Doss lute)'),
+        (86, 'Instrument of the bards (Fochlucan bandore)'),
+        (87, 'Instrument of the bards (Mac-Fuimidh cittern)'),
+        (88, 'Medallion of thoughts'),
+        (89, 'Necklace of adaptation'),
+        (90, 'Periapt of wound closure'),
+        (91, 'Pipes of haunting'),
+        (92, 'Pipes of the sewers'),
+        (93, 'Ring of jumping'),
+        (94, 'Ring of mind shielding'),
+        (95, 'Ring of warmth'),
+        (96, 'Ring of water walking'),
+        (97, 'Quiver of Ehlonna'),
+        (98, 'Stone of good luck (luckstone)'),
+        (99, 'Wind fan'),
+        (100, 'Winged boots')
+    ),
+    'G': (
+        (11, 'Weapon, +2'),
+        (14, (
+            'Figurine of wondrous power (Bronze griffon)',
+            'Figurine of wondrous power (Ebony fly)',
+            'Figurine of wondrous power (Golden lions)',
+            'Figurine of wondrous power (Ivory goats)',
+            'Figurine of wondrous power (Marble elephant)',
+            'Figurine of wondrous power (Onyx dog)',
+            'Figurine of wondrous power (Onyx dog)',
+            'Figurine of wondrous power (Serpentine owl)'
+        )),
+        (15, 'Adamantine armor (breastplate)'),
+        (16, 'Adamantine armor (splint)'),
+        (17, 'Amulet of health'),
+        (18, 'Armor of vulnerability'),
+        (19, 'Arrow-catching shield'),
+        (20, 'Belt of dwarvenkind'),
+        (21, 'Belt of hill giant strength'),
+        (22, 'Berserker axe'),
+        (23, 'Boots of levitation'),
+        (24, 'Boots of speed'),
+        (25, 'Bowl of commanding water elementals'),
+        (26, 'Bracers of defense'),
+        (27, 'Brazier of commanding fire elementals'),
+        (28, 'Cape of the mountebank'),
+        (29, 'Censer of controlling air elementals'),
+        (30, 'Armor, +1 chain mail'),
+        (31, 'Armor of resistance (chain mail)'),
+        (32, 'Armor, +1 chain shirt'),
+        (33, 'Armor of resistance (chain shirt)'),
+        (34, 'Cloak of displacement'),
+        (35, 'Cloak of the bat'),
+        (36, 'Cube of force'),
+        (37, 'Daern’s instant fortress'),
+        (38, 'Dagger of venom'),
+        (39, 'Dimensional shackles'),
+        (40, 'Dragon slayer'),
+        (41, 'Elven chain'),
+        (42, 'Flame tongue'),
+        (43, 'Gem of seeing'),
+        (44, 'Giant slayer'),
+        (45, 'Glamoured studded leather'),
+        (46, 'Helm of teleportation'),
+        (47, 'Horn of blasting'),
+        (48, 'Horn of Valhalla (silver or brass)'),
+        (49, 'Instrument of the bards (Canaith mandolin)'),
+        (50, 'Instrument of the bards (Cli lyre)'),
+        (51, 'Ioun stone (awareness)'),
+        (52, 'Ioun stone (protection)'),
+        (53, 'Ioun stone (reserve)'),
+        (54, 'Ioun stone (sustenance)'),
+        (55, 'Iron bands of Bilarro'),
+        (56, 'Armor, +1 leather'),
+        (57, 'Armor of resistance (leather)'),
+        (58, 'Mace of disruption'),
+        (59, 'Mace of smiting'),
+        (60, 'Mace of terror'),
+        (61, 'Mantle of spell resistance'),
+        (62, 'Necklace of prayer beads'),
+        (63, 'Periapt of proof against poison'),
+        (64, 'Ring of animal influence'),
+        (65, 'Ring of evasion'),
+        (66, 'Ring of feather falling'),
+        (67, 'Ring of free action'),
+        (68, 'Ring of protection'),
+        (69, 'Ring of resistance'),
+        (70, 'Ring of spell storing'),
+        (71, 'Ring of the ram'),
+        (72, 'Ring of X-ray vision'),
+        (73, 'Robe of eyes'),
+        (74, 'Rod of rulership'),
+        (75, 'Rod of the pact keeper, +2'),
+        (76, 'Rope of entanglement'),
+        (77, 'Armor, +1 scale mail'),
+        (78, 'Armor of resistance (scale mail)'),
+        (79, 'Shield, +2'),
+        (80, 'Shield of missile attraction'),
+        (81, 'Staff of charming'),
+        (82, 'Staff of healing'),
+        (83, 'Staff of swarming insects'),
+        (84, 'Staff of the woodlands'),
+        (85, 'Staff of withering'),
+        (86, 'Stone of controlling earth elementals'),
+        (87, 'Sun blade'),
+        (88, 'Sword of life stealing'),
+        (89, 'Sword of wounding'),
+        (90, 'Tentacle rod'),
+        (91, 'Vicious weapon'),
+        (92, 'Wand of binding'),
+        (93, 'Wand of enemy detection'),
+        (94, 'Wand of fear'),
+        (95, 'Wand of fireballs'),
+        (96, 'Wand of lightning bolts'),
+        (97, 'Wand of paralysis'),
+        (98, 'Wand of the war mage, +2'),
+        (99, 'Wand of wonder'),
+        (100, 'Wings of flying')
+    ),
+    'H': (
+        (10, 'Weapon, +3'),
+        (12, 'Amulet of the planes'),
+        (14, 'Carpet of flying'),
+        (16, 'Crystal ball (very rare version)'),
+        (18, 'Ring of regeneration'),
+        (20, 'Ring of shooting stars'),
+        (22, 'Ring of telekinesis'),
+        (24, 'Robe of scintillating colors'),
+        (26, 'Robe of stars'),
+        (28, 'Rod of absorption'),
+        (30, 'Rod of alertness'),
+        (32, 'Rod of security'),
+        (34, 'Rod of the pact keeper, +3'),
+        (36, 'Scimitar of speed'),
+        (38, 'Shield, +3'),
+        (40, 'Staff of fire'),
+        (42, 'Staff of frost'),
+        (44, 'Staff of power'),
+        (46, 'Staff of striking'),
+        (48, 'Staff of thunder and lightning'),
+        (50, 'Sword of sharpness'),
+        (52, 'Wand of polymorph'),
+        (54, 'Wand of the war mage, +3'),
+        (55, 'Adamantine armor (half plate)'),
+        (56, 'Adamantine armor (plate)'),
+        (57, 'Animated shield'),
+        (58, 'Belt of fire giant strength'),
+        (59, 'Belt of frost giant strength (or stone)'),
+        (60, 'Armor, +1 breastplate'),
+        (61, 'Armor of resistance (breastplate)'),
+        (62, 'Candle of invocation'),
+        (63, 'Armor, +2 chain mail'),
+        (64, 'Armor, +2 chain shirt'),
+        (65, 'Cloak of arachnida'),
+        (66, 'Dancing sword'),
+        (67, 'Demon armor'),
+        (68, 'Dragon scale mail'),
+        (69, 'Dwarven plate'),
+        (70, 'Dwarven thrower'),
+        (71, 'Efreeti bottle'),
+        (72, 'Figurine of wondrous power (obsidian steed)'),
+        (73, 'Frost brand'),
+        (74, 'Helm of brilliance'),
+        (75, 'Horn of Valhalla (bronze)'),
+        (76, 'Instrument of the bards (Anstruth harp)'),
+        (77, 'Ioun stone (absorption)'),
+        (78, 'Ioun stone (agility)'),
+        (79, 'Ioun stone (fortitude)'),
+        (80, 'Ioun stone (insight)'),
+        (81, 'Ioun stone (intellect)'),
+        (82, 'Ioun stone (leadership)'),
+        (83, 'Ioun stone (strength)'),
+        (84, 'Armor, +2 leather'),
+        (85, 'Manual of bodily health'),
+        (86, 'Manual of gainful exercise'),
+        (87, 'Manual of golems'),
+        (88, 'Manual of quickness of action'),
+        (89, 'Mirror of life trapping'),
+        (90, 'Nine lives stealer'),
+        (91, 'Oathbow'),
+        (92, 'Armor, +2 scale mail'),
+        (93, 'Spellguard shield'),
+        (94, 'Armor, +1 splint'),
+        (95, 'Armor of resistance (splint)'),
+        (96, 'Armor, +1 studded leather'),
+        (97, 'Armor of resistance (studded leather)'),
+        (98, 'Tome of clear thought'),
+        (99, 'Tome of leadership and influence'),
+        (100, 'Tome of understanding')
+    ),
+    'I': (
+        (5, 'Defender'),
+        (10, 'Hammer of thunderbolts'),
+        (15, 'Luck blade'),
+        (20, 'Sword of answering'),
+        (23, 'Holy avenger'),
+        (26, 'Ring of djinni summoning'),
+        (29, 'Ring of invisibility'),
+        (32, 'Ring of spell turning'),
+        (35, 'Rod of lordly might'),
+        (38, 'Staff of the magi'),
+        (41, 'Vorpal sword'),
+        (43, 'Belt of cloud giant strength'),
+        (45, 'Armor, +2 breastplate'),
+        (47, 'Armor, +3 chain mail'),
+        (49, 'Armor, +3 chain shirt'),
+        (51, 'Cloak of invisibility'),
+        (53, 'Crystal ball (legendary version)'),
+        (55, 'Armor, +1 half plate'),
+        (57, 'Iron flask'),
+        (59, 'Armor, +3 leather'),
+        (61, 'Armor, +1 plate'),
+        (63, 'Robe of the archmagi'),
+        (65, 'Rod of resurrection'),
+        (67, 'Armor, +1 scale mail'),
+        (69, 'Scarab of protection'),
+        (71, 'Armor, +2 splint'),
+        (73, 'Armor, +2 studded leather'),
+        (75, 'Well of many worlds'),
+        (76, (
+            'Armor, +2 half plate',
+            'Armor, +2 half plate',
+            'Armor, +2 plate',
+            'Armor, +2 plate',
+            'Armor, +3 studded leather',
+            'Armor, +3 studded leather',
+            'Armor, +3 breastplate',
+            'Armor, +3 breastplate',
+            'Armor, +3 splint',
+            'Armor, +3 splint',
+            'Armor, +3 half plate',
+            'Armor, +3 plate'
+        )),
+        (77, 'Apparatus of Kwalish'),
+        (78, 'Armor of invulnerability'),
+        (79, 'Belt of storm giant strength'),
+        (80, 'Cubic gate'),
+        (81, 'Deck of many things'),
+        (82, 'Efreeti chain'),
+        (83, 'Armor of resistance (half plate)'),
+        (84, 'Horn of Valhalla (iron)'),
+        (85, 'Instrument of the bards (Ollamh harp)'),
+        (86, 'Ioun stone (greater absorption)'),
+        (87, 'Ioun stone (mastery)'),
+        (88, 'Ioun stone (regeneration)'),
+        (89, 'Plate armor of etherealness'),
+        (90, 'Armor of resistance (plate)'),
+        (91, 'Ring of air elemental command'),
+        (92, 'Ring of earth elemental command'),
+        (93, 'Ring of fire elemental command'),
+        (94, 'Ring of three wishes'),
+        (95, 'Ring of water elemental command'),
+        (96, 'Sphere of annihilation'),
+        (97, 'Talisman of pure good'),
+        (98, 'Talisman of the sphere'),
+        (99, 'Talisman of ultimate evil'),
+        (100, 'Tome of the stilled tongue')
+    )
+}
+
+
+# gem and art object tables from the Dungeon Master's Guide, by 
+# value in gp, each item equally likely
+gem_tables = {
+    10: (
+        'Azurite (opaque mottled deep blue)',
+        'Banded agate (translucent striped brown, blue, white, or red)',
+        'Blue quartz (transparent pale blue)',
+        'Eye agate (translucent circles of gray, white, brown, blue, or green)',
+        'Hematite (opaque gray-black)',
+        'Lapis lazuli (opaque light and dark blue with yellow flecks)',
+        'Malachite (opaque striated light and dark green)',
+        'Moss agate (translucent pink or yellow-white with mossy gray or green markings)',
+        'Obsidian (opaque black)',
+        'Rhodochrosite (opaque light pink)',
+        'Tiger eye (translucent brown with golden center)',
+        'Turquoise (opaque light blue-green)'
+    ),
+    50: (
+        'Bloodstone (opaque dark gray with red flecks)',
+        'Carnelian (opaque orange to red-brown)',
+        'Chalcedony (opaque white)',
+        'Chrysoprase (translucent green)',
+        'Citrine (transparent pale yellow-brown)',
+        'Jasper (opaque blue, black, or brown)',
+        'Moonstone (translucent white with pale blue glow)',
+        'Onyx (opaque bands of black and white, or pure black or white)',
+        'Quartz (transparent white, smoky gray, or yellow)',
+        'Sardonyx (opaque bands of red and white)',
+        'Star rose quartz (translucent rosy stone with white star-shaped center)',
+        'Zircon (transparent pale blue-green)'
+    ),
+    100: (
+        'Amber (transparent watery gold to rich gold)',
+        'Amethyst (transparent deep purple)',
+        'Chrysoberyl (transparent yellow-green to pale green)',
+        'Coral (opaque crimson)',
+        'Garnet (transparent red, brown-green, or violet)',
+        'Jade (translucent light green, deep green, or white)',
+        'Jet (opaque deep black)',
+        'Pearl (opaque lustrous white, yellow, or pink)',
+        'Spinel (transparent red, red-brown, or deep green)',
+        'Tourmaline (transparent pale green, blue, brown, or red)'
+    ),
+    500: (
+        'Alexandrite (transparent dark green)',
+        'Aquamarine (transparent pale blue-green)',
+        'Black pearl (opaque pure black)',
+        'Blue spinel (transparent deep blue)',
+        'Peridot (transparent rich olive green)',
+        'Topaz (transparent golden yellow)'
+    ),
+    1000: (
+        'Black opal (translucent dark green with black mottling and golden flecks)',
+        'Blue sapphire (transparent blue-white to medium blue)',
+        'Emerald (transparent deep bright green)',
+        'Fire opal (translucent fiery red)',
+        'Opal (translucent pale blue with green and golden mottling)',
+        'Star ruby (translucent ruby with white star-shaped center)',
+        'Star sapphire (translucent blue sapphire with white star-shaped center)',
+        'Yellow sapphire (transparent fiery yellow or yellow green)'
+    ),
+    5000: (
+        'Black sapphire (translucent lustrous black with glowing highlights)',
+        'Diamond (transparent blue-white, canary, pink, brown, or blue)',
+        'Jacinth (transparent fiery orange)',
+        'Ruby (transparent clear red to deep crimson)'
+    )
+}
+
+art_tables = {
+    25: (
+        'Silver ewer',
+        'Carved bone statuette',
+        'Small gold bracelet',
+        'Cloth-of-gold vestments',
+        'Black velvet mask stitched with silver thread',
+        'Copper chalice with silver filigree',
+        'Pair of engraved bone dice',
+        'Small mirror set in a painted wooden frame',
+        'Embroidered silk handkerchief',
+        'Gold locket with a painted portrait inside\t'
+    ),
+    250: (
+        'Gold ring set with bloodstones',
+        'Carved ivory statuette',
+        'Large gold bracelet',
+        'Silver necklace with a gemstone pendant',
+        'Bronze crown',
+        'Silk robe with gold embroidery',
+        'Large well-made tapestry',
+        'Brass mug with jade inlay',
+        'Box of turquoise animal figurines',
+        'Gold bird cage with electrum filigree'
+    ),
+    750: (
+        'Silver chalice set with moonstones',
+        'Silver-plated steel longsword with jet set in hilt',
+        'Carved harp of exotic wood with ivory inlay and zircon gems',
+        'Small gold idol',
+        'Gold dragon comb set with red garnets as eyes',
+        'Bottle stopper cork embossed with gold leaf and set with amethysts',
+        'Ceremonial electrum dagger with a black pearl in the pommel',
+        'Silver and gold brooch',
+        'Obsidian statuette with gold fittings and inlay',
+        'Painted gold war mask'
+    ),
+    2500: (
+        'Fine gold chain set with a fire opal',
+        'Old masterpiece painting',
+        'Embroidered silk and velvet mantle set with numerous moonstones',
+        'Platinum bracelet set with a sapphire',
+        'Embroidered glove set with jewel chips',
+        'Jeweled anklet',
+        'Gold music box',
+        'Gold circlet set with four aquamarines',
+        'Eye patch with a mock eye set in blue sapphire andmoonstone',
+        'A necklace string of small pink pearls'
+    ),
+    7500: (
+        'Jeweled gold crown',
+        'Jeweled platinum ring',
+        'Small gold statuette set with rubies',
+        'Gold cup set with emeralds',
+        'Gold jewelry box with platinum filigree',
+        "Painted gold child's sarcophagus",
+        'Jade game board with solid gold playing pieces',
+        'Bejeweled ivory drinking horn with gold filigree'
+    )
+}
+
+# treasure hoard tables from the Dungeon Master's Guide, one per
+# band of cr (up to the small, medium and large treasure 
+# thresholds, and above), as (highest d100 roll, gems, art, magic
+# items) rows. gems and art are (value in gp, quantity dice) or 
+# None, magic items are (table, quantity dice) pairs, rolled in 
+# order
+hoard_tables = (
+    (
+        (6, None, None, ()),
+        (16, (10, '2d6'), None, ()),
+        (26, None, (25, '2d4'), ()),
+        (36, (50, '2d6'), None, ()),
+        (44, (10, '2d6'), None, (('A', '1d6'),)),
+        (52, None, (25, '2d4'), (('A', '1d6'),)),
+        (60, (50, '2d6'), None, (('A', '1d6'),)),
+        (65, (10, '2d6'), None, (('B', '1d4'),)),
+        (70, None, (25, '2d4'), (('B', '1d4'),)),
+        (75, (50, '2d6'), None, (('B', '1d4'),)),
+        (78, (10, '2d6'), None, (('C', '1d4'),)),
+        (80, None, (25, '2d4'), (('C', '1d4'),)),
+        (85, (50, '2d6'), None, (('C', '1d4'),)),
+        (92, None, (25, '2d4'), (('F', '1d4'),)),
+        (97, (50, '2d6'), None, (('F', '1d4'),)),
+        (99, None, (25, '2d4'), (('G', '1'),)),
+        (100, (50, '2d6'), None, (('G', '1'),))
+    ),
+    (
+        (4, None, None, ()),
+        (10, None, (25, '2d4'), ()),
+        (16, (50, '3d6'), None, ()),
+        (22, (100, '3d6'), None, ()),
+        (28, None, (25, '2d4'), ()),
+        (32, None, (25, '2d4'), (('A', '1d6'),)),
+        (36, (50, '3d6'), None, (('A', '1d6'),)),
+        (40, (100, '3d6'), None, (('A', '1d6'),)),
+        (44, None, (250, '2d4'), (('A', '1d6'),)),
+        (49, None, (25, '2d4'), (('B', '1d4'),)),
+        (54, (50, '3d6'), None, (('B', '1d4'),)),
+        (59, (100, '3d6'), None, (('B', '1d4'),)),
+        (63, None, (250, '2d4'), (('B', '1d4'),)),
+        (66, None, (25, '2d4'), (('C', '1d4'),)),
+        (69, (50, '3d6'), None, (('C', '1d4'),)),
+        (72, (100, '3d6'), None, (('C', '1d4'),)),
+        (74, None, (250, '2d4'), (('C', '1d4'),)),
+        (76, None, (25, '2d4'), (('D', '1'),)),
+        (78, (50, '3d6'), None, (('D', '1'),)),
+        (79, (100, '3d6'), None, (('D', '1'),)),
+        (80, None, (250, '2d4'), (('D', '1'),)),
+        (84, None, (25, '2d4'), (('F', '1d4'),)),
+        (88, (50, '3d6'), None, (('F', '1d4'),)),
+        (91, (100, '3d6'), None, (('F', '1d4'),)),
+        (94, None, (250, '2d4'), (('F', '1d4'),)),
+        (96, (100, '3d6'), None, (('G', '1d4'),)),
+        (98, None, (250, '2d4'), (('G', '1d6'),)),
+        (99, (100, '3d6'), None, (('H', '1'),)),
+        (100, None, (250, '2d4'), (('H', '1'),))
+    ),
+    (
+        (3, None, None, ()),
+        (6, None, (250, '2d4'), ()),
+        (9, None, (750, '2d4'), ()),
+        (12, (500, '3d6'), None, ()),
+        (15, (1000, '3d6'), None, ()),
+        (19, None, (250, '2d4'), (('A', '1d4'), ('B', '1d6'))),
+        (23, None, (750, '2d4'), (('A', '1d4'), ('B', '1d6'))),
+        (26, (500, '3d6'), None, (('A', '1d4'), ('B', '1d6'))),
+        (29, (1000, '3d6'), None, (('A', '1d4'), ('B', '1d6'))),
+        (35, None, (250, '2d4'), (('C', '1d6'),)),
+        (40, None, (750, '2d4'), (('C', '1d6'),)),
+        (45, (500, '3d6'), None, (('C', '1d6'),)),
+        (50, (1000, '3d6'), None, (('C', '1d6'),)),
+        (54, None, (250, '2d4'), (('D', '1d4'),)),
+        (58, None, (750, '2d4'), (('D', '1d4'),)),
+        (62, (500, '3d6'), None, (('D', '1d4'),)),
+        (66, (1000, '3d6'), None, (('D', '1d4'),)),
+        (68, None, (250, '2d4'), (('E', '1'),)),
+        (70, None, (750, '2d4'), (('E', '1'),)),
+        (72, (500, '3d6'), None, (('E', '1'),)),
+        (74, (1000, '3d6'), None, (('E', '1'),)),
+        (76, None, (250, '2d4'), (('F', '1'), ('G', '1d4'))),
+        (78, None, (750, '2d4'), (('F', '1'), ('G', '1d4'))),
+        (80, (500, '3d6'), None, (('F', '1'), ('G', '1d4'))),
+        (82, (1000, '3d6'), None, (('F', '1'), ('G', '1d4'))),
+        (85, None, (250, '2d4'), (('H', '1d4'),)),
+        (88, None, (750, '2d4'), (('H', '1d4'),)),
+        (90, (500, '3d6'), None, (('H', '1d4'),)),
+        (92, (1000, '3d6'), None, (('H', '1d4'),)),
+        (94, None, (250, '2d4'), (('I', '1'),)),
+        (96, None, (750, '2d4'), (('I', '1'),)),
+        (98, (500, '3d6'), None, (('I', '1'),)),
+        (100, (1000, '3d6'), None, (('I', '1'),))
+    ),
+    (
+        (2, None, None, ()),
+        (5, (1000, '3d6'), None, (('C', '1d8'),)),
+        (8, None, (2500, '1d10'), (('C', '1d8'),)),
+        (11, None, (7500, '1d4'), (('C', '1d8'),)),
+        (14, (5000, '1d8'), None, (('C', '1d8'),)),
+        (22, (1000, '3d6'), None, (('D', '1d6'),)),
+        (30, None, (2500, '1d10'), (('D', '1d6'),)),
+        (38, None, (7500, '1d4'), (('D', '1d6'),)),
+        (46, (5000, '1d8'), None, (('D', '1d6'),)),
+        (52, (1000, '3d6'), None, (('E', '1d6'),)),
+        (58, None, (2500, '1d10'), (('E', '1d6'),)),
+        (63, None, (7500, '1d4'), (('E', '1d6'),)),
+        (68, (5000, '1d8'), None, (('E', '1d6'),)),
+        (69, (1000, '3d6'), None, (('G', '1d4'),)),
+        (70, None, (2500, '1d10'), (('G', '1d4'),)),
+        (71, None, (7500, '1d4'), (('G', '1d4'),)),
+        (72, (5000, '1d8'), None, (('G', '1d4'),)),
+        (74, (1000, '3d6'), None, (('H', '1d4'),)),
+        (76, None, (2500, '1d10'), (('H', '1d4'),)),
+        (78, None, (7500, '1d4'), (('H', '1d4'),)),
+        (80, (5000, '1d8'), None, (('H', '1d4'),)),
+        (85, (1000, '3d6'), None, (('I', '1d4'),)),
+        (90, None, (2500, '1d10'), (('I', '1d4'),)),
+        (95, None, (7500, '1d4'), (('I', '1d4'),)),
+        (100, (5000, '1d8'), None, (('I', '1d4'),))
+    )
+)
+# the highest rolls alone, to find a row with bisect
+hoard_rolls = tuple(tuple(row[0] for row in table) for table in hoard_tables)
+
+def _compile_magic_item_table(table):
+    """
+    Cumulative thresholds and item names of one magic item table,
+    over a single die of 100 times the least common multiple of 
+    its extra dice, so a draw in [0, thresholds[-1]) picks item i
+    when thresholds[i - 1] <= draw < thresholds[i].
+    """
+    sides = np.lcm.reduce([len(item) for _, item in table if isinstance(item, tuple)] + [1])
+    thresholds = []
+    names = []
+    previous = 0
+    for bound, item in table:
+        items = item if isinstance(item, tuple) else (item,)
+        weight = (bound - previous) * sides // len(items)
+        for name in items:
+            thresholds.append((thresholds[-1] if thresholds else 0) + weight)
+            names.append(name)
+        previous = bound
+
+    thresholds = np.array(thresholds)
+    names = np.array(names, dtype=object)
+    thresholds.flags.writeable = False
+    names.flags.writeable = False
+    return thresholds, names
+
+
+# compiled once at import, see Dungeon._magic_items
+magic_item_thresholds = dict()
+magic_item_names = dict()
+for _table in magic_item_tables:
+    magic_item_thresholds[_table], magic_item_names[_table] = _compile_magic_item_table(magic_item_tables[_table])
+del _table
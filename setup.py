@@ -14,6 +14,7 @@ setup(
     description=DESCRIPTION,
     long_description=LONG_DESCRIPTION,
     packages=find_packages(),
+    package_data={'dungeon_generator': ['*.csv']},  # read by dungeon_generator.data
     install_requires=[],  # add any additional packages that
     # needs to be installed along with your package. Eg: 'caer'
 
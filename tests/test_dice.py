@@ -0,0 +1,90 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from dungeon_generator import DiceExpression, dice
+
+
+def brute_force_pmf(expression):
+    """
+    Exact distribution of expression by enumerating every roll of
+    every die.
+    """
+    dice_faces = [
+        [c * face for face in range(1, dx + 1)]
+        for c, n, dx in expression.terms
+        for _ in range(n)
+    ]
+    totals = Counter(expression.constant + sum(roll) for roll in itertools.product(*dice_faces))
+    n_rolls = sum(totals.values())
+    values = np.array(sorted(totals))
+    return values, np.array([totals[value] / n_rolls for value in values])
+
+
+def test_zero_dice():
+    expression = dice('0d6')
+    assert expression.terms == ()
+    assert (expression.min, expression.max, expression.mean) == (0, 0, 0)
+    assert expression.sample() == 0
+    assert np.array_equal(expression.sample(5, rng=0), np.zeros(5))
+
+
+def test_percentile_die():
+    assert dice('d%').terms == ((1, 1, 100),)
+    assert dice('2d%+1').terms == ((1, 2, 100),)
+    assert (dice('d%').min, dice('d%').max) == (1, 100)
+
+
+def test_negative_modifiers():
+    expression = dice('2d6 - 3')
+    assert (expression.min, expression.max, expression.mean) == (-1, 9, 4)
+    expression = dice('1d6 - 2d4 + 1')
+    assert (expression.min, expression.max) == (-6, 5)
+    assert str(dice('-1d4')) == '-1d4'
+    assert dice('-(1d4 + 2)').constant == -2
+
+
+def test_variables():
+    expression = dice('100*6d(cr+4)', cr=3)
+    assert expression.terms == ((100, 6, 7),)
+    assert expression.mean == 2400
+
+
+@pytest.mark.parametrize('text', ['1d6', '3d4', '2d6 - 3', '1d6 - 2d4 + 1', '3*2d6 + 1d4', '-2*1d3 + 2*1d2'])
+def test_pmf_matches_brute_force(text):
+    expression = dice(text)
+    values, probabilities = expression.pmf()
+    expected_values, expected_probabilities = brute_force_pmf(expression)
+    assert np.array_equal(values, expected_values)
+    assert np.allclose(probabilities, expected_probabilities)
+    assert np.isclose(values @ probabilities, expression.mean)
+    assert np.isclose((values - expression.mean) ** 2 @ probabilities, expression.var)
+
+
+def test_pmf_fft_matches_direct():
+    # long enough to be convolved with the fft
+    values, probabilities = dice('40d20').pmf()
+    assert probabilities.sum() == pytest.approx(1)
+    assert np.all(probabilities >= 0)
+    assert values[np.argmax(probabilities)] in (420, 421)
+
+
+def test_samples_in_range():
+    expression = dice('1d6 - 2d4 + 1')
+    samples = expression.sample(10000, rng=1)
+    assert samples.min() >= expression.min and samples.max() <= expression.max
+    assert abs(samples.mean() - expression.mean) < 0.1
+
+
+@pytest.mark.parametrize('text', ['', 'd', '2d', '2d6+', '(1d6', '1d6*1d6', 'foo', '1d0', '2x6', 'd%%', '(-1)d6'])
+def test_malformed_raises(text):
+    with pytest.raises(ValueError):
+        dice(text)
+
+
+def test_expression_without_dice():
+    expression = dice('2*(3+4)')
+    assert isinstance(expression, DiceExpression)
+    assert (expression.terms, expression.constant) == ((), 14)
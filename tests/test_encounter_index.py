@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from dungeon_generator import Dungeon, EncounterIndex
+from dungeon_generator.data import load_bestiary_index
+from dungeon_generator.encounter_index import enumerate_encounters, has_encounter
+
+
+@pytest.fixture(scope='module')
+def party():
+    return Dungeon._encounter_generator({5: 4}, rng=0)
+
+
+@pytest.fixture(scope='module')
+def index(party):
+    return EncounterIndex.build(party)
+
+
+def test_matches(party, index):
+    assert index.matches(party)
+    assert index.matches(Dungeon._encounter_generator({5: 4}, rng=1))
+    assert not index.matches(Dungeon._encounter_generator({5: 3}))
+    themed = Dungeon._encounter_generator({5: 4}, theme_mask=load_bestiary_index().mask({'type': 'undead'}))
+    assert not index.matches(themed)
+
+
+def test_dungeon_rejects_other_party(index):
+    with pytest.raises(ValueError):
+        Dungeon._encounter_generator({3: 4}, encounter_index=index)
+
+
+@pytest.mark.parametrize('difficulty', ['Easy', 'Medium', 'Hard', 'Deadly'])
+def test_samples_hit_difficulty(party, index, difficulty):
+    difficulty_value = party.difficulty_dict[difficulty]
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        encounter = index.sample(difficulty_value, rng=rng)
+        assert 1 <= len(encounter) <= 2
+        assert all(type(name) is str and type(count) is int for name, count in encounter.items())
+        assert all(count >= party.min_monsters for count in encounter.values())
+        assert all(party.cr_mask[party.monster_ids[name]] for name in encounter)
+        xp, total = party._composition_xp(encounter)
+        assert party._encounter_difficulties(xp, total) == difficulty_value
+
+
+def test_save_load(party, index, tmp_path):
+    path = tmp_path / 'index.npz'
+    index.save(path)
+    loaded = EncounterIndex.load(path)
+    assert loaded.matches(party)
+    for difficulty_value in party.difficulty_values[1:-1]:
+        assert index.sample(difficulty_value, rng=3) == loaded.sample(difficulty_value, rng=3)
+    encounter = loaded.sample(party.deadly_value, rng=4)
+    assert all(type(name) is str for name in encounter)
+
+
+def test_enumeration_is_exhaustive(party):
+    # every one or two type encounter, by brute force over the xp
+    # classes, is covered by exactly one entry
+    members = np.flatnonzero(party.cr_mask)
+    class_xp = np.unique(party.monster_xp[members])[:6]
+    lower, upper = party.party_thresholds[1], party.party_thresholds[2]
+    entries = enumerate_encounters(class_xp, lower, upper, party._min_quantity, party.min_monsters)
+
+    covered = set()
+    for a, count_a, b, low_b, high_b in zip(*(entries[key] for key in ('a', 'count_a', 'b', 'low_b', 'high_b'))):
+        for count_b in range(low_b, high_b + 1):
+            covered.add((a, count_a, b, count_b) if b >= 0 else (a, count_b, -1, 0))
+
+    expected = set()
+    for a in range(len(class_xp)):
+        for count_a in range(1, 40):
+            if lower <= party._monster_quantity_multiplier(count_a) * count_a * class_xp[a] < upper:
+                expected.add((a, count_a, -1, 0))
+            for b in range(a, len(class_xp)):
+                for count_b in range(1, 40):
+                    xp = count_a * class_xp[a] + count_b * class_xp[b]
+                    if lower <= party._monster_quantity_multiplier(count_a + count_b) * xp < upper:
+                        expected.add((a, count_a, b, count_b))
+    assert covered == expected
+    assert has_encounter(class_xp, lower, upper, party._min_quantity, party.min_monsters)
+    assert not has_encounter(class_xp[:0], lower, upper, party._min_quantity, party.min_monsters)
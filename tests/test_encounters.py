@@ -0,0 +1,87 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from dungeon_generator import Dungeon
+from dungeon_generator.data import load_bestiary_index
+
+
+@pytest.fixture(scope='module')
+def oozes():
+    # a party facing few monsters, small enough to enumerate
+    return Dungeon._encounter_generator(
+        {3: 4}, rng=0, theme_mask=load_bestiary_index().mask({'type': 'ooze'})
+    )
+
+
+def adjusted_xp(generator, encounter):
+    ids = [generator.monster_ids[name] for name in encounter]
+    total = sum(encounter.values())
+    return generator._monster_quantity_multiplier(total) * sum(
+        generator.monster_xp[i] * count for i, count in zip(ids, encounter.values())
+    )
+
+
+def distance(xp, low, high):
+    return max(low - xp, xp - high, 0)
+
+
+def all_encounters(generator, max_monsters):
+    """
+    Every encounter of up to max_monsters eligible monsters, as 
+    sorted tuples of monster names.
+    """
+    names = sorted(generator.monster_names[generator.cr_mask])
+    for size in range(generator.min_monsters, max_monsters + 1):
+        yield from itertools.combinations_with_replacement(names, size)
+
+
+def as_encounter(monsters):
+    return {name: monsters.count(name) for name in set(monsters)}
+
+
+@pytest.mark.parametrize('xp', [50, 333, 700, (900, 1000), 2400, 5000, (10, 20)])
+def test_generate_encounter_xp_is_optimal(oozes, xp):
+    max_monsters = 4
+    low, high = (xp, xp) if np.isscalar(xp) else xp
+    best = min(
+        distance(adjusted_xp(oozes, as_encounter(monsters)), low, high)
+        for monsters in all_encounters(oozes, max_monsters)
+    )
+
+    for _ in range(20):
+        encounter = oozes.generate_encounter_xp(xp, max_monsters=max_monsters)
+        assert oozes.min_monsters <= sum(encounter.values()) <= max_monsters
+        assert all(oozes.cr_mask[oozes.monster_ids[name]] for name in encounter)
+        assert all(type(count) is int for count in encounter.values())
+        assert distance(adjusted_xp(oozes, encounter), low, high) == best
+
+
+def test_generate_encounter_xp_reaches_every_optimum(oozes):
+    # every encounter of exactly 450 adjusted xp can be drawn
+    max_monsters = 3
+    optimal = {
+        monsters for monsters in all_encounters(oozes, max_monsters)
+        if adjusted_xp(oozes, as_encounter(monsters)) == 450
+    }
+    assert len(optimal) > 1
+    seen = set()
+    for _ in range(400):
+        encounter = oozes.generate_encounter_xp(450, max_monsters=max_monsters)
+        seen.add(tuple(sorted(name for name, count in encounter.items() for _ in range(count))))
+    assert seen == optimal
+
+
+def test_generate_encounter_matches_difficulty():
+    dungeon = Dungeon._encounter_generator({5: 4}, rng=1)
+    for keyword in (dungeon.easy_keyword, dungeon.medium_keyword, dungeon.hard_keyword, dungeon.deadly_keyword):
+        encounter = dungeon.generate_encounter(keyword)
+        xp, total = dungeon._composition_xp(encounter)
+        assert dungeon._encounter_difficulties(xp, total) == dungeon.difficulty_dict[keyword]
+        assert all(type(name) is str and type(count) is int for name, count in encounter.items())
+
+
+def test_unreachable_theme_raises():
+    with pytest.raises(ValueError, match='no monster is eligible'):
+        Dungeon._encounter_generator({1: 4}, theme_mask=load_bestiary_index().mask({'legendary': True}))